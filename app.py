@@ -1,14 +1,29 @@
 """
 Main Flask Application - Student Performance Predictor
 """
-from flask import Flask, render_template, send_from_directory, session
+from flask import Flask, send_from_directory, session, request
 from models import db, Student, Staff
 from config import *
 from backend.routes.auth import auth_bp
 from backend.routes.student import student_bp
 from backend.routes.hod import staff_bp
 from backend.prediction_model import predictor
+from backend.assets import DIST_DIR, asset_url, build_assets, is_fingerprinted
+from backend.page_cache import page_cache
+from backend.cohort_index import cohort_index
+from backend.departments import ensure_departments
+from backend.fts import install_title_indexes
+from backend.student_search import install_fts, student_search
+from backend.compression import init_compression
+from backend.serializers import FastJSONProvider
+from backend.metrics import init_metrics
+from backend.profiling import init_profiling
+from backend.slow_queries import init_slow_query_log, report as slow_query_report
+from backend.storage import configure_storage, ensure_indexes, init_storage
 import os
+import time
+import mimetypes
+import click
 from datetime import timedelta
 
 app = Flask(__name__, template_folder='frontend/html', static_folder='frontend', static_url_path='')
@@ -20,27 +35,69 @@ app.config['SECRET_KEY'] = SECRET_KEY
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+app.json = FastJSONProvider(app, enabled=JSON_FAST_ENCODER)
 
 # Create upload folder
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(UPLOAD_STAGING_FOLDER, exist_ok=True)
 
-# Initialize database
+# Initialize database (WAL, pragmas, pool sizing and the read-only session)
+configure_storage(app)
 db.init_app(app)
+init_storage(app, db)
 
 # Register blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(student_bp)
 app.register_blueprint(staff_bp)
 
+# Request/SQL/predictor metrics; registered before compression so it sees the final body size
+if METRICS_ENABLED:
+    init_metrics(app, db, predictor, token=METRICS_TOKEN)
+
+# Per-request cProfile for operators (X-Profile header) or a sample of traffic
+init_profiling(app, db, token=PROFILE_TOKEN, sample_rate=PROFILE_SAMPLE_RATE, profile_dir=PROFILE_DIR)
+
+# Log SQL statements over SLOW_QUERY_THRESHOLD_MS with their query plans
+init_slow_query_log(app, db, SLOW_QUERY_LOG, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_INTERVAL)
+
+# gzip large JSON responses
+init_compression(app)
+
 # ==================== STATIC FILES ====================
 
+# Fingerprinted asset URLs never change content, so browsers may keep them for a year
+ASSET_CACHE_SECONDS = 365 * 24 * 3600
+
+app.jinja_env.globals['asset_url'] = asset_url
+
+def send_asset(asset_dir, filename):
+    """Serve a css/js file, preferring the fingerprinted gzip build when available"""
+    path = f"{asset_dir}/{filename}"
+    if not is_fingerprinted(path):
+        # Unhashed URL (build step not run, or an old bookmark) - revalidate as before
+        return send_from_directory(f'frontend/{asset_dir}', filename)
+    
+    use_gzip = request.accept_encodings['gzip'] and os.path.exists(os.path.join(DIST_DIR, path + '.gz'))
+    response = send_from_directory(
+        DIST_DIR,
+        path + '.gz' if use_gzip else path,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=ASSET_CACHE_SECONDS
+    )
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_CACHE_SECONDS}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/css/<path:filename>')
 def serve_css(filename):
-    return send_from_directory('frontend/css', filename)
+    return send_asset('css', filename)
 
 @app.route('/js/<path:filename>')
 def serve_js(filename):
-    return send_from_directory('frontend/js', filename)
+    return send_asset('js', filename)
 
 @app.route('/uploads/<path:filename>')
 def serve_uploads(filename):
@@ -51,72 +108,72 @@ def serve_uploads(filename):
 @app.route('/')
 def index():
     """Landing page"""
-    return render_template('index.html')
+    return page_cache.response('index.html')
 
 @app.route('/student/signup')
 def student_signup_page():
     """Student signup page"""
-    return render_template('student_signup.html')
+    return page_cache.response('student_signup.html')
 
 @app.route('/student/login')
 def student_login_page():
     """Student login page"""
-    return render_template('student_login.html')
+    return page_cache.response('student_login.html')
 
 @app.route('/staff/signup')
 def staff_signup_page():
     """Staff signup page"""
-    return render_template('staff_signup.html')
+    return page_cache.response('staff_signup.html')
 
 @app.route('/staff/login')
 def staff_login_page():
     """Staff login page"""
-    return render_template('staff_login.html')
+    return page_cache.response('staff_login.html')
 
 @app.route('/hod/signup')
 def hod_signup_page():
     """HOD signup page"""
-    return render_template('hod_signup.html')
+    return page_cache.response('hod_signup.html')
 
 @app.route('/hod/login')
 def hod_login_page():
     """HOD login page"""
-    return render_template('hod_login.html')
+    return page_cache.response('hod_login.html')
 
 @app.route('/student/dashboard')
 def student_dashboard():
     """Student dashboard"""
-    return render_template('student_dashboard.html')
+    return page_cache.response('student_dashboard.html')
 
 @app.route('/student/marks-entry')
 def marks_entry_page():
     """Mark entry page"""
-    return render_template('semester_marks_entry.html')
+    return page_cache.response('semester_marks_entry.html')
 
 @app.route('/student/prediction')
 def prediction_page():
     """Prediction result page"""
-    return render_template('prediction_result.html')
+    return page_cache.response('prediction_result.html')
 
 @app.route('/student/profile')
 def profile_page():
     """Profile view page"""
-    return render_template('profile_view.html')
+    return page_cache.response('profile_view.html')
 
 @app.route('/student/certifications')
 def certifications_page():
     """Certification upload page"""
-    return render_template('certification_upload.html')
+    return page_cache.response('certification_upload.html')
 
 @app.route('/staff/dashboard')
 def staff_dashboard():
     """Staff dashboard"""
-    return render_template('staff_dashboard.html')
+    return page_cache.response('staff_dashboard.html')
 
 @app.route('/hod/dashboard')
 def hod_dashboard():
     """HOD dashboard"""
-    return render_template('hod_dashboard.html')
+    return page_cache.response('hod_dashboard.html')
 
 # ==================== ERROR HANDLERS ====================
 
@@ -130,15 +187,176 @@ def internal_error(error):
 
 # ==================== INITIALIZATION ====================
 
-def init_app():
-    """Initialize application"""
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Write fingerprinted, gzipped CSS/JS and the asset manifest"""
+    manifest = build_assets()
+    print(f"Built {len(manifest)} assets into {DIST_DIR}")
+
+@app.cli.command('slow-queries')
+def slow_queries_command():
+    """Report logged slow SQL statements ranked by total time"""
+    slow_query_report(SLOW_QUERY_LOG)
+
+@app.cli.command('seed-data')
+@click.option('--students', default=10000, show_default=True, help='Number of students to generate')
+@click.option('--seed', default=42, show_default=True, help='Random seed (same seed, same data)')
+@click.option('--subjects', default=5, show_default=True, help='Subjects per semester')
+@click.option('--reset', is_flag=True, help='Drop and recreate all tables first')
+def seed_data_command(students, seed, subjects, reset):
+    """Bulk insert a synthetic cohort (password: password123)"""
+    from backend.seed import seed_database
+    seed_database(db, students, seed=seed, subjects_per_semester=subjects, reset=reset)
+
+@app.cli.command('import-marks')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--strict', is_flag=True, help='Import nothing if any row is invalid')
+@click.option('--no-predictions', is_flag=True, help="Don't recompute predictions for imported semesters")
+def import_marks_command(path, strict, no_predictions):
+    """Bulk import marks from a CSV file or JSON array"""
+    import json
+    from backend.marks_import import MarksImportError, import_marks, parse_csv, parse_json
+
+    with open(path, encoding='utf-8-sig') as f:
+        text = f.read()
+    try:
+        rows = parse_json(json.loads(text)) if path.lower().endswith('.json') else parse_csv(text)
+    except (MarksImportError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+    start = time.perf_counter()
+    summary = import_marks(db.session, rows, predictor=None if no_predictions else predictor, strict=strict)
+    elapsed = time.perf_counter() - start
+    for error in summary['errors'][:20]:
+        click.echo(f"row {error['row']}: {'; '.join(error['errors'])}", err=True)
+    if summary['rejected'] > 20:
+        click.echo(f"... {summary['rejected'] - 20} more rejected rows", err=True)
+    click.echo(f"{summary['inserted']} of {summary['received']} rows imported, {summary['rejected']} rejected, "
+               f"{summary['predictions_updated']} predictions updated in {elapsed:.2f}s")
+
+@app.cli.command('import-roster')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--department', required=True, help='Department the students are enrolled in')
+@click.option('--password', 'default_password', help='Initial password for rows without one')
+@click.option('--strict', is_flag=True, help='Import nothing if any row is invalid')
+@click.option('--workers', default=ROSTER_HASH_WORKERS, show_default=True, help='Password hashing processes')
+def import_roster_command(path, department, default_password, strict, workers):
+    """Register a department's students from a CSV roster"""
+    from backend.roster_import import RosterImportError, import_roster, parse_csv
+
+    def progress(phase, done, total):
+        click.echo(f"  {phase:6} {done:>8}/{total}", err=True)
+
+    with open(path, encoding='utf-8-sig') as f:
+        try:
+            rows = parse_csv(f.read())
+        except RosterImportError as e:
+            raise click.ClickException(str(e))
+
+    summary = import_roster(db.session, rows, department, default_password=default_password, strict=strict,
+                            workers=workers, progress=progress)
+    for error in summary['errors'][:20]:
+        click.echo(f"row {error['row']}: {'; '.join(error['errors'])}", err=True)
+    if summary['rejected'] > 20:
+        click.echo(f"... {summary['rejected'] - 20} more rejected rows", err=True)
+    timings = ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in summary['timings'].items())
+    click.echo(f"{summary['inserted']} of {summary['received']} students registered in {department}, "
+               f"{summary['rejected']} rejected ({timings}; {summary.get('students_per_second') or 0} students/s)")
+
+@app.cli.command('rescore')
+@click.option('--workers', default=RESCORE_WORKERS, show_default=True, help='Processes scoring departments in parallel')
+def rescore_command(workers):
+    """Re-score every student on the current model (resumes an interrupted run)"""
+    from backend.jobs import WorkerPool, enqueue, job_dict
+    from models import Job
+    job_id = enqueue('rescore_students', {'workers': workers}, unique=True)
+    pool = WorkerPool(app, threads=1, kinds=['rescore_students', 'rebuild_department_aggregates'], burst=True)
+    pool.start()
+    pool.join()
+    job = job_dict(db.session.get(Job, job_id))
+    click.echo(f"job {job_id} {job['status']}: {job['progress_done']}/{job['progress_total']} students"
+               + (f" ({job['error']})" if job['error'] else ''))
+
+@app.cli.group('jobs')
+def jobs_command():
+    """Background job queue (re-scoring, statistics snapshots)"""
+
+@jobs_command.command('enqueue')
+@click.argument('kind')
+@click.option('--payload', default='{}', help='JSON payload for the handler')
+def jobs_enqueue_command(kind, payload):
+    """Queue a job (rescore_students, rebuild_department_aggregates)"""
+    import json
+    from backend.jobs import enqueue
+    try:
+        job_id = enqueue(kind, json.loads(payload))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"queued job {job_id} ({kind})")
+
+@jobs_command.command('worker')
+@click.option('--threads', default=JOB_WORKER_THREADS, show_default=True, help='Jobs run concurrently')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty')
+def jobs_worker_command(threads, burst):
+    """Run queued jobs until interrupted"""
+    from backend.jobs import WorkerPool
+    pool = WorkerPool(app, threads=threads, burst=burst)
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        click.echo("[jobs] finishing current jobs...")
+        pool.stop()
+
+@jobs_command.command('status')
+@click.option('--limit', default=20, show_default=True)
+def jobs_status_command(limit):
+    """Show recent jobs and their progress"""
+    from backend.jobs import status
+    for job in status(limit):
+        total = job['progress_total']
+        progress = f"{job['progress_done']}/{total}" if total else str(job['progress_done'])
+        click.echo(f"{job['job_id']:>6}  {job['kind']:30} {job['status']:8} attempt {job['attempts']}  {progress:>15}"
+                   + (f"  {job['error']}" if job['error'] else ''))
+
+def warm_pages():
+    """Render the static pages once so the first visitors don't pay for it"""
+    templates_dir = os.path.join(app.root_path, app.template_folder)
+    page_cache.clear()
+    page_cache.warm(sorted(f for f in os.listdir(templates_dir) if f.endswith('.html')))
+
+def init_app(retrain=True):
+    """Initialize application (once per deployment, not per worker process)"""
     with app.app_context():
-        # Create tables
+        # Create tables, department keys and indexes added to tables that already existed
         db.create_all()
+        ensure_departments(db)
+        ensure_indexes(db)
+        
+        # Full-text indexes over certificate and competition titles
+        install_title_indexes(db.engine)
+        
+        # Fingerprint CSS/JS so templates link to current, cacheable URLs
+        build_assets()
+        
+        warm_pages()
+        
+        # Retrain ML model to ensure latest features and prevent feature mismatch
+        # (production restarts may reuse the saved model with retrain=False)
+        if retrain or not predictor.is_trained:
+            print("Retraining ML model with latest features...")
+            predictor.train()
+        
+        # Import the ML libraries and load the model now rather than on the first prediction
+        predictor.warm_up()
         
-        # Always retrain ML model to ensure latest features and prevent feature mismatch
-        print("Retraining ML model with latest features...")
-        predictor.train()
+        # Load the cohort index here so pre-forked workers share it
+        if COHORT_INDEX:
+            cohort_index.build()
+        if SEARCH_BACKEND == 'fts':
+            install_fts(db.engine)
+        else:
+            student_search.build()
 
 if __name__ == '__main__':
     init_app()
@@ -0,0 +1,147 @@
+"""
+Static Asset Pipeline - Fingerprinted, precompressed CSS and JS
+
+build_assets() copies every file under frontend/css and frontend/js to
+frontend/dist with a content hash in its name (style.css -> style.3f9a1c2e.css)
+and writes a gzip variant next to it. The manifest maps the source path to
+the fingerprinted one; templates resolve URLs through asset_url(), so a
+changed file gets a new URL and the old one can be cached forever.
+Files of earlier builds stay next to the new ones (and keep being served)
+until they have been out of the manifest for PRUNE_AFTER, so pages and
+clients that still reference them don't get 404s right after a deploy.
+
+Run `flask --app app build-assets` (or `python -m backend.assets`) as part
+of a deploy. init_app() also runs it so the development server is never
+serving a stale manifest.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from werkzeug.security import safe_join
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
+DIST_DIR = os.path.join(FRONTEND_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+ASSET_DIRS = ('css', 'js')
+
+# Files smaller than this are not worth a gzip variant
+GZIP_MIN_SIZE = 256
+
+# Files of earlier builds are deleted this long after they left the manifest
+PRUNE_AFTER = 7 * 24 * 3600
+
+_manifest = None
+_manifest_values = set()
+
+
+def _write(path, content):
+    """Write a build output; an existing one (same hash, same bytes) is only touched, marking it current"""
+    if os.path.exists(path):
+        os.utime(path)
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def prune(out_dir, current, keep_seconds=PRUNE_AFTER):
+    """Delete files under out_dir that are not in current and were last built over keep_seconds ago"""
+    cutoff = time.time() - keep_seconds
+    for root, _, files in os.walk(out_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if path not in current and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def build_assets(frontend_dir=FRONTEND_DIR, dist_dir=DIST_DIR, keep_seconds=PRUNE_AFTER):
+    """Write fingerprinted copies and gzip variants next to earlier builds, return the manifest"""
+    manifest = {}
+    written = set()
+
+    for asset_dir in ASSET_DIRS:
+        src_dir = os.path.join(frontend_dir, asset_dir)
+        out_dir = os.path.join(dist_dir, asset_dir)
+        os.makedirs(out_dir, exist_ok=True)
+
+        for root, _, files in os.walk(src_dir):
+            for name in sorted(files):
+                src_path = os.path.join(root, name)
+                rel_path = os.path.relpath(src_path, src_dir).replace(os.sep, '/')
+
+                with open(src_path, 'rb') as f:
+                    content = f.read()
+
+                digest = hashlib.sha256(content).hexdigest()[:8]
+                stem, ext = os.path.splitext(rel_path)
+                hashed_path = f"{stem}.{digest}{ext}"
+
+                out_path = os.path.join(out_dir, hashed_path)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                _write(out_path, content)
+                written.add(out_path)
+
+                if len(content) >= GZIP_MIN_SIZE:
+                    # mtime=0 keeps the .gz bytes identical across builds
+                    _write(out_path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+                    written.add(out_path + '.gz')
+
+                manifest[f"{asset_dir}/{rel_path}"] = f"{asset_dir}/{hashed_path}"
+
+        prune(out_dir, written, keep_seconds)
+
+    # Replace, so a worker never reads a half-written manifest
+    tmp_path = os.path.join(dist_dir, f'manifest.json.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(dist_dir, 'manifest.json'))
+
+    reload_manifest()
+    return manifest
+
+
+def reload_manifest():
+    """Drop the cached manifest so the next lookup reads it from disk"""
+    global _manifest
+    _manifest = None
+
+
+def get_manifest():
+    """Source path -> fingerprinted path, empty if the build step never ran"""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        _manifest = manifest
+        _manifest_values.clear()
+        _manifest_values.update(manifest.values())
+    return _manifest
+
+
+def asset_url(path):
+    """URL for a css/ or js/ asset, fingerprinted when a build exists"""
+    return '/' + get_manifest().get(path, path)
+
+
+def is_fingerprinted(path):
+    """True if path (e.g. 'css/style.3f9a1c2e.css') comes from the manifest or an earlier build still kept"""
+    get_manifest()
+    if path in _manifest_values:
+        return True
+    full_path = safe_join(DIST_DIR, path)
+    return full_path is not None and not path.endswith('.gz') and os.path.isfile(full_path)
+
+
+if __name__ == '__main__':
+    built = build_assets()
+    print(f"Built {len(built)} assets into {DIST_DIR}")
@@ -0,0 +1,231 @@
+"""
+Chunked, Resumable Uploads - Staging storage for certificate and competition files
+
+A transfer is split into small chunks that are appended to a staging file one
+request at a time, so no single request holds a worker for the whole upload.
+Every chunk carries the byte offset it starts at and, when the client can
+compute one, a SHA-256 checksum (browsers only offer crypto.subtle on HTTPS
+and localhost, so pages served over plain HTTP on a LAN send none). The
+server only appends a chunk whose offset matches what it already has, which
+lets a client that lost its connection ask for the current offset and resume.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from config import UPLOAD_STAGING_FOLDER, UPLOAD_CHUNK_SIZE, UPLOAD_MAX_TOTAL_SIZE, UPLOAD_SESSION_TTL
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+UPLOAD_KINDS = ('certificate', 'competition')
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class UploadError(Exception):
+    """Raised when a chunk or commit cannot be accepted"""
+
+    def __init__(self, message, status=400, received=None):
+        super().__init__(message)
+        self.status = status
+        self.received = received
+
+
+def _lock_for(upload_id):
+    with _locks_guard:
+        lock = _locks.get(upload_id)
+        if lock is None:
+            lock = _locks[upload_id] = threading.Lock()
+        return lock
+
+
+def _part_path(upload_id):
+    return os.path.join(UPLOAD_STAGING_FOLDER, f"{upload_id}.part")
+
+
+def _meta_path(upload_id):
+    return os.path.join(UPLOAD_STAGING_FOLDER, f"{upload_id}.json")
+
+
+def _write_meta(meta):
+    tmp_path = _meta_path(meta['upload_id']) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _meta_path(meta['upload_id']))
+
+
+def create_session(student_id, kind, filename, total_size):
+    """Open a new staging file and return its metadata"""
+    if kind not in UPLOAD_KINDS:
+        raise UploadError('Invalid upload kind')
+    if total_size <= 0:
+        raise UploadError('File is empty')
+    if total_size > UPLOAD_MAX_TOTAL_SIZE:
+        raise UploadError('File too large', status=413)
+
+    os.makedirs(UPLOAD_STAGING_FOLDER, exist_ok=True)
+    purge_expired()
+
+    meta = {
+        'upload_id': uuid.uuid4().hex,
+        'student_id': student_id,
+        'kind': kind,
+        'filename': filename,
+        'total_size': total_size,
+        'received': 0,
+        'chunks': [],
+        'created_at': time.time(),
+        'updated_at': time.time()
+    }
+    open(_part_path(meta['upload_id']), 'wb').close()
+    _write_meta(meta)
+    return meta
+
+
+def load_session(upload_id, student_id):
+    """Return the metadata of an upload owned by student_id, or None"""
+    if not upload_id.isalnum():
+        return None
+    try:
+        with open(_meta_path(upload_id)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta['student_id'] != student_id:
+        return None
+    return meta
+
+
+def append_chunk(meta, offset, data, checksum):
+    """
+    Append one chunk to the staging file
+
+    The chunk is rejected without touching the staging file if a checksum
+    was sent and does not match, or if it does not start exactly where the
+    previous chunk ended. UploadError.received tells the client where to
+    resume from.
+    """
+    upload_id = meta['upload_id']
+
+    if len(data) > UPLOAD_CHUNK_SIZE:
+        raise UploadError('Chunk too large', status=413)
+    if not data:
+        raise UploadError('Empty chunk')
+    sha256 = hashlib.sha256(data).hexdigest()
+    if checksum and sha256 != checksum.lower():
+        raise UploadError('Chunk checksum mismatch', received=meta['received'])
+
+    with _lock_for(upload_id):
+        with open(_part_path(upload_id), 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            # Re-read under the lock: another worker may have appended meanwhile
+            meta = load_session(upload_id, meta['student_id'])
+            if meta is None:
+                raise UploadError('Upload not found', status=404)
+            received = os.fstat(f.fileno()).st_size
+            if received != meta['received']:
+                # Crash between write and metadata update; drop the torn tail
+                f.truncate(meta['received'])
+                received = meta['received']
+            if offset != received:
+                raise UploadError('Unexpected chunk offset', status=409, received=received)
+            if received + len(data) > meta['total_size']:
+                raise UploadError('Chunk exceeds declared file size', received=received)
+
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+            meta['received'] = received + len(data)
+            meta['chunks'].append({'offset': offset, 'size': len(data), 'sha256': sha256})
+            meta['updated_at'] = time.time()
+            _write_meta(meta)
+    return meta
+
+
+@contextmanager
+def committing(meta):
+    """
+    Hold the upload's lock while it is committed; yields its current metadata
+
+    Chunks can't be appended meanwhile, and a concurrent or retried commit of
+    the same upload waits, then gets UploadError 404 once the first commit
+    has moved the staging file away.
+    """
+    upload_id = meta['upload_id']
+    with _lock_for(upload_id):
+        try:
+            f = open(_part_path(upload_id), 'rb')
+        except FileNotFoundError:
+            raise UploadError('Upload not found', status=404)
+        with f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            # Re-read under the lock: another worker may have committed meanwhile
+            meta = load_session(upload_id, meta['student_id'])
+            if meta is None or not os.path.exists(_part_path(upload_id)):
+                raise UploadError('Upload not found', status=404)
+            yield meta
+
+
+def file_checksum(meta):
+    """SHA-256 of the assembled staging file"""
+    digest = hashlib.sha256()
+    try:
+        with open(_part_path(meta['upload_id']), 'rb') as f:
+            for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        raise UploadError('Upload not found', status=404)
+    return digest.hexdigest()
+
+
+def move_to(meta, file_path):
+    """Move a complete staging file to its final location"""
+    if meta['received'] != meta['total_size']:
+        raise UploadError('Upload incomplete', status=409, received=meta['received'])
+    try:
+        os.replace(_part_path(meta['upload_id']), file_path)
+    except FileNotFoundError:
+        raise UploadError('Upload not found', status=404)
+
+
+def restore(meta, file_path):
+    """Undo move_to() so a failed commit can be retried"""
+    os.replace(file_path, _part_path(meta['upload_id']))
+
+
+def discard(meta):
+    """Delete the staging file and metadata of an upload"""
+    for path in (_part_path(meta['upload_id']), _meta_path(meta['upload_id'])):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    with _locks_guard:
+        _locks.pop(meta['upload_id'], None)
+
+
+def purge_expired():
+    """Remove staging files that have not been touched for UPLOAD_SESSION_TTL"""
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    try:
+        entries = os.listdir(UPLOAD_STAGING_FOLDER)
+    except OSError:
+        return
+    for entry in entries:
+        path = os.path.join(UPLOAD_STAGING_FOLDER, entry)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,506 @@
+"""
+Request Coalescing and Concurrency Limits - for expensive analytics endpoints
+
+When a meeting starts, dozens of HODs and staff open department-stats and
+all-predictions at the same moment, and each request used to compute the
+same body again. Two view decorators bound that work:
+
+    @single_flight(key): concurrent requests with the same key share one
+        computation (the leader). The leader streams its own response as
+        before and tees the body, gzipped, to followers as it is produced;
+        followers that accept gzip get those bytes, others get them
+        decompressed chunk by chunk. A leader nobody has joined keeps only
+        the first SINGLE_FLIGHT_JOIN_BUFFER bytes for latecomers, then
+        stops sharing and streams through, so a lone request stays as flat
+        in memory as an unshared one. Across workers the leader holds an
+        flock() on a file in SINGLE_FLIGHT_DIR; a worker that finds it
+        locked waits for the lock (at most ENDPOINT_QUEUE_TIMEOUT, then
+        computes alone) and uses the result file the leader left if it was
+        completed after that worker's request arrived, else computes
+        itself. The result file is only written when another worker
+        signalled that it is waiting, is readable by the server's user
+        only, and is deleted by the last waiter to read it (or by the next
+        leader). Lock files are one per key and database; files untouched
+        for SINGLE_FLIGHT_FILE_TTL are swept. A request never sees data
+        older than its own arrival.
+    @limit_concurrency: at most N requests per endpoint compute at once in a
+        worker (ENDPOINT_CONCURRENCY); up to M more queue for a slot, up to
+        ENDPOINT_QUEUE_TIMEOUT seconds, and the rest are shed with 503 and
+        Retry-After, so analytics bursts can't take every database
+        connection and CPU slice from cheap student traffic. A slot is held
+        until a streamed body has been sent.
+
+Put single_flight outside limit_concurrency so followers never take a slot:
+
+    @staff_bp.route('/department-stats')
+    @single_flight(shared_by_role)
+    @limit_concurrency
+    def department_stats(): ...
+
+Cross-worker sharing needs fcntl (not on Windows); without it requests are
+coalesced within each worker only.
+"""
+import functools
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+from flask import current_app, jsonify, request
+
+from config import (DB_PATH, SINGLE_FLIGHT, SINGLE_FLIGHT_DIR, SINGLE_FLIGHT_JOIN_BUFFER, SINGLE_FLIGHT_FILE_TTL,
+                    ENDPOINT_CONCURRENCY, ENDPOINT_QUEUE_TIMEOUT, COMPRESS_LEVEL, COMPRESS_MIMETYPES)
+from backend.metrics import metrics
+from backend.serializers import on_body_sent
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+_POLL_INTERVAL = 0.05  # Seconds between tries for another worker's lock
+
+
+class Flight:
+    """One computation shared by concurrent requests: its status, and its body as it is produced"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.started = False
+        self.status = None
+        self.mimetype = None
+        self.gzipped = False
+        self.pieces = []
+        self.size = 0
+        self.buffering = True  # False once a leader nobody joined dropped its buffer
+        self.done = False
+        self.error = None
+        self.followers = 0
+
+    def start(self, status, mimetype, gzipped):
+        with self._condition:
+            self.status, self.mimetype, self.gzipped = status, mimetype, gzipped
+            self.started = True
+            self._condition.notify_all()
+
+    def feed(self, piece):
+        if piece:
+            with self._condition:
+                self.pieces.append(piece)
+                self.size += len(piece)
+                self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self.done = True
+            self._condition.notify_all()
+
+    def fail(self, error):
+        with self._condition:
+            self.error = error
+            self._condition.notify_all()
+
+    def drop(self):
+        """Stop buffering (only once no follower can join)"""
+        self.buffering = False
+        self.pieces = []
+
+    def _wait(self, predicate):
+        with self._condition:
+            self._condition.wait_for(lambda: predicate() or self.error is not None)
+            if self.error is not None:
+                raise self.error
+
+    def _stream(self):
+        """The body pieces, waiting for each until the leader has produced it"""
+        sent = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self.pieces) > sent or self.done or self.error is not None)
+                if self.error is not None:
+                    raise self.error
+                pieces, finished = self.pieces[sent:], self.done
+            sent += len(pieces)
+            yield from pieces
+            if finished and sent == len(self.pieces):
+                return
+
+    def response(self):
+        """A follower's response"""
+        self._wait(lambda: self.started)
+        if not self.gzipped:
+            # Small bodies (department-stats, errors): send whole, compress_response handles them as usual
+            self._wait(lambda: self.done)
+            return current_app.response_class(b''.join(self.pieces), status=self.status, mimetype=self.mimetype)
+        if request.accept_encodings['gzip']:
+            response = current_app.response_class(self._stream(), status=self.status, mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = current_app.response_class(_gunzip(self._stream()), status=self.status, mimetype=self.mimetype)
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def _gunzip(pieces):
+    decompressor = zlib.decompressobj(31)
+    for piece in pieces:
+        yield decompressor.decompress(piece)
+    yield decompressor.flush()
+
+
+class _WorkerLock:
+    """flock() held by the worker computing a key; other workers wait on it and may take its result file"""
+
+    def __init__(self, directory, key):
+        # Per database, so a server and a benchmark on another database never share results
+        self.path = os.path.join(directory, hashlib.sha256(repr((DB_PATH, key)).encode()).hexdigest()[:32])
+        self.arrived = time.time()
+        self.file = None
+
+    def _try_lock(self):
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def acquire(self):
+        """
+        Hold the lock; returns (status, mimetype, gzipped, body) if another worker just computed it
+
+        Waits at most ENDPOINT_QUEUE_TIMEOUT for another worker's computation,
+        then gives up the lock (self.file is None) so the caller computes alone.
+        """
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        purge_stale(os.path.dirname(self.path))
+        # Closing the file releases the lock, also when the worker dies
+        self.file = open(f'{self.path}.lock', 'ab')
+        if self._try_lock():
+            if not self._waiters():
+                self._remove_result()
+            return None
+
+        # Another worker is computing it: ask for its result and wait for it to finish
+        marker = f'{self.path}.waiting.{os.getpid()}-{threading.get_ident()}'
+        open(marker, 'ab').close()
+        try:
+            deadline = self.arrived + ENDPOINT_QUEUE_TIMEOUT
+            while not self._try_lock():
+                if time.time() >= deadline:
+                    self.file.close()
+                    self.file = None
+                    return None
+                time.sleep(_POLL_INTERVAL)
+            return self._read_result()
+        finally:
+            _remove(marker)
+            # The last waiter to read the result deletes it
+            if self.file is not None and not self._waiters():
+                self._remove_result()
+
+    def _waiters(self):
+        return glob.glob(f'{glob.escape(self.path)}.waiting.*')
+
+    def others_waiting(self):
+        """Another worker is waiting for the result of this lock's holder"""
+        return self.file is not None and bool(self._waiters())
+
+    def release(self, flight=None):
+        """Release the lock, first leaving flight's result for waiting workers if it is complete"""
+        if self.file is None:
+            return
+        try:
+            if flight is not None and flight.done and flight.buffering and self.others_waiting():
+                self._write_result(flight)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def _read_result(self):
+        try:
+            with open(f'{self.path}.result', 'rb') as f:
+                header = json.loads(f.readline())
+                if header['completed'] < self.arrived:
+                    return None
+                return header['status'], header['mimetype'], header['gzipped'], f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_result(self, flight):
+        header = {'completed': time.time(), 'status': flight.status, 'mimetype': flight.mimetype,
+                  'gzipped': flight.gzipped}
+        temp_path = f'{self.path}.result.{os.getpid()}.tmp'
+        # Readable by this user only: the body is a staff response
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(json.dumps(header).encode() + b'\n')
+            f.writelines(flight.pieces)
+        os.replace(temp_path, f'{self.path}.result')
+
+    def _remove_result(self):
+        _remove(f'{self.path}.result')
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_purged_at = 0.0
+
+
+def purge_stale(directory):
+    """Remove files in directory untouched for SINGLE_FLIGHT_FILE_TTL (at most once per TTL per process)"""
+    global _purged_at
+    now = time.time()
+    if now - _purged_at < SINGLE_FLIGHT_FILE_TTL:
+        return
+    _purged_at = now
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.stat(path).st_mtime >= now - SINGLE_FLIGHT_FILE_TTL:
+                continue
+            if name.endswith('.lock'):
+                # Only a lock nobody holds
+                with open(path, 'ab') as f:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.remove(path)
+            else:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+class _TeeBody:
+    """The leader's streamed body: passes chunks through and feeds them, gzipped, to the flight"""
+
+    def __init__(self, chunks, flight, on_chunk, on_end):
+        self.inner = chunks
+        self.chunks = iter(chunks)
+        self.flight = flight
+        self.on_chunk = on_chunk
+        self.on_end = on_end
+        self.compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31) if flight.gzipped else None
+
+    def _feed(self, chunk):
+        if not self.flight.buffering:
+            return
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self.flight.feed(self.compressor.compress(chunk) if self.compressor else chunk)
+        self.on_chunk()
+
+    def __iter__(self):
+        try:
+            for chunk in self.chunks:
+                self._feed(chunk)
+                yield chunk
+        except GeneratorExit:
+            raise
+        except BaseException as error:
+            self.flight.fail(error)
+            raise
+        finally:
+            self.close()
+
+    def close(self):
+        on_end, self.on_end = self.on_end, None
+        if on_end is None:
+            return
+        try:
+            if self.flight.error is None and self.flight.buffering and self.flight.followers:
+                # The leader's client went away: finish the body for the requests sharing it
+                for chunk in self.chunks:
+                    self._feed(chunk)
+            if self.flight.error is None:
+                if self.compressor and self.flight.buffering:
+                    self.flight.feed(self.compressor.flush())
+                self.flight.finish()
+        except BaseException as error:
+            self.flight.fail(error)
+        finally:
+            if hasattr(self.inner, 'close'):
+                self.inner.close()
+            on_end()
+
+
+class SingleFlight:
+    def __init__(self, directory=None):
+        self.directory = directory if fcntl is not None else None
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key):
+        """(flight, True) for a new leader, (flight in progress, False) for a follower"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def close(self, key, flight, alone=False):
+        """Stop flight taking followers; with alone=True only if none has joined (returns whether it closed)"""
+        with self._lock:
+            if alone and flight.followers:
+                return False
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            return True
+
+    def lead(self, key, flight, compute):
+        """The leader's response: compute() -> response, shared with the flight as it is sent"""
+        lock = _WorkerLock(self.directory, key) if self.directory else None
+        try:
+            shared = lock.acquire() if lock else None
+            if shared is not None:
+                status, mimetype, gzipped, body = shared
+                lock.release()
+                self.close(key, flight)
+                flight.start(status, mimetype, gzipped)
+                flight.feed(body)
+                flight.finish()
+                metrics.inc(metrics.coalesced, (request.endpoint, 'worker'))
+                return flight.response()
+            response = current_app.make_response(compute())
+        except BaseException as error:
+            self.close(key, flight)
+            flight.fail(error)
+            if lock:
+                lock.release()
+            raise
+
+        if not response.is_streamed:
+            self.close(key, flight)
+            flight.start(response.status_code, response.mimetype, False)
+            flight.feed(response.get_data())
+            flight.finish()
+            if lock:
+                lock.release(flight)
+            return response
+
+        flight.start(response.status_code, response.mimetype,
+                     response.mimetype in COMPRESS_MIMETYPES and response.status_code == 200)
+
+        def on_chunk():
+            # Nobody joined within the first SINGLE_FLIGHT_JOIN_BUFFER bytes: stop sharing, stream through
+            if flight.size > SINGLE_FLIGHT_JOIN_BUFFER and not (lock and lock.others_waiting()) \
+                    and self.close(key, flight, alone=True):
+                flight.drop()
+                if lock:
+                    lock.release()
+
+        def on_end():
+            self.close(key, flight)
+            if lock:
+                lock.release(flight)
+
+        body = response.response = _TeeBody(response.response, flight, on_chunk, on_end)
+        response.call_on_close(body.close)
+        return response
+
+
+# Global single-flight registry (one per worker process)
+flights = SingleFlight(SINGLE_FLIGHT_DIR)
+
+
+def single_flight(key_func, args=()):
+    """
+    View decorator coalescing concurrent requests for which key_func() returns the same key
+
+    key_func runs in the request context and returns a hashable key covering
+    everything (besides the endpoint, URL arguments and the query arguments
+    named in args) that the response depends on, or None to compute the
+    request on its own. Other query arguments are ignored, so a client
+    can't make up new keys (and lock files) with ?x=<random>.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = key_func() if SINGLE_FLIGHT else None
+            if key is None:
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(request.args.getlist(name) for name in args),
+                   tuple(sorted(kwargs.items())), key)
+            flight, leader = flights.join(key)
+            if not leader:
+                metrics.inc(metrics.coalesced, (request.endpoint, 'process'))
+                return flight.response()
+            return flights.lead(key, flight, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class ConcurrencyLimit:
+    """At most `concurrency` holders; up to `queue` more wait up to `timeout` seconds"""
+
+    def __init__(self, concurrency, queue, timeout):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """True once a slot is held, False if the request should be shed"""
+        with self._condition:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+            try:
+                acquired = self._condition.wait_for(lambda: self.active < self.concurrency, self.timeout)
+            finally:
+                self.waiting -= 1
+            if acquired:
+                self.active += 1
+            return acquired
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+# Per-endpoint limits of this worker process
+limits = {
+    endpoint: ConcurrencyLimit(concurrency, queue, ENDPOINT_QUEUE_TIMEOUT)
+    for endpoint, (concurrency, queue) in ENDPOINT_CONCURRENCY.items()
+}
+
+
+def limit_concurrency(view):
+    """View decorator applying the ENDPOINT_CONCURRENCY limit of the request's endpoint"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        limit = limits.get(request.endpoint)
+        if limit is None:
+            return view(*args, **kwargs)
+        if not limit.acquire():
+            metrics.inc(metrics.shed, (request.endpoint,))
+            response = jsonify({'error': 'Server busy, please retry shortly'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            limit.release()
+            raise
+        if not response.is_streamed:
+            limit.release()
+            return response
+        # A streamed body is still being produced after the view returns: hold the slot until it is sent
+        return on_body_sent(response, lambda size: limit.release())
+    return wrapper
@@ -0,0 +1,263 @@
+"""
+Cohort Index - every student's latest prediction in a compact in-memory table
+
+One NumPy structured array row per student (id, department_id, year,
+latest score, category code; 16 bytes), sorted by student_id, so
+filter-students is a vectorized mask instead of a window-function query
+over the whole predictions table.
+
+It is kept current across processes by the database itself: triggers on
+students and predictions append the affected student_id to cohort_changes
+on every insert, update and delete, whichever code path (ORM, bulk insert,
+raw SQL, another worker) made the change. Before answering, refresh() reads
+the changes after the last one it applied (one primary key range query)
+and reloads just those students; a process that fell too far behind, or a
+change touching a large share of the cohort, reloads everything. The
+student search index (backend/student_search.py) follows the same log.
+
+Per department, a ScoreRanking (backend/score_ranking.py) orders the
+students who have a prediction, for rank, percentile and lowest-K queries;
+refresh() moves each changed student in it in O(log n).
+"""
+import threading
+
+from sqlalchemy import func, select
+
+from config import COHORT_CHANGE_LOG_LIMIT, COHORT_FULL_RELOAD_FRACTION, STREAM_BATCH_SIZE
+from models import db, Student, Department, Prediction, CohortChange
+from backend.departments import department_key
+from backend.queries import latest_predictions
+from backend.score_ranking import ScoreRanking
+
+# Category code -> prediction_result (0: no prediction yet)
+CATEGORIES = (None, 'Good Performance', 'Average Performance', 'At-Risk Performance')
+
+TRIGGERS = (
+    ('cohort_students_insert', 'AFTER INSERT ON students', 'NEW'),
+    ('cohort_students_update', 'AFTER UPDATE OF department, year ON students', 'NEW'),
+    ('cohort_students_rename', 'AFTER UPDATE OF roll_no, name ON students', 'NEW'),  # For the student search index
+    ('cohort_students_delete', 'AFTER DELETE ON students', 'OLD'),
+    ('cohort_predictions_insert', 'AFTER INSERT ON predictions', 'NEW'),
+    ('cohort_predictions_update', 'AFTER UPDATE OF prediction_score, prediction_result, generated_at ON predictions', 'NEW'),
+    ('cohort_predictions_delete', 'AFTER DELETE ON predictions', 'OLD'),
+)
+
+_IN_CHUNK = 500
+
+
+def install_triggers(engine):
+    """Create the change log triggers if missing (idempotent)"""
+    with engine.begin() as conn:
+        for name, event, row in TRIGGERS:
+            conn.exec_driver_sql(
+                f'CREATE TRIGGER IF NOT EXISTS {name} {event} '
+                f'BEGIN INSERT INTO cohort_changes (student_id) VALUES ({row}.student_id); END'
+            )
+
+
+class CohortIndex:
+    def __init__(self):
+        self.rows = None  # Structured array sorted by student_id; None until built
+        self.departments = {}  # department_id -> name
+        self._codes = {}  # department name_key -> department_id
+        self.rankings = {}  # department_id -> ScoreRanking of students with a prediction
+        self.last_change = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def dtype():
+        import numpy as np
+        return np.dtype([('student_id', '<i4'), ('department', '<i2'), ('year', 'i1'),
+                         ('category', 'i1'), ('score', '<f8')])
+
+    def _load_departments(self, session):
+        rows = session.execute(select(Department.department_id, Department.name, Department.name_key)).all()
+        self.departments = {department_id: name for department_id, name, _ in rows}
+        self._codes = {name_key: department_id for department_id, _, name_key in rows}
+
+    def _query(self, student_ids=None):
+        if student_ids is None:
+            latest = latest_predictions()
+        else:
+            latest = latest_predictions(Prediction.student_id.in_(student_ids))
+        query = select(
+            Student.student_id, Student.department_id, Student.year, latest.c.prediction_result, latest.c.prediction_score
+        ).outerjoin(latest, latest.c.student_id == Student.student_id)
+        if student_ids is not None:
+            query = query.where(Student.student_id.in_(student_ids))
+        return query.order_by(Student.student_id)
+
+    def _records(self, rows):
+        import numpy as np
+
+        category_codes = {name: code for code, name in enumerate(CATEGORIES)}
+        return np.array([
+            (student_id, department_id or 0, year, category_codes.get(category, 0), score or 0.0)
+            for student_id, department_id, year, category, score in rows
+        ], dtype=self.dtype())
+
+    def _last_change(self, session):
+        return session.execute(select(func.max(CohortChange.change_id))).scalar() or 0
+
+    def build(self, session=None):
+        """Load every student (call inside an app context)"""
+        import numpy as np
+        from backend.storage import read_session
+
+        session = session or read_session
+        install_triggers(db.engine)
+        with self._lock:
+            # Read the change position first: anything committed during the load is applied again by refresh()
+            last_change = self._last_change(session)
+            self._load_departments(session)
+            parts = [self._records(rows) for rows in
+                     session.execute(self._query()).yield_per(STREAM_BATCH_SIZE * 10).partitions()]
+            self.rows = np.concatenate(parts) if parts else np.empty(0, dtype=self.dtype())
+            self.last_change = last_change
+            self._build_rankings()
+
+    def _build_rankings(self):
+        rows = self.rows[self.rows['category'] > 0]
+        self.rankings = {
+            code: ScoreRanking.from_scores(rows['student_id'][mask].tolist(), rows['score'][mask].tolist())
+            for code in set(rows['department'].tolist())
+            for mask in [rows['department'] == code]
+        }
+
+    def refresh(self, session=None):
+        """Apply changes committed since the last build/refresh; builds on first use"""
+        from backend.storage import read_session
+
+        session = session or read_session
+        if self.rows is None:
+            return self.build(session)
+
+        latest = self._last_change(session)
+        if latest == self.last_change:
+            return
+        oldest = session.execute(select(func.min(CohortChange.change_id))).scalar() or 0
+        if latest < self.last_change or oldest > self.last_change + 1:
+            # Log was reset (tables recreated) or pruned past our position
+            return self.build(session)
+
+        changed = session.execute(
+            select(CohortChange.student_id).distinct()
+            .where(CohortChange.change_id > self.last_change, CohortChange.change_id <= latest)
+        ).scalars().all()
+        if len(changed) > max(len(self.rows), 1) * COHORT_FULL_RELOAD_FRACTION:
+            return self.build(session)
+
+        fresh = []
+        for start in range(0, len(changed), _IN_CHUNK):
+            fresh.extend(session.execute(self._query(changed[start:start + _IN_CHUNK])).all())
+        if any(row[1] not in self.departments for row in fresh):
+            self._load_departments(session)
+        with self._lock:
+            if latest > self.last_change:
+                self._apply(changed, self._records(fresh))
+                self.last_change = latest
+
+        if latest - (oldest or latest) > COHORT_CHANGE_LOG_LIMIT:
+            self.prune(latest - COHORT_CHANGE_LOG_LIMIT)
+
+    def _apply(self, changed, records):
+        """Replace, add and remove the changed students' rows, keeping student_id order"""
+        import numpy as np
+
+        rows = self.rows
+        changed = np.array(sorted(changed), dtype='<i4')
+        previous = rows[np.isin(rows['student_id'], changed)]
+        positions = np.searchsorted(rows['student_id'], records['student_id'])
+        positions_clipped = np.minimum(positions, max(len(rows) - 1, 0))
+        existing = (positions < len(rows)) & (rows['student_id'][positions_clipped] == records['student_id']) \
+            if len(rows) else np.zeros(len(records), dtype=bool)
+        rows[positions[existing]] = records[existing]
+
+        deleted = np.setdiff1d(changed, records['student_id'], assume_unique=True)
+        if len(deleted):
+            rows = rows[~np.isin(rows['student_id'], deleted)]
+        if (~existing).any():
+            rows = np.concatenate([rows, records[~existing]])
+            if len(rows) > 1 and (np.diff(rows['student_id']) < 0).any():
+                rows = rows[np.argsort(rows['student_id'], kind='stable')]
+        self.rows = rows
+
+        # O(log n) per changed student
+        for student_id, department, _, category, score in previous.tolist():
+            if category:
+                self.rankings[department].remove(student_id, score)
+        for student_id, department, _, category, score in records.tolist():
+            if category:
+                self.rankings.setdefault(department, ScoreRanking()).add(student_id, score)
+
+    def prune(self, up_to):
+        """Drop change log entries every process has long applied"""
+        with db.engine.begin() as conn:
+            conn.execute(CohortChange.__table__.delete().where(CohortChange.change_id <= up_to))
+
+    def filter(self, year=None, department=None):
+        """Rows (a copy, in student_id order) matching the filters"""
+        import numpy as np
+
+        self.refresh()
+        with self._lock:
+            rows = self.rows
+            mask = np.ones(len(rows), dtype=bool)
+            if year:
+                mask &= rows['year'] == year
+            if department:
+                code = self.department_code(department)
+                if code is None:
+                    return rows[:0].copy()
+                mask &= rows['department'] == code
+            return rows[mask]
+
+    def department_code(self, department):
+        """department_id for any spelling of a department name; None if unknown"""
+        return self._codes.get(department_key(department))
+
+    def _row(self, student_id):
+        import numpy as np
+
+        position = np.searchsorted(self.rows['student_id'], student_id)
+        if position < len(self.rows) and self.rows['student_id'][position] == student_id:
+            return self.rows[position]
+        return None
+
+    def lowest_scores(self, department, limit):
+        """(student_id, year, category, score) of the department's `limit` lowest latest scores, lowest first"""
+        self.refresh()
+        with self._lock:
+            ranking = self.rankings.get(self.department_code(department))
+            if ranking is None:
+                return []
+            result = []
+            for student_id in ranking.lowest(limit):
+                row = self._row(student_id)
+                result.append((student_id, int(row['year']), CATEGORIES[row['category']], float(row['score'])))
+            return result
+
+    def rank(self, student_id):
+        """Department rank and percentile of a student's latest score; None if unknown"""
+        self.refresh()
+        with self._lock:
+            row = self._row(student_id)
+            if row is None:
+                return None
+            department_id = int(row['department'])
+            department = self.departments.get(department_id)
+            ranking = self.rankings.get(department_id)
+            if not row['category'] or ranking is None:
+                # No prediction yet, so not ranked
+                return {'department_id': department_id, 'department': department, 'score': None, 'category': None,
+                        'rank': None, 'out_of': ranking.size if ranking else 0, 'percentile': None}
+            score = float(row['score'])
+            rank, out_of, percentile = ranking.rank(score)
+            return {'department_id': department_id, 'department': department, 'score': score,
+                    'category': CATEGORIES[row['category']], 'rank': rank, 'out_of': out_of, 'percentile': percentile}
+
+    def memory_bytes(self):
+        return 0 if self.rows is None else self.rows.nbytes
+
+
+cohort_index = CohortIndex()
@@ -0,0 +1,67 @@
+"""
+Response Compression - gzip for large JSON and text responses
+
+Registered as an after_request hook. A response is compressed only when the
+client accepts gzip, its mimetype is in COMPRESS_MIMETYPES (so uploaded
+PDFs/images and the precompressed asset/page variants are left alone) and it
+is at least COMPRESS_MIN_SIZE bytes. Streamed responses are compressed chunk
+by chunk as they are produced instead of being buffered.
+"""
+import gzip
+import zlib
+
+from flask import request
+
+from config import COMPRESS_MIN_SIZE, COMPRESS_LEVEL, COMPRESS_MIMETYPES
+
+
+def compress_bytes(data, level=COMPRESS_LEVEL):
+    """gzip a complete body"""
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, level=COMPRESS_LEVEL):
+    """gzip an iterable of byte chunks without buffering the whole body"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def should_compress(response):
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.mimetype not in COMPRESS_MIMETYPES:
+        return False
+    if not request.accept_encodings['gzip']:
+        return False
+    if not response.is_streamed:
+        length = response.content_length
+        if length is None or length < COMPRESS_MIN_SIZE:
+            return False
+    return True
+
+
+def compress_response(response):
+    """after_request hook: gzip the response body when worthwhile"""
+    response.vary.add('Accept-Encoding')
+    if not should_compress(response):
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress_bytes(response.get_data()))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -0,0 +1,92 @@
+"""
+Canonical Departments - one integer key per department, whatever the spelling
+
+Student.department and Staff.department stay free text as entered; each row
+also carries department_id, a key into the departments table (seeded from
+config.DEPARTMENTS). Two spellings that differ only in case or surrounding
+spaces share a key, so department-scoped queries are an indexed integer
+equality instead of ilike() or Python-side .lower() comparisons.
+
+Keys are filled in by the database: triggers on students and staff look up
+(or add) the department on every insert and department change, whichever
+code path made it (ORM, bulk insert, raw SQL). ensure_departments() adds
+the column to tables that predate it and backfills existing rows.
+
+    db.create_all()
+    ensure_departments(db)   # before ensure_indexes, which indexes the new column
+    ensure_indexes(db)
+"""
+import string
+
+from sqlalchemy import select
+
+from config import DEPARTMENTS
+from models import Department
+
+# SQLite's lower() folds ASCII letters only and trim() strips spaces only; department_key matches both
+KEY_SQL = "lower(trim({}, ' '))"
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+TABLES = (('students', 'student_id'), ('staff', 'staff_id'))
+
+
+def department_key(name):
+    """Lookup key for a department name, folded the way the triggers fold it"""
+    return (name or '').strip(' ').translate(_ASCII_LOWER)
+
+
+def department_id_of(name):
+    """Scalar subquery with the department_id for a name (NULL if unknown), for indexed equality filters"""
+    return select(Department.department_id).where(Department.name_key == department_key(name)).scalar_subquery()
+
+
+def lookup_department_id(session, name):
+    return session.execute(
+        select(Department.department_id).where(Department.name_key == department_key(name))
+    ).scalar()
+
+
+def _triggers(table, key_column):
+    key = KEY_SQL.format('NEW.department')
+    body = (
+        f"BEGIN INSERT OR IGNORE INTO departments (name, name_key) VALUES (trim(NEW.department, ' '), {key}); "
+        f"UPDATE {table} SET department_id = (SELECT department_id FROM departments WHERE name_key = {key}) "
+        f"WHERE {key_column} = NEW.{key_column}; END"
+    )
+    return (
+        f'CREATE TRIGGER IF NOT EXISTS {table}_department_insert AFTER INSERT ON {table} '
+        f'WHEN NEW.department_id IS NULL {body}',
+        f'CREATE TRIGGER IF NOT EXISTS {table}_department_update AFTER UPDATE OF department ON {table} {body}',
+    )
+
+
+def ensure_departments(db):
+    """Seed config.DEPARTMENTS, add and backfill department_id on older tables, install the triggers (idempotent)"""
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(
+            'INSERT OR IGNORE INTO departments (name, name_key) VALUES (?, ?)',
+            [(name, department_key(name)) for name in DEPARTMENTS]
+        )
+        for table, key_column in TABLES:
+            columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')}
+            if 'department_id' not in columns:
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {table} ADD COLUMN department_id INTEGER REFERENCES departments (department_id)'
+                )
+            # Departments only seen in existing rows keep their first spelling
+            key = KEY_SQL.format('department')
+            conn.exec_driver_sql(
+                f"INSERT OR IGNORE INTO departments (name, name_key) "
+                f"SELECT trim(department, ' '), {key} FROM {table} WHERE department_id IS NULL ORDER BY {key_column}"
+            )
+            conn.exec_driver_sql(
+                f'UPDATE {table} SET department_id = '
+                f'(SELECT department_id FROM departments WHERE name_key = {key}) WHERE department_id IS NULL'
+            )
+            for statement in _triggers(table, key_column):
+                conn.exec_driver_sql(statement)
+
+
+def department_ids(session):
+    """name_key -> department_id for every department"""
+    return dict(session.execute(select(Department.name_key, Department.department_id)).all())
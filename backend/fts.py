@@ -0,0 +1,75 @@
+"""
+SQLite FTS5 - external-content full-text tables kept in sync by triggers
+
+An external-content FTS5 table holds only the token index; the text stays
+in the source table and is read from there by rowid. Triggers on the source
+table mirror every insert, delete and update of the indexed columns, so the
+index is current whichever code path wrote the row (ORM, bulk insert, raw
+SQL, another worker). Prefix indexes for 2 and 3 characters make short
+prefix queries ("aw"*) an index lookup rather than a vocabulary scan.
+
+    install_fts(engine, 'certification_fts', 'certifications', 'cert_id', ('cert_title',))
+    fts = fts_table('certification_fts')
+    select(...).join(fts, fts.c.rowid == Certification.cert_id).where(matches('certification_fts', 'aws cloud'))
+"""
+import re
+
+from sqlalchemy import column, literal_column, table
+
+# (FTS table, source table, source primary key, indexed columns)
+TITLE_INDEXES = (
+    ('certification_fts', 'certifications', 'cert_id', ('cert_title',)),
+    ('competition_fts', 'competitions', 'comp_id', ('comp_title',)),
+)
+
+
+def _triggers(name, source, key, columns):
+    names = ', '.join(columns)
+    new = ', '.join(f'NEW.{c}' for c in columns)
+    old = ', '.join(f'OLD.{c}' for c in columns)
+    insert = f'INSERT INTO {name} (rowid, {names}) VALUES (NEW.{key}, {new});'
+    delete = f"INSERT INTO {name} ({name}, rowid, {names}) VALUES ('delete', OLD.{key}, {old});"
+    return (
+        (f'{name}_insert', f'AFTER INSERT ON {source}', insert),
+        (f'{name}_delete', f'AFTER DELETE ON {source}', delete),
+        (f'{name}_update', f'AFTER UPDATE OF {names} ON {source}', f'{delete} {insert}'),
+    )
+
+
+def install_fts(engine, name, source, key, columns):
+    """Create the FTS table and its triggers if missing, rebuilding it from the source when they were (idempotent)"""
+    triggers = _triggers(name, source, key, columns)
+    with engine.begin() as conn:
+        existing = set(conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (source,)
+        ).scalars())
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+            f"{', '.join(columns)}, content='{source}', content_rowid='{key}', prefix='2 3')"
+        )
+        for trigger, event, body in triggers:
+            conn.exec_driver_sql(f'CREATE TRIGGER IF NOT EXISTS {trigger} {event} BEGIN {body} END')
+        if not {trigger for trigger, _, _ in triggers} <= existing:
+            # New table, or the source table was recreated (dropping its triggers); index what is there now
+            conn.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+
+
+def install_title_indexes(engine):
+    for name, source, key, columns in TITLE_INDEXES:
+        install_fts(engine, name, source, key, columns)
+
+
+def match_expression(query):
+    """FTS5 query matching rows with every word of query as a word prefix; None if it has no words"""
+    words = re.findall(r'\w+', (query or '').lower())
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+
+def fts_table(name):
+    """Selectable for an FTS table's rowid and rank columns"""
+    return table(name, column('rowid'), column('rank'))
+
+
+def matches(name, query):
+    """WHERE clause for `name MATCH query` (query: a match_expression)"""
+    return literal_column(name).op('MATCH')(query)
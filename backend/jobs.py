@@ -0,0 +1,324 @@
+"""
+Background Jobs - a durable work queue in the application database
+
+Maintenance work (re-scoring every student after a retrain, rebuilding the
+department statistics snapshot) runs in a separate worker process instead
+of inside request handlers:
+
+    flask --app app jobs enqueue rescore_students
+    flask --app app jobs worker --threads 2        # until interrupted
+    flask --app app jobs worker --burst            # until the queue is empty
+    flask --app app jobs status
+
+Jobs are rows in the `jobs` table. A worker leases the next due job with a
+single UPDATE ... RETURNING, so two workers never run the same job, and
+keeps the lease alive by reporting progress. Handlers work in chunks and
+save a checkpoint with each one, in the same transaction as the chunk's
+writes; a job whose worker died (lease expired) or that raised is retried
+from its last checkpoint, with backoff, up to max_attempts times.
+"""
+import json
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from config import (JOB_WORKER_THREADS, JOB_POLL_INTERVAL, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF,
+                    RESCORE_WORKERS)
+from models import db, Job, Student, Department, Marks, Prediction, DepartmentAggregate
+from backend.queries import latest_predictions
+
+HANDLERS = {}
+
+
+def job(kind):
+    """Register a handler: func(ctx) where ctx is a JobContext"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker took it over"""
+
+
+class JobContext:
+    def __init__(self, job_id, owner, payload, checkpoint, lease_seconds):
+        self.job_id = job_id
+        self.owner = owner
+        self.payload = payload
+        self.checkpoint = checkpoint
+        self.lease_seconds = lease_seconds
+
+    def progress(self, done, total=None, checkpoint=None):
+        """
+        Record progress, renew the lease and commit db.session
+
+        Whatever the handler wrote since the last call is committed together
+        with the checkpoint, so a retry resumes exactly after it.
+        """
+        values = {
+            'progress_done': done,
+            'lease_expires': datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        }
+        if total is not None:
+            values['progress_total'] = total
+        if checkpoint is not None:
+            values['checkpoint'] = json.dumps(checkpoint)
+            self.checkpoint = checkpoint
+        result = db.session.execute(
+            update(Job).where(Job.job_id == self.job_id, Job.lease_owner == self.owner, Job.status == 'running')
+            .values(**values)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            raise LeaseLost(f"job {self.job_id} is no longer leased by {self.owner}")
+        db.session.commit()
+
+
+def enqueue(kind, payload=None, max_attempts=JOB_MAX_ATTEMPTS, delay=0, unique=False):
+    """
+    Add a job and return its id
+
+    With unique=True an already queued or running job of the same kind is
+    reused instead, so repeated triggers don't pile up identical work.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    with db.engine.begin() as conn:
+        if unique:
+            existing = conn.execute(
+                select(Job.job_id).where(Job.kind == kind, Job.status.in_(('queued', 'running'))).limit(1)
+            ).scalar()
+            if existing is not None:
+                return existing
+        now = datetime.utcnow()
+        return conn.execute(insert(Job).values(
+            kind=kind,
+            payload=json.dumps(payload or {}),
+            status='queued',
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=now + timedelta(seconds=delay),
+            progress_done=0,
+            created_at=now
+        ).returning(Job.job_id)).scalar_one()
+
+
+def lease(owner, lease_seconds=JOB_LEASE_SECONDS, kinds=None):
+    """Claim the next due job (or one whose lease expired); returns the Job row or None"""
+    now = datetime.utcnow()
+    due = or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        and_(Job.status == 'running', Job.lease_expires < now)
+    )
+    candidate = select(Job.job_id).where(due)
+    if kinds:
+        candidate = candidate.where(Job.kind.in_(kinds))
+    candidate = candidate.order_by(Job.run_after, Job.job_id).limit(1).scalar_subquery()
+    with db.engine.begin() as conn:
+        return conn.execute(
+            update(Job).where(Job.job_id == candidate, due).values(
+                status='running',
+                lease_owner=owner,
+                lease_expires=now + timedelta(seconds=lease_seconds),
+                attempts=Job.attempts + 1
+            ).returning(Job.job_id, Job.kind, Job.payload, Job.checkpoint, Job.attempts, Job.max_attempts)
+        ).first()
+
+
+def _finish(job_id, owner, **values):
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(Job).where(Job.job_id == job_id, Job.lease_owner == owner).values(lease_expires=None, **values)
+        )
+
+
+def run_job(leased, owner, lease_seconds=JOB_LEASE_SECONDS):
+    """Run one leased job to completion, failure or retry"""
+    if leased.attempts > leased.max_attempts:
+        # Its previous workers died holding the lease
+        _finish(leased.job_id, owner, status='failed', error='Lease expired on every attempt',
+                finished_at=datetime.utcnow())
+        return 'failed'
+
+    ctx = JobContext(leased.job_id, owner, json.loads(leased.payload or '{}'),
+                     json.loads(leased.checkpoint) if leased.checkpoint else None, lease_seconds)
+    try:
+        HANDLERS[leased.kind](ctx)
+        db.session.commit()
+    except LeaseLost:
+        db.session.rollback()
+        return 'lost'
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        if leased.attempts < leased.max_attempts:
+            retry_at = datetime.utcnow() + timedelta(seconds=JOB_RETRY_BACKOFF * 2 ** (leased.attempts - 1))
+            _finish(leased.job_id, owner, status='queued', run_after=retry_at, error=error)
+            return 'retry'
+        _finish(leased.job_id, owner, status='failed', error=error, finished_at=datetime.utcnow())
+        return 'failed'
+    _finish(leased.job_id, owner, status='done', error=None, finished_at=datetime.utcnow())
+    return 'done'
+
+
+class WorkerPool:
+    """Threads that lease and run jobs until stopped (or, in burst mode, until the queue is empty)"""
+
+    def __init__(self, app, threads=JOB_WORKER_THREADS, poll_interval=JOB_POLL_INTERVAL,
+                 lease_seconds=JOB_LEASE_SECONDS, kinds=None, burst=False, log=print):
+        self.app = app
+        self.size = threads
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.kinds = kinds
+        self.burst = burst
+        self.log = log
+        self.stopping = threading.Event()
+        self.threads = []
+
+    def start(self):
+        for n in range(self.size):
+            thread = threading.Thread(target=self._loop, args=(n,), name=f'job-worker-{n}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Finish the jobs in hand, then return"""
+        self.stopping.set()
+        self.join()
+
+    def join(self):
+        for thread in self.threads:
+            while thread.is_alive():
+                thread.join(0.5)
+
+    def _loop(self, n):
+        owner = f'{socket.gethostname()}:{os.getpid()}:{n}'
+        while not self.stopping.is_set():
+            with self.app.app_context():
+                leased = lease(owner, self.lease_seconds, self.kinds)
+                if leased is not None:
+                    if self.log:
+                        self.log(f"[jobs] {owner} running job {leased.job_id} ({leased.kind}, attempt {leased.attempts})")
+                    outcome = run_job(leased, owner, self.lease_seconds)
+                    if self.log:
+                        self.log(f"[jobs] job {leased.job_id} {outcome}")
+                    continue
+            if self.burst:
+                return
+            self.stopping.wait(self.poll_interval)
+
+
+def status(limit=20):
+    """Most recent jobs as dicts (for the CLI and the staff endpoint)"""
+    rows = db.session.execute(select(Job).order_by(Job.job_id.desc()).limit(limit)).scalars()
+    return [job_dict(row) for row in rows]
+
+
+def job_dict(job):
+    return {
+        'job_id': job.job_id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'progress_done': job.progress_done,
+        'progress_total': job.progress_total,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+# ==================== JOBS ====================
+
+@job('rescore_students')
+def rescore_students(ctx):
+    """
+    Put every stored prediction on the current model, one department per checkpoint
+
+    Run after the model is retrained (see backend/rescore.py). Payload:
+    {"workers": n, "rebuild_aggregates": true}. A retry resumes after the
+    last finished department, unless the model changed in between.
+    """
+    from backend.prediction_model import predictor
+    from backend.rescore import rescore_cohort
+
+    checkpoint = ctx.checkpoint or {}
+    if checkpoint.get('model_version') != predictor.version:
+        checkpoint = {}
+    finished = list(checkpoint.get('departments', []))
+    previous = checkpoint.get('students', 0)
+    total = db.session.execute(select(func.count(func.distinct(Marks.student_id)))).scalar()
+
+    def on_department(department, summary):
+        finished.append(department)
+        students = previous + summary['students']
+        ctx.progress(students, total, checkpoint={
+            'model_version': summary['model_version'], 'departments': finished, 'students': students
+        })
+
+    rescore_cohort(workers=ctx.payload.get('workers', RESCORE_WORKERS), done=finished, on_department=on_department)
+
+    if ctx.payload.get('rebuild_aggregates', True):
+        enqueue('rebuild_department_aggregates', unique=True)
+
+
+def department_aggregate(session, department_id, department):
+    """Snapshot values for one department (by key, stored under its canonical name), computed like department-stats does"""
+    latest = latest_predictions()
+    student_count, average_latest_score = session.execute(
+        select(func.count(Student.student_id), func.avg(latest.c.prediction_score))
+        .outerjoin(latest, latest.c.student_id == Student.student_id)
+        .where(Student.department_id == department_id)
+    ).one()
+    prediction_count, score_sum, good, average, at_risk = session.execute(
+        select(
+            func.count(Prediction.prediction_id),
+            func.coalesce(func.sum(Prediction.prediction_score), 0),
+            func.count().filter(Prediction.prediction_result == 'Good Performance'),
+            func.count().filter(Prediction.prediction_result == 'Average Performance'),
+            func.count().filter(Prediction.prediction_result == 'At-Risk Performance')
+        ).join(Student, Student.student_id == Prediction.student_id).where(Student.department_id == department_id)
+    ).one()
+    return {
+        'department': department,
+        'student_count': student_count,
+        'average_latest_score': average_latest_score,
+        'prediction_count': prediction_count,
+        'prediction_score_sum': score_sum,
+        'good_count': good,
+        'average_count': average,
+        'at_risk_count': at_risk,
+        'updated_at': datetime.utcnow()
+    }
+
+
+@job('rebuild_department_aggregates')
+def rebuild_department_aggregates(ctx):
+    """Recompute the department_aggregates snapshot, one department per chunk"""
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    departments = db.session.execute(
+        select(Department.department_id, Department.name)
+        .where(Department.department_id.in_(select(Student.department_id))).order_by(Department.name)
+    ).all()
+    names = [name for _, name in departments]
+    db.session.execute(DepartmentAggregate.__table__.delete().where(DepartmentAggregate.department.not_in(names)))
+
+    finished = set((ctx.checkpoint or {}).get('departments', []))
+    for department_id, department in departments:
+        if department in finished:
+            continue
+        values = department_aggregate(db.session, department_id, department)
+        statement = sqlite_insert(DepartmentAggregate).values(**values)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[DepartmentAggregate.department],
+            set_={key: statement.excluded[key] for key in values if key != 'department'}
+        ))
+        finished.add(department)
+        ctx.progress(len(finished), len(departments), checkpoint={'departments': sorted(finished)})
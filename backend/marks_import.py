@@ -0,0 +1,221 @@
+"""
+Bulk Marks Import - many students and semesters in one request
+
+Accepts a CSV file or a JSON array of rows:
+    roll_no, semester, subject_name, marks_obtained, attendance_percentage,
+    internal_marks, assignment_score
+Range checks run on whole columns with NumPy and every rejected row is
+reported with its row number and reasons. Accepted rows are inserted with one
+executemany in a single transaction, and then the prediction of every
+(student, semester) that received marks is recomputed once, from grouped SQL
+averages, instead of once per subject.
+
+    POST /api/staff/import-marks          (JSON array, CSV body or "file" upload)
+    flask --app app import-marks marks.csv
+"""
+import csv
+import io
+from datetime import datetime
+
+from sqlalchemy import func, insert
+
+from config import SEMESTERS
+from models import Student, Marks, Prediction, Certification, Competition
+from backend.departments import lookup_department_id
+
+COLUMNS = ('roll_no', 'semester', 'subject_name', 'marks_obtained', 'attendance_percentage',
+           'internal_marks', 'assignment_score')
+
+# (column, low, high, message) - same limits as POST /api/student/add-marks
+RANGES = (
+    ('marks_obtained', 0, 100, 'Marks must be between 0-100'),
+    ('attendance_percentage', 0, 100, 'Attendance must be between 0-100'),
+    ('internal_marks', 0, 50, 'Internal marks must be between 0-50'),
+    ('assignment_score', 0, 20, 'Assignment score must be between 0-20'),
+)
+
+MAX_REPORTED_ERRORS = 1000
+_IN_CHUNK = 500
+
+
+class MarksImportError(ValueError):
+    """The payload as a whole can't be read (per-row problems are reported, not raised)"""
+
+
+def parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [c for c in COLUMNS if c not in (reader.fieldnames or ())]
+    if missing:
+        raise MarksImportError(f"CSV is missing columns: {', '.join(missing)}")
+    return list(reader)
+
+
+def parse_json(data):
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise MarksImportError('Expected a JSON array of objects')
+    return data
+
+
+def _numbers(rows, column):
+    """Column as floats, NaN where missing or not a number"""
+    values = []
+    for row in rows:
+        try:
+            values.append(float(row.get(column)))
+        except (TypeError, ValueError):
+            values.append(float('nan'))
+    return values
+
+
+def validate(rows, student_ids, department_of=None, department_id=None):
+    """
+    Return (accepted row dicts ready for insert, errors)
+
+    student_ids maps roll_no -> student_id; when department_id is given, rows
+    for students of other departments are rejected (department_of maps
+    roll_no -> department_id).
+    """
+    import numpy as np
+
+    n = len(rows)
+    problems = [[] for _ in range(n)]
+    bad = np.zeros(n, dtype=bool)
+
+    for column, low, high, message in RANGES:
+        values = np.array(_numbers(rows, column), dtype=float)
+        nan = np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            out_of_range = ~nan & ((values < low) | (values > high))
+        for i in np.flatnonzero(nan):
+            problems[i].append(f'{column} is missing or not a number')
+        for i in np.flatnonzero(out_of_range):
+            problems[i].append(message)
+        bad |= nan | out_of_range
+
+    semesters = np.array(_numbers(rows, 'semester'), dtype=float)
+    valid_semester = np.isin(semesters, SEMESTERS)
+    for i in np.flatnonzero(~valid_semester):
+        problems[i].append(f"semester must be one of {', '.join(map(str, SEMESTERS))}")
+    bad |= ~valid_semester
+
+    for i, row in enumerate(rows):
+        roll_no = str(row.get('roll_no') or '').strip()
+        if not str(row.get('subject_name') or '').strip():
+            problems[i].append('subject_name is required')
+        if roll_no not in student_ids:
+            problems[i].append(f"Unknown roll_no '{roll_no}'")
+        elif department_id is not None and department_of[roll_no] != department_id:
+            problems[i].append(f"Student '{roll_no}' is not in your department")
+        if problems[i]:
+            bad[i] = True
+
+    entry_date = datetime.utcnow()
+    accepted = [
+        {
+            'student_id': student_ids[str(rows[i]['roll_no']).strip()],
+            'semester': int(semesters[i]),
+            'subject_name': str(rows[i]['subject_name']).strip(),
+            'marks_obtained': float(rows[i]['marks_obtained']),
+            'attendance_percentage': float(rows[i]['attendance_percentage']),
+            'internal_marks': float(rows[i]['internal_marks']),
+            'assignment_score': float(rows[i]['assignment_score']),
+            'entry_date': entry_date
+        }
+        for i in np.flatnonzero(~bad)
+    ]
+    # Row numbers are 1-based data rows (CSV header excluded)
+    errors = [{'row': int(i) + 1, 'errors': problems[i]} for i in np.flatnonzero(bad)]
+    return accepted, errors
+
+
+def _chunks(items, size=_IN_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def lookup_students(session, rows):
+    """roll_no -> student_id and roll_no -> department_id for every roll_no in rows, in a few IN queries"""
+    roll_nos = {str(row.get('roll_no') or '').strip() for row in rows}
+    ids, departments = {}, {}
+    for chunk in _chunks(roll_nos):
+        for student_id, roll_no, department_id in session.execute(
+            Student.__table__.select().with_only_columns(Student.student_id, Student.roll_no, Student.department_id)
+            .where(Student.roll_no.in_(chunk))
+        ):
+            ids[roll_no] = student_id
+            departments[roll_no] = department_id
+    return ids, departments
+
+
+def update_predictions(session, pairs, predictor):
+    """Recompute one prediction per (student_id, semester) from grouped averages, scored in one batch; returns the count"""
+    student_ids = {student_id for student_id, _ in pairs}
+    averages, extras = [], {}
+    for chunk in _chunks(student_ids):
+        averages.extend(session.execute(
+            Marks.__table__.select().with_only_columns(
+                Marks.student_id, Marks.semester, func.avg(Marks.marks_obtained),
+                func.avg(Marks.attendance_percentage), func.avg(Marks.internal_marks),
+                func.avg(Marks.assignment_score)
+            ).where(Marks.student_id.in_(chunk)).group_by(Marks.student_id, Marks.semester)
+        ))
+        for model, index in ((Certification, 0), (Competition, 1)):
+            for student_id, count in session.execute(
+                model.__table__.select().with_only_columns(model.student_id, func.count())
+                .where(model.student_id.in_(chunk)).group_by(model.student_id)
+            ):
+                extras.setdefault(student_id, [0, 0])[index] = count
+
+    averages = [row for row in averages if (row[0], row[1]) in pairs]
+    features = [row[2:] + tuple(extras.get(row[0], (0, 0))) for row in averages]
+    scores, categories = predictor.predict_batch(features)
+    generated_at = datetime.utcnow()
+    predictions = [{
+        'student_id': row[0],
+        'semester': row[1],
+        'prediction_result': category,
+        'prediction_score': score,
+        'generated_at': generated_at
+    } for row, category, score in zip(averages, categories, scores)]
+    if predictions:
+        session.execute(insert(Prediction), predictions)
+    return len(predictions)
+
+
+def import_marks(session, rows, predictor=None, department=None, strict=False):
+    """
+    Validate and insert rows; returns a summary dict
+
+    department restricts the import to one department's students (staff).
+    With strict=True nothing is inserted if any row is rejected. When a
+    predictor is given, affected (student, semester) predictions are
+    recomputed once after the insert, in the same transaction.
+    """
+    student_ids, department_of = lookup_students(session, rows)
+    # -1 matches no student when the department is unknown
+    department_id = (lookup_department_id(session, department) or -1) if department else None
+    accepted, errors = validate(rows, student_ids, department_of, department_id)
+
+    summary = {
+        'received': len(rows),
+        'inserted': 0,
+        'rejected': len(errors),
+        'predictions_updated': 0,
+        'errors': errors[:MAX_REPORTED_ERRORS],
+        'errors_truncated': len(errors) > MAX_REPORTED_ERRORS
+    }
+    if not accepted or (strict and errors):
+        return summary
+
+    try:
+        session.execute(insert(Marks), accepted)
+        summary['inserted'] = len(accepted)
+        if predictor is not None:
+            pairs = {(row['student_id'], row['semester']) for row in accepted}
+            summary['predictions_updated'] = update_predictions(session, pairs, predictor)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return summary
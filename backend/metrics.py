@@ -0,0 +1,208 @@
+"""
+Request Metrics - Latency, SQL and predictor instrumentation
+
+Records, per endpoint:
+    - request latency histogram and request count by status
+    - number of SQL statements and total SQL time per request (SQLAlchemy
+      cursor events), so N+1 loops show up as a high statement count
+    - response size histogram
+and predictor call latency. /metrics exposes everything in the Prometheus
+text format. Recording is a few perf_counter() calls and dict updates under
+one lock; nothing runs between requests.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+from backend.serializers import on_body_sent
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, bound)} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, "+Inf")} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, labels, value=1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+def _format_labels(names, values, le=None):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter('http_requests_total', 'Requests by endpoint, method and status',
+                                ('endpoint', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Request latency',
+                                 ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.response_size = Histogram('http_response_size_bytes', 'Response body size',
+                                       ('endpoint', 'method'), SIZE_BUCKETS)
+        self.sql_statements = Histogram('sql_statements_per_request', 'SQL statements issued per request',
+                                        ('endpoint', 'method'), SQL_COUNT_BUCKETS)
+        self.sql_seconds = Histogram('sql_duration_seconds_per_request', 'Total SQL time per request',
+                                     ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.sql_outside_requests = Counter('sql_statements_outside_request_total',
+                                            'SQL statements issued outside a request (CLI, startup)', ())
+        self.predictor = Histogram('predictor_duration_seconds', 'Predictor call latency',
+                                   (), LATENCY_BUCKETS)
+        self.coalesced = Counter('coalesced_requests_total',
+                                 "Requests answered with another request's computation (backend/coalesce.py)",
+                                 ('endpoint', 'source'))
+        self.shed = Counter('shed_requests_total', 'Requests refused with 503 by an endpoint concurrency limit',
+                            ('endpoint',))
+
+    def all(self):
+        return (self.requests, self.latency, self.response_size, self.sql_statements,
+                self.sql_seconds, self.sql_outside_requests, self.predictor, self.coalesced, self.shed)
+
+    # Hooks
+
+    def before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+
+    def after_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        labels = (request.endpoint or 'unmatched', request.method)
+        if response.is_streamed:
+            # The body, and the SQL behind it, is produced after this hook: record once it has been sent
+            request_g, status = g._get_current_object(), response.status_code
+            return on_body_sent(response, lambda size: self._record(labels, status, start, request_g, size))
+        self._record(labels, response.status_code, start, g, response.content_length)
+        return response
+
+    def _record(self, labels, status, start, request_g, size):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.requests.inc(labels + (status,))
+            self.latency.observe(labels, elapsed)
+            self.sql_statements.observe(labels, request_g.sql_count)
+            self.sql_seconds.observe(labels, request_g.sql_seconds)
+            if size is not None:
+                self.response_size.observe(labels, size)
+
+    def inc(self, counter, labels, value=1):
+        with self._lock:
+            counter.inc(labels, value)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+        if has_request_context() and 'sql_count' in g:
+            g.sql_count += 1
+            g.sql_seconds += elapsed
+        else:
+            with self._lock:
+                self.sql_outside_requests.inc(())
+
+    def handle_error(self, context):
+        # A failed statement never reaches after_cursor_execute
+        starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    def time_predictor(self, predict):
+        """Wrap a predict function so each call is observed"""
+        def timed_predict(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return predict(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.predictor.observe((), elapsed)
+        return timed_predict
+
+    def expose(self):
+        with self._lock:
+            lines = []
+            for metric in self.all():
+                lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+# Global metrics registry
+metrics = Metrics()
+
+
+def init_metrics(app, db, predictor, token=None):
+    """
+    Register request hooks, SQL cursor events, predictor timing and /metrics
+
+    Register before hooks that rewrite the body (compression) so the size
+    recorded is what goes on the wire. If token is set, /metrics requires
+    an "Authorization: Bearer <token>" header.
+    """
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', metrics.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', metrics.after_cursor_execute)
+        event.listen(engine, 'handle_error', metrics.handle_error)
+
+    predictor.predict = metrics.time_predictor(predictor.predict)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return {'error': 'Not authenticated'}, 401
+        return Response(metrics.expose(), mimetype='text/plain; version=0.0.4')
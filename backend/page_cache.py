@@ -0,0 +1,100 @@
+"""
+Pre-rendered Page Cache - Static HTML routes served from memory
+
+The page templates take no context, so every request rendered the same bytes.
+PageCache renders each template once (at startup via warm(), or on first hit),
+keeps the HTML and a gzip copy alongside an ETag, and answers later requests
+straight from memory, including 304s for browsers that already have the page.
+
+In debug mode each hit compares the template and asset manifest mtimes with
+the ones seen at render time and re-renders when either changed.
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import current_app, render_template, request, Response
+
+from backend.assets import MANIFEST_PATH
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+class CachedPage:
+    __slots__ = ('body', 'gzip_body', 'etag', 'template_mtime', 'manifest_mtime')
+
+    def __init__(self, body, template_mtime, manifest_mtime):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.template_mtime = template_mtime
+        self.manifest_mtime = manifest_mtime
+
+
+class PageCache:
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def _template_path(self, template_name):
+        app = current_app
+        return os.path.join(app.root_path, app.template_folder, template_name)
+
+    def _render(self, template_name):
+        template_mtime = _mtime(self._template_path(template_name))
+        manifest_mtime = _mtime(MANIFEST_PATH)
+        body = render_template(template_name).encode('utf-8')
+        return CachedPage(body, template_mtime, manifest_mtime)
+
+    def _is_stale(self, template_name, page):
+        return (page.template_mtime != _mtime(self._template_path(template_name))
+                or page.manifest_mtime != _mtime(MANIFEST_PATH))
+
+    def get(self, template_name):
+        """Return the cached page, rendering it on first use"""
+        page = self._pages.get(template_name)
+        if page is not None and not (current_app.debug and self._is_stale(template_name, page)):
+            return page
+
+        with self._lock:
+            page = self._pages.get(template_name)
+            if page is None or (current_app.debug and self._is_stale(template_name, page)):
+                page = self._pages[template_name] = self._render(template_name)
+        return page
+
+    def warm(self, template_names):
+        """Render templates ahead of the first request (needs an app context)"""
+        for template_name in template_names:
+            self._pages[template_name] = self._render(template_name)
+
+    def clear(self):
+        """Forget every rendered page, e.g. after rebuilding assets"""
+        with self._lock:
+            self._pages.clear()
+
+    def response(self, template_name):
+        """Build a response for the current request from the cached page"""
+        page = self.get(template_name)
+
+        if request.accept_encodings['gzip']:
+            response = Response(page.gzip_body, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(page.etag + '-gz')
+        else:
+            response = Response(page.body, mimetype='text/html')
+            response.set_etag(page.etag)
+
+        # Page URLs are not fingerprinted: allow caching but always revalidate
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response.make_conditional(request)
+
+
+# Global page cache instance
+page_cache = PageCache()
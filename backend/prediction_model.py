@@ -1,38 +1,81 @@
 """
 ML Prediction Model for Student Performance
 Uses Linear Regression to predict performance
+
+pandas, scikit-learn and joblib are imported, and the saved model loaded,
+on first use (or by warm_up()), so importing the app stays fast for CLI
+commands and for routes that never predict.
 """
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-import joblib
+import hashlib
 import os
+import threading
 
 class PerformancePredictor:
     def __init__(self):
-        self.model = LinearRegression()
-        self.scaler = StandardScaler()
+        self.model = None
+        self.scaler = None
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.model_path = os.path.join(self.base_dir, 'trained_model.pkl')
         self.scaler_path = os.path.join(self.base_dir, 'trained_scaler.pkl')
-        self.is_trained = False
-        self.load_model()
+        self._trained = False
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._version = None
+    
+    @property
+    def is_trained(self):
+        self._ensure_loaded()
+        return self._trained
+    
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load_model()
+    
+    @property
+    def version(self):
+        """Fingerprint of the saved model and scaler ('rules' when untrained); changes on every retrain"""
+        self._ensure_loaded()
+        if not self._trained:
+            return 'rules'
+        if self._version is None:
+            digest = hashlib.sha1()
+            for path in (self.model_path, self.scaler_path):
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            self._version = digest.hexdigest()[:12]
+        return self._version
+    
+    def warm_up(self):
+        """Import the ML libraries and load the saved model now instead of on the first prediction"""
+        import numpy  # noqa: F401
+        import sklearn.linear_model  # noqa: F401
+        self._ensure_loaded()
     
     def load_model(self):
         """Load pre-trained model if exists"""
+        import joblib
+        
         if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
             try:
                 self.model = joblib.load(self.model_path)
                 self.scaler = joblib.load(self.scaler_path)
-                self.is_trained = True
+                self._trained = True
+                self._version = None
             except Exception:
-                self.is_trained = False
+                self._trained = False
         else:
-            self.is_trained = False
+            self._trained = False
+        self._loaded = True
     
     def train(self, training_data_path=None):
         """Train the model on historical data"""
+        import joblib
+        import pandas as pd
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import StandardScaler
+        
         if training_data_path is None:
             training_data_path = os.path.join(self.base_dir, 'training_data.csv')
 
@@ -45,16 +88,22 @@ class PerformancePredictor:
             y = df['performance_score'].values
             
             # Scale features
-            X_scaled = self.scaler.fit_transform(X)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
             
             # Train model
-            self.model.fit(X_scaled, y)
+            model = LinearRegression()
+            model.fit(X_scaled, y)
             
             # Save model
-            joblib.dump(self.model, self.model_path)
-            joblib.dump(self.scaler, self.scaler_path)
+            joblib.dump(model, self.model_path)
+            joblib.dump(scaler, self.scaler_path)
             
-            self.is_trained = True
+            self.model = model
+            self.scaler = scaler
+            self._trained = True
+            self._loaded = True
+            self._version = None
             return True
         except Exception as e:
             print(f"Error training model: {e}")
@@ -80,6 +129,8 @@ class PerformancePredictor:
             return self._rule_based_prediction(marks_obtained, attendance_percentage, internal_marks, assignment_score, certifications, competitions)
         
         try:
+            import numpy as np
+            
             # Prepare features (6 features)
             features = np.array([[marks_obtained, attendance_percentage, internal_marks, assignment_score, certifications, competitions]])
             
@@ -114,6 +165,45 @@ class PerformancePredictor:
             print(f"Error in prediction: {e}")
             return self._rule_based_prediction(marks_obtained, attendance_percentage, internal_marks, assignment_score, certifications, competitions)
     
+    def predict_batch(self, features):
+        """
+        Vectorized predict() for many students/semesters at once
+        
+        Args:
+            features: N x 6 array-like, columns in predict()'s argument order
+        
+        Returns:
+            (scores, categories) lists, the same values predict() gives row by row
+        """
+        import numpy as np
+        
+        features = np.asarray(features, dtype=float).reshape(-1, 6)
+        if not len(features):
+            return [], []
+        
+        scores = None
+        if self.is_trained:
+            try:
+                scores = self.model.predict(self.scaler.transform(features))
+            except Exception as e:
+                print(f"Error in prediction: {e}")
+        if scores is None:
+            scores = self._rule_based_scores(features)
+        
+        scores = np.clip(scores, 0, 100)
+        categories = np.where(scores >= 75, 'Good Performance',
+                              np.where(scores >= 50, 'Average Performance', 'At-Risk Performance'))
+        return np.round(scores, 2).tolist(), categories.tolist()
+    
+    def _rule_based_scores(self, features):
+        """_rule_based_prediction's score for every row of an N x 6 array"""
+        import numpy as np
+        
+        marks, attendance, internal, assignment, certifications, competitions = features.T
+        academic_score = marks * 0.40 + attendance * 0.30 + (internal / 50) * 100 * 0.20 + (assignment / 20) * 100 * 0.10
+        extracurricular_bonus = np.minimum(certifications * 2, 6) + np.minimum(competitions * 3, 4)
+        return academic_score * 0.90 + extracurricular_bonus * 0.10
+    
     def _rule_based_prediction(self, marks_obtained, attendance_percentage, internal_marks, assignment_score, certifications=0, competitions=0):
         """
         Enhanced rule-based prediction when ML model is not available
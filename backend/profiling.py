@@ -0,0 +1,116 @@
+"""
+On-demand Request Profiling - cProfile one request without redeploying
+
+A request is profiled when it carries the operator token (X-Profile header
+or ?_profile= query argument, matching PROFILE_TOKEN) or when it is picked by
+PROFILE_SAMPLE_RATE. The profile is written to PROFILE_DIR as a .prof file
+(open with `python -m pstats`, snakeviz or any pstats viewer) together with
+a .sql.txt file listing every SQL statement the request issued, its time
+and the types (not the values) of its parameters.
+The response carries the file name in an X-Profile-File header. A streamed
+response is profiled until its body has been sent; its file name ends in
+_streamed instead of the time, which is only known after the header is sent.
+
+Requests that are not profiled pay for one dict lookup and, per SQL
+statement, one check of flask.g.
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from backend.serializers import on_body_sent
+from backend.slow_queries import parameter_shape
+
+
+def _wants_profile(token, sample_rate):
+    if token:
+        supplied = request.headers.get('X-Profile') or request.args.get('_profile')
+        if supplied and hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def init_profiling(app, db, token=None, sample_rate=0.0, profile_dir='profiles'):
+    """Register the profiling hooks; does nothing if neither token nor sampling is configured"""
+    if not token and sample_rate <= 0:
+        return
+
+    os.makedirs(profile_dir, exist_ok=True)
+
+    @app.before_request
+    def start_profile():
+        if not _wants_profile(token, sample_rate):
+            return
+        g.profile_sql = []
+        g.profile_start = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    def write_profile(profiler, statements, name, elapsed, method, path):
+        profiler.dump_stats(os.path.join(profile_dir, name + '.prof'))
+        with open(os.path.join(profile_dir, name + '.sql.txt'), 'w') as f:
+            f.write(f"{method} {path}\n")
+            f.write(f"total {elapsed * 1000:.2f} ms, {len(statements)} SQL statements, "
+                    f"{sum(s[0] for s in statements) * 1000:.2f} ms in SQL\n\n")
+            for duration, statement, shape in statements:
+                f.write(f"-- {duration * 1000:.3f} ms  params={shape}\n{statement}\n\n")
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        start = g.profile_start
+        endpoint = re.sub(r'[^\w.-]', '_', request.endpoint or 'unmatched')
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        method, path = request.method, request.full_path
+
+        if response.is_streamed:
+            # Keep profiling while the body is produced; the header goes out before the time is known
+            name = f"{stamp}_{endpoint}_streamed"
+            request_g = g._get_current_object()
+
+            def body_sent(size):
+                profiler.disable()
+                write_profile(profiler, request_g.pop('profile_sql', []), name, time.perf_counter() - start,
+                              method, path)
+
+            response.headers['X-Profile-File'] = name + '.prof'
+            return on_body_sent(response, body_sent)
+
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        name = f"{stamp}_{endpoint}_{elapsed * 1000:.0f}ms"
+        write_profile(profiler, g.pop('profile_sql'), name, elapsed, method, path)
+        response.headers['X-Profile-File'] = name + '.prof'
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exc):
+        # after_request is skipped when the view raised
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'profile_sql' in g:
+            conn.info['profile_query_start'] = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop('profile_query_start', None)
+        if start is not None and has_request_context() and 'profile_sql' in g:
+            # Parameter types only: values include password hashes and student details
+            g.profile_sql.append((time.perf_counter() - start, statement, parameter_shape(parameters, executemany)))
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
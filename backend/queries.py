@@ -0,0 +1,37 @@
+"""
+Shared Queries - SQL building blocks used by routes, jobs and in-memory indexes
+
+Kept out of the blueprints so backend modules (cohort index, jobs, re-scoring)
+build the same queries as the routes without importing a route module.
+"""
+from sqlalchemy import func, select
+
+from models import Prediction
+
+
+def latest_predictions(*criteria, per_semester=False):
+    """
+    Subquery with each student's most recent prediction (one row per student), optionally only where criteria hold
+
+    per_semester=True keeps the most recent one of each (student, semester)
+    instead, e.g. the row that re-scoring replaces.
+    """
+    partition = (Prediction.student_id, Prediction.semester) if per_semester else (Prediction.student_id,)
+    ranked = select(
+        Prediction.prediction_id,
+        Prediction.student_id,
+        Prediction.semester,
+        Prediction.prediction_result,
+        Prediction.prediction_score,
+        func.row_number().over(
+            partition_by=partition,
+            order_by=(Prediction.generated_at.desc(), Prediction.prediction_id.desc())
+        ).label('row_number')
+    ).where(*criteria).subquery()
+    return select(
+        ranked.c.prediction_id,
+        ranked.c.student_id,
+        ranked.c.semester,
+        ranked.c.prediction_result,
+        ranked.c.prediction_score
+    ).where(ranked.c.row_number == 1).subquery('latest_prediction')
@@ -0,0 +1,167 @@
+"""
+Cohort Re-scoring - bring every stored prediction onto the current model
+
+After a retrain, existing Prediction rows still hold the old model's scores.
+rescore_cohort() recomputes each semester's current one, one department per task:
+    - a worker process reads the department's (student, semester) feature
+      vectors with one grouped query (semester averages of the four marks
+      columns, certification and competition counts per student)
+    - it scores them with a single predictor.predict_batch() call
+    - the parent writes each department's results as a bulk upsert (into a
+      temp table, then one UPDATE of each semester's latest prediction and
+      one INSERT for semesters that had marks but no prediction), in one
+      transaction; earlier predictions of a semester are kept as history
+Departments already in `done` are skipped, so an interrupted run resumes;
+the rescore_students job (backend/jobs.py) checkpoints after each department.
+
+    flask --app app rescore --workers 4
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from sqlalchemy import column, func, select, table, update
+
+from config import RESCORE_WORKERS
+from models import db, Student, Department, Marks, Certification, Competition, Prediction
+from backend.queries import latest_predictions
+
+RESCORE_RESULTS = table('rescore_results', column('student_id'), column('semester'),
+                        column('prediction_result'), column('prediction_score'))
+
+_app = None
+
+
+def feature_query(department_id):
+    """(student_id, semester, avg marks, avg attendance, avg internal, avg assignment, certifications, competitions)"""
+    students = select(Student.student_id).where(Student.department_id == department_id)
+    cert_counts = (select(Certification.student_id, func.count().label('n'))
+                   .where(Certification.student_id.in_(students)).group_by(Certification.student_id).subquery())
+    comp_counts = (select(Competition.student_id, func.count().label('n'))
+                   .where(Competition.student_id.in_(students)).group_by(Competition.student_id).subquery())
+    return (
+        select(
+            Marks.student_id, Marks.semester,
+            func.avg(Marks.marks_obtained), func.avg(Marks.attendance_percentage),
+            func.avg(Marks.internal_marks), func.avg(Marks.assignment_score),
+            func.coalesce(cert_counts.c.n, 0), func.coalesce(comp_counts.c.n, 0)
+        )
+        .outerjoin(cert_counts, cert_counts.c.student_id == Marks.student_id)
+        .outerjoin(comp_counts, comp_counts.c.student_id == Marks.student_id)
+        .where(Marks.student_id.in_(students))
+        .group_by(Marks.student_id, Marks.semester)
+    )
+
+
+def score_department(department_id, department):
+    """Rows (student_id, semester, category, score) for one department; runs in a worker process"""
+    from backend.prediction_model import predictor
+    from backend.storage import read_session
+
+    with _app.app_context():
+        rows = read_session.execute(feature_query(department_id)).all()
+        read_session.remove()
+    if not rows:
+        return department, 0, []
+
+    scores, categories = predictor.predict_batch([row[2:] for row in rows])
+    students = len({row[0] for row in rows})
+    return department, students, [(row[0], row[1], category, score)
+                                  for row, category, score in zip(rows, categories, scores)]
+
+
+def _init_worker(app):
+    global _app
+    from backend.storage import reset_after_fork
+    _app = app
+    reset_after_fork(app, db)
+
+
+def upsert_predictions(session, results):
+    """Write (student_id, semester, category, score) rows: update each semester's latest prediction, insert the rest"""
+    conn = session.connection()
+    conn.exec_driver_sql(
+        'CREATE TEMP TABLE IF NOT EXISTS rescore_results ('
+        'student_id INTEGER, semester INTEGER, prediction_result TEXT, prediction_score REAL, '
+        'PRIMARY KEY (student_id, semester))'
+    )
+    conn.exec_driver_sql('DELETE FROM rescore_results')
+    conn.exec_driver_sql('INSERT INTO rescore_results VALUES (?, ?, ?, ?)', results)
+    # Only the current prediction of each semester is replaced; older rows stay as history
+    latest = latest_predictions(Prediction.student_id.in_(select(RESCORE_RESULTS.c.student_id)), per_semester=True)
+    updated = conn.execute(
+        update(Prediction)
+        .values(prediction_result=RESCORE_RESULTS.c.prediction_result,
+                prediction_score=RESCORE_RESULTS.c.prediction_score)
+        .where(Prediction.prediction_id == latest.c.prediction_id,
+               latest.c.student_id == RESCORE_RESULTS.c.student_id,
+               latest.c.semester == RESCORE_RESULTS.c.semester)
+    ).rowcount
+    # Same timestamp format SQLAlchemy's DateTime writes
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    inserted = conn.exec_driver_sql(
+        'INSERT INTO predictions (student_id, semester, prediction_result, prediction_score, generated_at) '
+        'SELECT r.student_id, r.semester, r.prediction_result, r.prediction_score, ? FROM rescore_results AS r '
+        'WHERE NOT EXISTS (SELECT 1 FROM predictions AS p WHERE p.student_id = r.student_id AND p.semester = r.semester) '
+        'ORDER BY r.student_id, r.semester',
+        (now,)
+    ).rowcount
+    conn.exec_driver_sql('DELETE FROM rescore_results')
+    return updated, inserted
+
+
+def rescore_cohort(workers=RESCORE_WORKERS, done=(), on_department=None, log=print):
+    """
+    Re-score every department not in done; returns a throughput summary
+
+    Call inside an app context. on_department(department, summary) runs
+    after each department's upsert, before db.session commits it, so the
+    rescore_students job saves its checkpoint in the same transaction.
+    """
+    from flask import current_app
+    from backend.prediction_model import predictor
+
+    global _app
+    _app = current_app._get_current_object()
+    # Load the model once here; forked workers inherit it
+    predictor.warm_up()
+
+    start = time.perf_counter()
+    summary = {'model_version': predictor.version, 'departments': 0, 'students': 0,
+               'predictions_updated': 0, 'predictions_inserted': 0}
+    done = set(done)
+    departments = [(department_id, name) for department_id, name in db.session.execute(
+        select(Department.department_id, Department.name)
+        .where(Department.department_id.in_(select(Student.department_id))).order_by(Department.name)
+    ) if name not in done]
+    db.session.commit()
+
+    def write(department, students, results):
+        updated, inserted = upsert_predictions(db.session, results) if results else (0, 0)
+        summary['departments'] += 1
+        summary['students'] += students
+        summary['predictions_updated'] += updated
+        summary['predictions_inserted'] += inserted
+        if on_department:
+            on_department(department, summary)
+        db.session.commit()
+        if log:
+            elapsed = time.perf_counter() - start
+            log(f"[rescore] {department}: {students} students, {len(results)} semesters "
+                f"({summary['students'] / elapsed:,.0f} students/s so far)")
+
+    # Workers get the app and loaded model by forking; without fork (or with one worker) score inline
+    if workers > 1 and len(departments) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(min(workers, len(departments)), mp_context=context,
+                                 initializer=_init_worker, initargs=(_app,)) as pool:
+            for future in as_completed([pool.submit(score_department, *d) for d in departments]):
+                write(*future.result())
+    else:
+        for department in departments:
+            write(*score_department(*department))
+
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    summary['students_per_second'] = round(summary['students'] / summary['seconds']) if summary['seconds'] else None
+    return summary
@@ -0,0 +1,186 @@
+"""
+Roster Import - onboard a department's intake of students from a CSV
+
+CSV columns: roll_no, name, year, and optionally email, password and
+department (which must match the roster's department when present). Rows
+without a password get the default password passed to the import.
+
+Instead of the signup route's query + set_password per student:
+    - roll numbers are checked against existing students with one query
+      (the whole list is passed as a single JSON parameter)
+    - from the CLI, passwords are hashed in chunks across a process pool
+      for rosters of ROSTER_HASH_PARALLEL_MIN rows or more (inline below
+      that, where the pool's startup costs more than the hashing); the
+      HTTP route always hashes inline, as forking a multi-threaded server
+      process can deadlock
+    - rows are inserted with executemany in one transaction
+A progress callback receives (phase, done, total) after every chunk.
+
+    POST /api/staff/import-roster         (CSV body or "file" upload; X-Default-Password)
+    flask --app app import-roster intake.csv --department CSE --password changeme
+"""
+import csv
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import insert, text
+
+from config import YEARS, ROSTER_HASH_PARALLEL_MIN, ROSTER_CHUNK_SIZE
+from models import Student, hash_password
+from backend.departments import department_key, lookup_department_id
+
+REQUIRED_COLUMNS = ('roll_no', 'name', 'year')
+MIN_PASSWORD_LENGTH = 6  # Same rule as /api/auth/student/signup
+MAX_REPORTED_ERRORS = 1000
+
+
+class RosterImportError(ValueError):
+    """The roster as a whole can't be read or imported"""
+
+
+def parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or ())]
+    if missing:
+        raise RosterImportError(f"CSV is missing columns: {', '.join(missing)}")
+    return list(reader)
+
+
+def existing_roll_numbers(session, roll_nos):
+    """The subset of roll_nos already registered, in one query regardless of roster size"""
+    return set(session.execute(
+        text('SELECT roll_no FROM students WHERE roll_no IN (SELECT value FROM json_each(:roll_nos))'),
+        {'roll_nos': json.dumps(list(roll_nos))}
+    ).scalars())
+
+
+def _hash_chunk(passwords):
+    return [hash_password(password) for password in passwords]
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def hash_passwords(passwords, workers=1, progress=None):
+    """Hashes in input order, across a process pool of `workers` when the roster is large enough"""
+    chunks = list(_chunks(passwords, ROSTER_CHUNK_SIZE))
+    hashes = []
+    if workers > 1 and len(passwords) >= ROSTER_HASH_PARALLEL_MIN:
+        with ProcessPoolExecutor(workers) as pool:
+            for chunk in pool.map(_hash_chunk, chunks):
+                hashes.extend(chunk)
+                if progress:
+                    progress('hash', len(hashes), len(passwords))
+    else:
+        for chunk in chunks:
+            hashes.extend(_hash_chunk(chunk))
+            if progress:
+                progress('hash', len(hashes), len(passwords))
+    return hashes
+
+
+def validate(rows, department, default_password=None):
+    """Return (accepted rows with their passwords, errors); duplicates in the file are rejected here"""
+    accepted, errors = [], []
+    seen = set()
+    for i, row in enumerate(rows, start=1):
+        problems = []
+        roll_no = str(row.get('roll_no') or '').strip()
+        name = str(row.get('name') or '').strip()
+        password = row.get('password') or default_password
+        row_department = str(row.get('department') or '').strip()
+
+        if not roll_no:
+            problems.append('roll_no is required')
+        elif roll_no in seen:
+            problems.append(f"Duplicate roll_no '{roll_no}' in file")
+        if not name:
+            problems.append('name is required')
+        try:
+            year = int(row.get('year'))
+            if year not in YEARS:
+                raise ValueError
+        except (TypeError, ValueError):
+            year = None
+            problems.append(f"year must be one of {', '.join(map(str, YEARS))}")
+        if not password:
+            problems.append('password is required (no default password given)')
+        elif len(password) < MIN_PASSWORD_LENGTH:
+            problems.append(f'Password must be at least {MIN_PASSWORD_LENGTH} characters')
+        if row_department and department_key(row_department) != department_key(department):
+            problems.append(f"department '{row_department}' does not match roster department '{department}'")
+
+        seen.add(roll_no)
+        if problems:
+            errors.append({'row': i, 'errors': problems})
+            continue
+        accepted.append(({
+            'name': name,
+            'roll_no': roll_no,
+            'department': department,
+            'year': year,
+            'email': str(row.get('email') or '').strip()
+        }, password))
+    return accepted, errors
+
+
+def import_roster(session, rows, department, default_password=None, strict=False, workers=1, progress=None):
+    """
+    Validate, hash and insert a roster; returns a summary with per-phase timings
+
+    With strict=True nothing is inserted if any row is rejected (including
+    roll numbers that already exist).
+    """
+    timings = {}
+    start = time.perf_counter()
+    accepted, errors = validate(rows, department, default_password)
+    taken = existing_roll_numbers(session, (student['roll_no'] for student, _ in accepted))
+    if taken:
+        row_of = {str(row.get('roll_no') or '').strip(): i for i, row in enumerate(rows, start=1)}
+        errors.extend({'row': row_of[roll_no], 'errors': ['Roll number already exists']} for roll_no in taken)
+        errors.sort(key=lambda error: error['row'])
+        accepted = [(student, password) for student, password in accepted if student['roll_no'] not in taken]
+    timings['validate'] = time.perf_counter() - start
+
+    summary = {
+        'department': department,
+        'received': len(rows),
+        'inserted': 0,
+        'rejected': len(errors),
+        'errors': errors[:MAX_REPORTED_ERRORS],
+        'errors_truncated': len(errors) > MAX_REPORTED_ERRORS,
+        'timings': timings
+    }
+    if not accepted or (strict and errors):
+        return summary
+
+    start = time.perf_counter()
+    hashes = hash_passwords([password for _, password in accepted], workers=workers, progress=progress)
+    timings['hash'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    created_at = datetime.utcnow()
+    # A department seen for the first time is added by the students insert trigger instead
+    department_id = lookup_department_id(session, department)
+    students = [dict(student, department_id=department_id, password_hash=password_hash, created_at=created_at)
+                for (student, _), password_hash in zip(accepted, hashes)]
+    try:
+        for done, chunk in enumerate(_chunks(students, ROSTER_CHUNK_SIZE), start=1):
+            session.execute(insert(Student), chunk)
+            if progress:
+                progress('insert', min(done * ROSTER_CHUNK_SIZE, len(students)), len(students))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    timings['insert'] = time.perf_counter() - start
+
+    summary['inserted'] = len(students)
+    total = sum(timings.values())
+    summary['students_per_second'] = round(len(students) / total) if total else None
+    return summary
@@ -1,21 +1,125 @@
 """
 Staff and HOD Routes - View Student Data
+
+Read routes query through read_session so they never wait on student
+writes; only the bulk imports and job enqueueing write.
 """
 from flask import Blueprint, request, jsonify, session
-from models import db, Student, Marks, Prediction, Certification, Competition
-import os
+from sqlalchemy import func
+from datetime import datetime, timedelta
+from models import db, Student, Marks, Prediction, Certification, Competition, Department, DepartmentAggregate, Job
+from config import (STREAM_BATCH_SIZE, DEPARTMENT_STATS_MAX_AGE, COHORT_INDEX, RANKING_MAX_LIMIT,
+                    SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, TITLE_SEARCH_PER_PAGE, TITLE_SEARCH_MAX_PER_PAGE)
+from backend.storage import read_session
+from backend.cohort_index import CATEGORIES, cohort_index
+from backend.coalesce import limit_concurrency, single_flight
+from backend.departments import department_id_of, department_key
+from backend.queries import latest_predictions
+from backend.fts import fts_table, match_expression, matches
+from backend.student_search import search_students
+from backend.serializers import Projection, batched, json_array_response, sql_date, sql_datetime, upload_url
 
 staff_bp = Blueprint('staff', __name__, url_prefix='/api/staff')
 
+# Column projections for listings (no full ORM entities, dates formatted by SQLite)
+STUDENT_FIELDS = Projection(
+    ('student_id', Student.student_id),
+    ('name', Student.name),
+    ('roll_no', Student.roll_no),
+    ('department', Student.department),
+    ('year', Student.year)
+)
+
+STUDENT_DETAIL_FIELDS = Projection(
+    ('name', Student.name),
+    ('roll_no', Student.roll_no),
+    ('department', Student.department),
+    ('year', Student.year),
+    ('email', Student.email)
+)
+
+MARK_FIELDS = Projection(
+    ('subject', Marks.subject_name),
+    ('marks', Marks.marks_obtained),
+    ('attendance', Marks.attendance_percentage),
+    ('internal', Marks.internal_marks),
+    ('assignment', Marks.assignment_score)
+)
+
+PREDICTION_FIELDS = Projection(
+    ('semester', Prediction.semester),
+    ('category', Prediction.prediction_result),
+    ('score', Prediction.prediction_score)
+)
+
+CERT_DETAIL_FIELDS = Projection(
+    ('title', Certification.cert_title),
+    ('issue_date', sql_date(Certification.issue_date)),
+    ('file_path', Certification.cert_file_path, upload_url)
+)
+
+COMP_DETAIL_FIELDS = Projection(
+    ('title', Competition.comp_title),
+    ('achievement', Competition.achievement_type),
+    ('event_date', sql_date(Competition.event_date)),
+    ('file_path', Competition.comp_file_path, upload_url)
+)
+
+CERT_FIELDS = Projection(
+    ('cert_id', Certification.cert_id),
+    ('title', Certification.cert_title),
+    ('file_path', Certification.cert_file_path, upload_url),
+    ('issue_date', sql_date(Certification.issue_date)),
+    ('upload_date', sql_datetime(Certification.upload_date))
+)
+
+CERT_WITH_STUDENT_FIELDS = Projection(
+    ('cert_id', Certification.cert_id),
+    ('student_id', Student.student_id),
+    ('student_name', Student.name),
+    ('student_roll_no', Student.roll_no),
+    ('student_department', Student.department),
+    ('student_year', Student.year),
+    ('title', Certification.cert_title),
+    ('file_path', Certification.cert_file_path, upload_url),
+    ('issue_date', sql_date(Certification.issue_date)),
+    ('upload_date', sql_datetime(Certification.upload_date))
+)
+
+COMP_WITH_STUDENT_FIELDS = Projection(
+    ('comp_id', Competition.comp_id),
+    ('student_id', Student.student_id),
+    ('student_name', Student.name),
+    ('student_roll_no', Student.roll_no),
+    ('student_department', Student.department),
+    ('student_year', Student.year),
+    ('title', Competition.comp_title),
+    ('achievement', Competition.achievement_type),
+    ('file_path', Competition.comp_file_path, upload_url),
+    ('event_date', sql_date(Competition.event_date)),
+    ('upload_date', sql_datetime(Competition.upload_date))
+)
+
 def check_staff_session():
     """Check if user is logged in as staff"""
     if 'user_id' not in session or session.get('user_type') not in ['staff', 'hod']:
         return False, jsonify({'error': 'Not authenticated'}), 401
     return True, None, None
 
+def shared_by_role():
+    """Single-flight key: HODs share responses with each other, staff with their department's staff"""
+    user_type = session.get('user_type')
+    if user_type == 'hod':
+        return ('hod',)
+    if user_type == 'staff':
+        return ('staff', department_key(session.get('department')))
+    return None
+
 # ==================== STAFF DASHBOARD ====================
 
 @staff_bp.route('/all-predictions', methods=['GET'])
+@single_flight(shared_by_role)
+@limit_concurrency
 def all_predictions():
     """Get predictions for all students in department"""
     authenticated, error, code = check_staff_session()
@@ -25,51 +129,62 @@ def all_predictions():
     user_type = session.get('user_type')
     department = session.get('department', '').strip() if session.get('department') else None
     
+    query = STUDENT_FIELDS.select()
+    pred_query = PREDICTION_FIELDS.select(Prediction.student_id, Prediction.generated_at, Prediction.prediction_id)
     if user_type == 'staff':
-        # Staff can only see their department (case-insensitive)
-        students = Student.query.filter(Student.department.ilike(department)).all()
-    else:  # hod
-        # HOD can see all students
-        students = Student.query.all()
-    
-    results = []
-    for student in students:
-        predictions = Prediction.query.filter_by(student_id=student.student_id).order_by(Prediction.semester).all()
-        
-        pred_data = {}
-        for pred in predictions:
-            pred_data[f'sem_{pred.semester}'] = {
-                'category': pred.prediction_result,
-                'score': pred.prediction_score
-            }
-        
-        # Get current prediction (latest)
-        latest_pred = Prediction.query.filter_by(student_id=student.student_id).order_by(Prediction.generated_at.desc()).first()
-        
-        # Handle case where no prediction exists (new student)
-        current_pred_data = {
-            'category': 'Not Available',
-            'score': 0,
-            'semester': 'N/A'
-        }
-        if latest_pred:
-            current_pred_data = {
-                'category': latest_pred.prediction_result,
-                'score': latest_pred.prediction_score,
-                'semester': latest_pred.semester
-            }
-        
-        results.append({
-            'student_id': student.student_id,
-            'name': student.name,
-            'roll_no': student.roll_no,
-            'department': student.department,
-            'year': student.year,
-            'all_predictions': pred_data,
-            'current_prediction': current_pred_data
-        })
-    
-    return jsonify({'students': results}), 200
+        # Staff can only see their department (any spelling of it)
+        department_id = department_id_of(department)
+        query = query.where(Student.department_id == department_id)
+        pred_query = pred_query.join(Student, Student.student_id == Prediction.student_id).where(
+            Student.department_id == department_id
+        )
+    # HOD can see all students
+    
+    def student_batches():
+        # Students and their predictions are both read in student_id order and merged,
+        # so only one batch of students is held in memory
+        predictions = iter(read_session.execute(
+            pred_query.order_by(Prediction.student_id, Prediction.semester)
+        ).yield_per(STREAM_BATCH_SIZE))
+        pending = next(predictions, None)
+
+        for rows in batched(read_session.execute(query.order_by(Student.student_id))):
+            batch = []
+            for row in rows:
+                student = STUDENT_FIELDS.dict(row)
+                student_id = student['student_id']
+
+                while pending is not None and pending[3] < student_id:
+                    pending = next(predictions, None)
+
+                pred_data = {}
+                latest = None
+                while pending is not None and pending[3] == student_id:
+                    semester, category, score, _, generated_at, prediction_id = pending
+                    pred_data[f'sem_{semester}'] = {
+                        'category': category,
+                        'score': score
+                    }
+                    # Current prediction is the latest generated one
+                    if latest is None or (generated_at, prediction_id) > latest[0]:
+                        latest = ((generated_at, prediction_id), pending)
+                    pending = next(predictions, None)
+
+                # Handle case where no prediction exists (new student)
+                current_pred_data = {
+                    'category': 'Not Available',
+                    'score': 0,
+                    'semester': 'N/A'
+                }
+                if latest is not None:
+                    current_pred_data = PREDICTION_FIELDS.dict(latest[1])
+
+                student['all_predictions'] = pred_data
+                student['current_prediction'] = current_pred_data
+                batch.append(student)
+            yield batch
+
+    return json_array_response('students', student_batches()), 200
 
 @staff_bp.route('/student-details/<int:student_id>', methods=['GET'])
 def student_details(student_id):
@@ -78,68 +193,36 @@ def student_details(student_id):
     if not authenticated:
         return error, code
     
-    student = Student.query.get(student_id)
+    student = read_session.execute(STUDENT_DETAIL_FIELDS.select().where(Student.student_id == student_id)).first()
     
     if not student:
         return jsonify({'error': 'Student not found'}), 404
     
     # Get marks
-    marks = Marks.query.filter_by(student_id=student_id).order_by(Marks.semester).all()
+    marks = read_session.execute(
+        MARK_FIELDS.select(Marks.semester).where(Marks.student_id == student_id).order_by(Marks.semester)
+    )
     marks_data = {}
-    for mark in marks:
-        sem = mark.semester
-        if sem not in marks_data:
-            marks_data[sem] = []
-        marks_data[sem].append({
-            'subject': mark.subject_name,
-            'marks': mark.marks_obtained,
-            'attendance': mark.attendance_percentage,
-            'internal': mark.internal_marks,
-            'assignment': mark.assignment_score
-        })
+    for row in marks:
+        marks_data.setdefault(row[-1], []).append(MARK_FIELDS.dict(row))
     
     # Get predictions
-    predictions = Prediction.query.filter_by(student_id=student_id).order_by(Prediction.semester).all()
-    pred_data = [
-        {
-            'semester': p.semester,
-            'category': p.prediction_result,
-            'score': p.prediction_score
-        }
-        for p in predictions
-    ]
+    pred_data = PREDICTION_FIELDS.dicts(read_session.execute(
+        PREDICTION_FIELDS.select().where(Prediction.student_id == student_id).order_by(Prediction.semester)
+    ))
     
     # Get certifications
-    certs = Certification.query.filter_by(student_id=student_id).all()
-    cert_data = [
-        {
-            'title': c.cert_title,
-            'issue_date': c.issue_date.strftime('%Y-%m-%d'),
-            'file_path': f"/uploads/{os.path.basename(c.cert_file_path)}"
-        }
-        for c in certs
-    ]
+    cert_data = CERT_DETAIL_FIELDS.dicts(read_session.execute(
+        CERT_DETAIL_FIELDS.select().where(Certification.student_id == student_id)
+    ))
     
     # Get competitions
-    comps = Competition.query.filter_by(student_id=student_id).all()
-    comp_data = [
-        {
-            'title': c.comp_title,
-            'achievement': c.achievement_type,
-            'event_date': c.event_date.strftime('%Y-%m-%d'),
-            'file_path': f"/uploads/{os.path.basename(c.comp_file_path)}"
-        }
-        for c in comps
-    ]
+    comp_data = COMP_DETAIL_FIELDS.dicts(read_session.execute(
+        COMP_DETAIL_FIELDS.select().where(Competition.student_id == student_id)
+    ))
     
     return jsonify({
-        'student': {
-            'name': student.name,
-            'roll_no': student.roll_no,
-            'department': student.department,
-            'year': student.year,
-            'email': student.email
-        },
+        'student': STUDENT_DETAIL_FIELDS.dict(student),
         'marks': marks_data,
         'predictions': pred_data,
         'certifications': cert_data,
@@ -159,22 +242,85 @@ def search_student():
         return jsonify({'error': 'Roll number required'}), 400
     
     # Case-insensitive search
-    student = Student.query.filter(Student.roll_no.ilike(roll_no)).first()
+    student = read_session.execute(STUDENT_FIELDS.select().where(Student.roll_no.ilike(roll_no)).limit(1)).first()
     
     if not student:
         return jsonify({'error': 'Student not found'}), 404
     
-    return jsonify({
-        'student_id': student.student_id,
-        'name': student.name,
-        'roll_no': student.roll_no,
-        'department': student.department,
-        'year': student.year
-    }), 200
+    return jsonify(STUDENT_FIELDS.dict(student)), 200
+
+@staff_bp.route('/search', methods=['GET'])
+def search():
+    """
+    Find students by roll number or name as you type
+
+    ?q= matches roll number and name prefixes (any word of the name) and,
+    from four characters, tolerates typos. Staff see their own department;
+    HODs see everyone, or one department with ?department=. ?limit= caps
+    the results (default 20).
+    """
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
+    
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Search query required'}), 400
+    limit = min(max(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), 1), SEARCH_MAX_LIMIT)
+    
+    department = session.get('department')
+    if session.get('user_type') == 'hod':
+        department = request.args.get('department', '').strip() or None
+    
+    matches = search_students(query, department, limit)
+    rows = {row[0]: row for row in read_session.execute(
+        STUDENT_FIELDS.select().where(Student.student_id.in_([student_id for student_id, _, _ in matches]))
+    )}
+    
+    students = []
+    for student_id, match, typos in matches:
+        row = rows.get(student_id)
+        if row is None:
+            # Deleted after the index was refreshed
+            continue
+        student = STUDENT_FIELDS.dict(row)
+        student['match'] = match
+        student['typos'] = typos
+        students.append(student)
+    
+    return jsonify({'query': query, 'students': students}), 200
 
 # ==================== HOD SPECIFIC ROUTES ====================
 
+def department_stats_snapshot():
+    """department-stats from the department_aggregates snapshot, or None if it is missing or stale"""
+    rows = read_session.execute(db.select(DepartmentAggregate).order_by(DepartmentAggregate.department)).scalars().all()
+    if not rows or min(row.updated_at for row in rows) < datetime.utcnow() - timedelta(seconds=DEPARTMENT_STATS_MAX_AGE):
+        return None
+    
+    prediction_count = sum(row.prediction_count for row in rows)
+    avg_score = sum(row.prediction_score_sum for row in rows) / prediction_count if prediction_count else 0
+    dept_stats = [{
+        'department': row.department,
+        'student_count': row.student_count,
+        'average_score': round(row.average_latest_score or 0, 2)
+    } for row in rows if row.department]
+    dept_stats.sort(key=lambda x: x['average_score'], reverse=True)
+    
+    return {
+        'total_students': sum(row.student_count for row in rows),
+        'average_score': round(avg_score, 2),
+        'performance_distribution': {
+            'good': sum(row.good_count for row in rows),
+            'average': sum(row.average_count for row in rows),
+            'at_risk': sum(row.at_risk_count for row in rows)
+        },
+        'department_breakdown': dept_stats
+    }
+
 @staff_bp.route('/department-stats', methods=['GET'])
+@single_flight(shared_by_role)
+@limit_concurrency
 def department_stats():
     """Get department-level statistics (HOD only)"""
     authenticated, error, code = check_staff_session()
@@ -184,42 +330,42 @@ def department_stats():
     if session.get('user_type') != 'hod':
         return jsonify({'error': 'Only HOD can access this'}), 403
     
-    # Total students
-    total_students = Student.query.count()
+    # Serve the snapshot kept by the rebuild_department_aggregates job while it is fresh enough
+    if DEPARTMENT_STATS_MAX_AGE > 0:
+        snapshot = department_stats_snapshot()
+        if snapshot is not None:
+            return jsonify(snapshot), 200
     
-    # Average performance across all students
-    all_predictions = Prediction.query.all()
-    avg_score = sum(p.prediction_score for p in all_predictions) / len(all_predictions) if all_predictions else 0
+    # Total students
+    total_students = read_session.execute(db.select(func.count(Student.student_id))).scalar()
     
-    # Performance distribution
-    good = len([p for p in all_predictions if p.prediction_result == 'Good Performance'])
-    average = len([p for p in all_predictions if p.prediction_result == 'Average Performance'])
-    at_risk = len([p for p in all_predictions if p.prediction_result == 'At-Risk Performance'])
+    # Average performance and distribution across all predictions, aggregated by SQLite
+    avg_score, good, average, at_risk = read_session.execute(db.select(
+        func.avg(Prediction.prediction_score),
+        func.count().filter(Prediction.prediction_result == 'Good Performance'),
+        func.count().filter(Prediction.prediction_result == 'Average Performance'),
+        func.count().filter(Prediction.prediction_result == 'At-Risk Performance')
+    )).one()
+    avg_score = avg_score or 0
     
     # Department-wise breakdown (Count and Avg Score)
     dept_stats = []
     
-    # Get all distinct departments
-    departments = db.session.query(Student.department).distinct().all()
+    # Student count and average latest score per department in one grouped query
+    latest = latest_predictions()
+    departments = read_session.execute(
+        db.select(Department.name, func.count(Student.student_id), func.avg(latest.c.prediction_score))
+        .join(Department, Department.department_id == Student.department_id)
+        .outerjoin(latest, latest.c.student_id == Student.student_id)
+        .group_by(Student.department_id)
+    )
     
-    for dept_row in departments:
-        dept_name = dept_row[0]
+    for dept_name, student_count, avg_dept_score in departments:
         if not dept_name:
             continue
-            
-        # Get students in this department
-        dept_students = Student.query.filter_by(department=dept_name).all()
-        student_count = len(dept_students)
         
-        # Calculate avg score for this department
-        dept_scores = []
-        for student in dept_students:
-            # Get latest prediction score
-            latest_pred = Prediction.query.filter_by(student_id=student.student_id).order_by(Prediction.generated_at.desc()).first()
-            if latest_pred:
-                dept_scores.append(latest_pred.prediction_score)
-        
-        avg_dept_score = sum(dept_scores) / len(dept_scores) if dept_scores else 0
+        # Students without a prediction don't count towards the average
+        avg_dept_score = avg_dept_score or 0
         
         dept_stats.append({
             'department': dept_name,
@@ -241,7 +387,33 @@ def department_stats():
         'department_breakdown': dept_stats
     }), 200
 
+def indexed_student_batches(matches):
+    """filter-students batches for cohort index rows: latest prediction from the index, names from the database"""
+    for start in range(0, len(matches), STREAM_BATCH_SIZE):
+        chunk = matches[start:start + STREAM_BATCH_SIZE]
+        student_ids = chunk['student_id'].tolist()
+        students = {row[0]: row for row in read_session.execute(
+            STUDENT_FIELDS.select().where(Student.student_id.in_(student_ids))
+        )}
+        batch = []
+        for student_id, category, score in zip(student_ids, chunk['category'].tolist(), chunk['score'].tolist()):
+            row = students.get(student_id)
+            if row is None:
+                # Deleted after the index was refreshed
+                continue
+            student = STUDENT_FIELDS.dict(row)
+            student['current_prediction'] = {
+                'category': CATEGORIES[category],
+                'score': score
+            } if category else {
+                'category': 'Not Available',
+                'score': 0
+            }
+            batch.append(student)
+        yield batch
+
 @staff_bp.route('/filter-students', methods=['GET'])
+@limit_concurrency
 def filter_students():
     """Filter students by year and/or department"""
     authenticated, error, code = check_staff_session()
@@ -251,44 +423,111 @@ def filter_students():
     year = request.args.get('year', type=int)
     department = request.args.get('department')
     
-    query = Student.query
+    if COHORT_INDEX:
+        return json_array_response('students', indexed_student_batches(cohort_index.filter(year, department))), 200
+    
+    # Students with their latest prediction (if any) in one query
+    latest = latest_predictions()
+    query = STUDENT_FIELDS.select(latest.c.prediction_result, latest.c.prediction_score).outerjoin(
+        latest, latest.c.student_id == Student.student_id
+    )
     
     if year:
-        query = query.filter_by(year=year)
+        query = query.where(Student.year == year)
     if department:
-        query = query.filter_by(department=department)
+        query = query.where(Student.department_id == department_id_of(department))
+    
+    def student_batches():
+        for rows in batched(read_session.execute(query)):
+            batch = []
+            for row in rows:
+                student = STUDENT_FIELDS.dict(row)
+                category, score = row[-2:]
+                
+                # Handle case where no prediction exists
+                current_pred_data = {
+                    'category': 'Not Available',
+                    'score': 0
+                }
+                if category is not None:
+                    current_pred_data = {
+                        'category': category,
+                        'score': score
+                    }
+
+                student['current_prediction'] = current_pred_data
+                batch.append(student)
+            yield batch
+    
+    return json_array_response('students', student_batches()), 200
+
+# ==================== RANKINGS ====================
+
+def ranking_department():
+    """Department a ranking query covers: staff always their own, HODs may choose with ?department="""
+    department = session.get('department')
+    if session.get('user_type') == 'hod':
+        department = request.args.get('department', '').strip() or department
+    return department
+
+@staff_bp.route('/at-risk', methods=['GET'])
+def at_risk_students():
+    """Students with the lowest latest scores in a department (?limit=, default 50)"""
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
     
-    students = query.all()
+    department = ranking_department()
+    if not department:
+        return jsonify({'error': 'Department required'}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 1), RANKING_MAX_LIMIT)
     
-    results = []
-    for student in students:
-        latest_pred = Prediction.query.filter_by(student_id=student.student_id).order_by(Prediction.generated_at.desc()).first()
-        
-        # Handle case where no prediction exists
-        current_pred_data = {
-            'category': 'Not Available',
-            'score': 0
+    lowest = cohort_index.lowest_scores(department, limit)
+    names = {row[0]: row for row in read_session.execute(
+        STUDENT_FIELDS.select().where(Student.student_id.in_([student_id for student_id, *_ in lowest]))
+    )}
+    
+    students = []
+    for position, (student_id, year, category, score) in enumerate(lowest, start=1):
+        row = names.get(student_id)
+        if row is None:
+            continue
+        student = STUDENT_FIELDS.dict(row)
+        student['position'] = position
+        student['current_prediction'] = {
+            'category': category,
+            'score': score
         }
-        if latest_pred:
-            current_pred_data = {
-                'category': latest_pred.prediction_result,
-                'score': latest_pred.prediction_score
-            }
+        students.append(student)
+    
+    # Canonical name, whatever spelling the session or ?department= used
+    department_id = cohort_index.department_code(department)
+    return jsonify({
+        'department': cohort_index.departments.get(department_id, department.strip()),
+        'students': students
+    }), 200
 
-        results.append({
-            'student_id': student.student_id,
-            'name': student.name,
-            'roll_no': student.roll_no,
-            'year': student.year,
-            'department': student.department,
-            'current_prediction': current_pred_data
-        })
+@staff_bp.route('/student-rank/<int:student_id>', methods=['GET'])
+def student_rank(student_id):
+    """A student's rank and percentile within their department, by latest score"""
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
+    
+    ranking = cohort_index.rank(student_id)
+    if ranking is None:
+        return jsonify({'error': 'Student not found'}), 404
     
-    return jsonify({'students': results}), 200
+    department_id = ranking.pop('department_id')
+    if session.get('user_type') == 'staff' and department_id != cohort_index.department_code(session.get('department') or ''):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify({'student_id': student_id, **ranking}), 200
 
 # ==================== CERTIFICATE VIEWING ====================
 
 @staff_bp.route('/all-certificates', methods=['GET'])
+@limit_concurrency
 def all_certificates():
     """Get all certificates from students in department"""
     authenticated, error, code = check_staff_session()
@@ -298,38 +537,86 @@ def all_certificates():
     user_type = session.get('user_type')
     department = session.get('department', '').strip() if session.get('department') else None
     
+    # Certificates joined with their student in one query
+    query = CERT_WITH_STUDENT_FIELDS.select().join(Student, Student.student_id == Certification.student_id)
     if user_type == 'staff':
-        # Staff can only see their department (case-insensitive)
-        students = Student.query.filter(Student.department.ilike(department)).all()
-    else:  # hod
-        # HOD can see all students
-        students = Student.query.all()
-    
-    student_ids = [s.student_id for s in students]
-    
-    # Get all certificates for these students
-    certs = Certification.query.filter(Certification.student_id.in_(student_ids)).all()
-    
-    results = []
-    for cert in certs:
-        student = Student.query.get(cert.student_id)
-        if student:
-            # Convert file path to accessible URL
-            file_url = f"/uploads/{os.path.basename(cert.cert_file_path)}"
-            results.append({
-                'cert_id': cert.cert_id,
-                'student_id': student.student_id,
-                'student_name': student.name,
-                'student_roll_no': student.roll_no,
-                'student_department': student.department,
-                'student_year': student.year,
-                'title': cert.cert_title,
-                'file_path': file_url,
-                'issue_date': cert.issue_date.strftime('%Y-%m-%d'),
-                'upload_date': cert.upload_date.strftime('%Y-%m-%d %H:%M:%S')
-            })
-    
-    return jsonify({'certificates': results}), 200
+        # Staff can only see their department (any spelling of it)
+        query = query.where(Student.department_id == department_id_of(department))
+    # HOD can see all students
+    
+    batches = batched(read_session.execute(query.order_by(Certification.cert_id)))
+    
+    return json_array_response('certificates', map(CERT_WITH_STUDENT_FIELDS.dicts, batches)), 200
+
+def date_arg(name):
+    """?name=YYYY-MM-DD as a date (None if absent); ValueError if malformed"""
+    value = request.args.get(name, '').strip()
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def title_search(model, key, fields, fts_name, date_column, result_key):
+    """
+    Shared body of the certificate and competition searches
+
+    ?q= matches every word as a title word prefix (FTS5); ?department=
+    (HOD; staff always see their own), ?year=, ?from= / ?to= (inclusive,
+    YYYY-MM-DD) filter; ?page= / ?per_page= paginate, newest upload first.
+    """
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
+    
+    try:
+        date_from, date_to = date_arg('from'), date_arg('to')
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    year = request.args.get('year', type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', TITLE_SEARCH_PER_PAGE, type=int), 1), TITLE_SEARCH_MAX_PER_PAGE)
+    
+    department = session.get('department')
+    if session.get('user_type') == 'hod':
+        department = request.args.get('department', '').strip() or None
+    
+    query = fields.select().join(Student, Student.student_id == model.student_id)
+    order = key.desc()
+    q = request.args.get('q', '').strip()
+    if q:
+        match = match_expression(q)
+        if not match:
+            return jsonify({'error': 'Search query must contain letters or digits'}), 400
+        # Drive the query from the full-text index, in rowid order, so LIMIT stops the scan early
+        fts = fts_table(fts_name)
+        query = query.join(fts, fts.c.rowid == key).where(matches(fts_name, match))
+        order = fts.c.rowid.desc()
+    if department:
+        query = query.where(Student.department_id == department_id_of(department))
+    if year:
+        query = query.where(Student.year == year)
+    if date_from:
+        query = query.where(date_column >= date_from)
+    if date_to:
+        query = query.where(date_column <= date_to)
+    
+    # One row past the page tells whether there is a next one, without counting every match
+    rows = read_session.execute(query.order_by(order).limit(per_page + 1).offset((page - 1) * per_page)).all()
+    return jsonify({
+        result_key: fields.dicts(rows[:per_page]),
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(rows) > per_page
+    }), 200
+
+@staff_bp.route('/search-certificates', methods=['GET'])
+def search_certificates():
+    """Certificates by title words, department, student year and issue date range (paginated)"""
+    return title_search(Certification, Certification.cert_id, CERT_WITH_STUDENT_FIELDS, 'certification_fts',
+                        Certification.issue_date, 'certificates')
+
+@staff_bp.route('/search-competitions', methods=['GET'])
+def search_competitions():
+    """Competitions by title words, department, student year and event date range (paginated)"""
+    return title_search(Competition, Competition.comp_id, COMP_WITH_STUDENT_FIELDS, 'competition_fts',
+                        Competition.event_date, 'competitions')
 
 @staff_bp.route('/student-certificates/<int:student_id>', methods=['GET'])
 def student_certificates(student_id):
@@ -338,38 +625,154 @@ def student_certificates(student_id):
     if not authenticated:
         return error, code
     
-    # Verify student exists and is in staff's department (if staff)
-    student = Student.query.get(student_id)
-    if not student:
-        return jsonify({'error': 'Student not found'}), 404
-    
     user_type = session.get('user_type')
     department = session.get('department', '').strip() if session.get('department') else None
     
-    if user_type == 'staff' and not student.department.lower() == department.lower():
+    # Verify student exists and is in staff's department (if staff), compared by department key in the same query
+    student = read_session.execute(
+        STUDENT_FIELDS.select((Student.department_id == department_id_of(department)).label('in_department'))
+        .where(Student.student_id == student_id)
+    ).first()
+    if not student:
+        return jsonify({'error': 'Student not found'}), 404
+    
+    if user_type == 'staff' and not student.in_department:
         return jsonify({'error': 'Access denied'}), 403
     
     # Get certificates
-    certs = Certification.query.filter_by(student_id=student_id).all()
-    
-    results = []
-    for cert in certs:
-        # Convert file path to accessible URL
-        file_url = f"/uploads/{os.path.basename(cert.cert_file_path)}"
-        results.append({
-            'cert_id': cert.cert_id,
-            'title': cert.cert_title,
-            'file_path': file_url,
-            'issue_date': cert.issue_date.strftime('%Y-%m-%d'),
-            'upload_date': cert.upload_date.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    results = CERT_FIELDS.dicts(read_session.execute(
+        CERT_FIELDS.select().where(Certification.student_id == student_id)
+    ))
+    
+    student_data = STUDENT_FIELDS.dict(student)
+    del student_data['student_id']
     
     return jsonify({
-        'student': {
-            'name': student.name,
-            'roll_no': student.roll_no,
-            'department': student.department,
-            'year': student.year
-        },
+        'student': student_data,
         'certificates': results
     }), 200
+
+# ==================== BULK IMPORT ====================
+
+@staff_bp.route('/import-marks', methods=['POST'])
+def import_marks():
+    """
+    Import marks for many students and semesters at once
+
+    Body: a JSON array of rows, a CSV body (Content-Type: text/csv) or a CSV
+    upload in the "file" field. Staff can only import their own department.
+    ?strict=1 rejects the whole import if any row is invalid.
+    """
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
+
+    from backend.marks_import import MarksImportError, import_marks as run_import, parse_csv, parse_json
+    from backend.prediction_model import predictor
+
+    try:
+        if 'file' in request.files:
+            rows = parse_csv(request.files['file'].read().decode('utf-8-sig'))
+        elif request.mimetype == 'text/csv':
+            rows = parse_csv(request.get_data(as_text=True))
+        else:
+            rows = parse_json(request.get_json(silent=True))
+    except (MarksImportError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not rows:
+        return jsonify({'error': 'No rows to import'}), 400
+
+    department = session.get('department') if session.get('user_type') == 'staff' else None
+    strict = request.args.get('strict', '').lower() in ('1', 'true', 'yes')
+
+    summary = run_import(db.session, rows, predictor=predictor, department=department, strict=strict)
+    return jsonify(summary), 200 if summary['inserted'] or not summary['rejected'] else 422
+
+@staff_bp.route('/import-roster', methods=['POST'])
+def import_roster():
+    """
+    Register a department's intake of students from a CSV
+
+    Body: a CSV body (Content-Type: text/csv) or a CSV upload in the "file"
+    field, columns roll_no, name, year[, email, password, department].
+    Rows without a password get the "default_password" form field (with a
+    file upload) or the X-Default-Password header (with a CSV body), never a
+    query argument, which would end up in access logs. HODs may pass
+    ?department=, staff always import into their own department.
+    """
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
+
+    from sqlalchemy.exc import IntegrityError
+    from backend.roster_import import RosterImportError, import_roster as run_import, parse_csv
+
+    department = session.get('department')
+    if session.get('user_type') == 'hod':
+        department = request.args.get('department', '').strip() or department
+    if not department:
+        return jsonify({'error': 'Department required'}), 400
+
+    try:
+        if 'file' in request.files:
+            rows = parse_csv(request.files['file'].read().decode('utf-8-sig'))
+        else:
+            rows = parse_csv(request.get_data(as_text=True))
+    except (RosterImportError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not rows:
+        return jsonify({'error': 'No rows to import'}), 400
+
+    default_password = request.form.get('default_password') or request.headers.get('X-Default-Password')
+    strict = request.args.get('strict', '').lower() in ('1', 'true', 'yes')
+    try:
+        # Hash inline: forking a process pool from a request thread can deadlock on locks other threads hold
+        summary = run_import(db.session, rows, department, default_password=default_password, strict=strict,
+                             workers=1)
+    except IntegrityError:
+        # A student registered one of these roll numbers while the roster was being imported
+        return jsonify({'error': 'Roll number already exists; nothing was imported'}), 409
+    return jsonify(summary), 201 if summary['inserted'] else 422
+
+# ==================== BACKGROUND JOBS ====================
+
+@staff_bp.route('/jobs', methods=['POST'])
+def enqueue_job():
+    """
+    Queue maintenance work for the job workers (HOD only)
+
+    Expected JSON: {"kind": "rescore_students" | "rebuild_department_aggregates"}
+    """
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
+    
+    if session.get('user_type') != 'hod':
+        return jsonify({'error': 'Only HOD can access this'}), 403
+    
+    from backend.jobs import enqueue
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        job_id = enqueue(data.get('kind'), unique=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'job_id': job_id}), 202
+
+@staff_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status and progress of a queued job"""
+    authenticated, error, code = check_staff_session()
+    if not authenticated:
+        return error, code
+    
+    from backend.jobs import job_dict
+    
+    job = read_session.get(Job, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job_dict(job)), 200
@@ -4,6 +4,11 @@ Student Routes - Mark Entry, Prediction, Profile Management
 from flask import Blueprint, request, jsonify, session
 from models import db, Student, Marks, Prediction, Certification, Competition
 from backend.prediction_model import predictor
+from backend import chunked_upload
+from backend.chunked_upload import UploadError
+from backend.serializers import Projection, sql_date, sql_datetime, upload_url
+from backend.storage import read_session
+from config import UPLOAD_CHUNK_SIZE
 from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
@@ -13,6 +18,59 @@ student_bp = Blueprint('student', __name__, url_prefix='/api/student')
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif'}
 UPLOAD_FOLDER = 'uploads'
 
+# Column projections for listings (no full ORM entities, dates formatted by SQLite)
+SEMESTER_MARK_FIELDS = Projection(
+    ('mark_id', Marks.mark_id),
+    ('subject_name', Marks.subject_name),
+    ('marks_obtained', Marks.marks_obtained),
+    ('attendance_percentage', Marks.attendance_percentage),
+    ('internal_marks', Marks.internal_marks),
+    ('assignment_score', Marks.assignment_score),
+    ('entry_date', sql_datetime(Marks.entry_date))
+)
+
+MARK_FIELDS = Projection(
+    ('subject_name', Marks.subject_name),
+    ('marks_obtained', Marks.marks_obtained),
+    ('attendance_percentage', Marks.attendance_percentage),
+    ('internal_marks', Marks.internal_marks),
+    ('assignment_score', Marks.assignment_score)
+)
+
+PREDICTION_FIELDS = Projection(
+    ('semester', Prediction.semester),
+    ('category', Prediction.prediction_result),
+    ('score', Prediction.prediction_score),
+    ('generated_at', sql_datetime(Prediction.generated_at))
+)
+
+PROFILE_FIELDS = Projection(
+    ('student_id', Student.student_id),
+    ('name', Student.name),
+    ('roll_no', Student.roll_no),
+    ('department', Student.department),
+    ('year', Student.year),
+    ('email', Student.email),
+    ('created_at', sql_date(Student.created_at))
+)
+
+CERT_FIELDS = Projection(
+    ('cert_id', Certification.cert_id),
+    ('title', Certification.cert_title),
+    ('file_path', Certification.cert_file_path, upload_url),
+    ('issue_date', sql_date(Certification.issue_date)),
+    ('upload_date', sql_date(Certification.upload_date))
+)
+
+COMP_FIELDS = Projection(
+    ('comp_id', Competition.comp_id),
+    ('title', Competition.comp_title),
+    ('achievement_type', Competition.achievement_type),
+    ('file_path', Competition.comp_file_path, upload_url),
+    ('event_date', sql_date(Competition.event_date)),
+    ('upload_date', sql_date(Competition.upload_date))
+)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -91,24 +149,15 @@ def get_semester_marks(semester):
     
     student_id = session['user_id']
     
-    marks = Marks.query.filter_by(student_id=student_id, semester=semester).all()
-    
-    marks_list = []
-    for mark in marks:
-        marks_list.append({
-            'mark_id': mark.mark_id,
-            'subject_name': mark.subject_name,
-            'marks_obtained': mark.marks_obtained,
-            'attendance_percentage': mark.attendance_percentage,
-            'internal_marks': mark.internal_marks,
-            'assignment_score': mark.assignment_score,
-            'entry_date': mark.entry_date.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    rows = read_session.execute(
+        SEMESTER_MARK_FIELDS.select().where(Marks.student_id == student_id, Marks.semester == semester)
+    )
+    marks_list = SEMESTER_MARK_FIELDS.dicts(rows)
     
     return jsonify({
         'semester': semester,
         'marks': marks_list,
-        'total_subjects': len(marks)
+        'total_subjects': len(marks_list)
     }), 200
 
 @student_bp.route('/get-all-marks', methods=['GET'])
@@ -119,21 +168,13 @@ def get_all_marks():
         return error, code
     
     student_id = session['user_id']
-    marks = Marks.query.filter_by(student_id=student_id).order_by(Marks.semester).all()
+    rows = read_session.execute(
+        MARK_FIELDS.select(Marks.semester).where(Marks.student_id == student_id).order_by(Marks.semester)
+    )
     
     marks_by_semester = {}
-    for mark in marks:
-        sem = mark.semester
-        if sem not in marks_by_semester:
-            marks_by_semester[sem] = []
-        
-        marks_by_semester[sem].append({
-            'subject_name': mark.subject_name,
-            'marks_obtained': mark.marks_obtained,
-            'attendance_percentage': mark.attendance_percentage,
-            'internal_marks': mark.internal_marks,
-            'assignment_score': mark.assignment_score
-        })
+    for row in rows:
+        marks_by_semester.setdefault(row[-1], []).append(MARK_FIELDS.dict(row))
     
     return jsonify(marks_by_semester), 200
 
@@ -246,16 +287,10 @@ def get_all_predictions():
     db.session.commit()
     
     # Now get all predictions
-    predictions = Prediction.query.filter_by(student_id=student_id).order_by(Prediction.semester).all()
-    
-    pred_list = []
-    for pred in predictions:
-        pred_list.append({
-            'semester': pred.semester,
-            'category': pred.prediction_result,
-            'score': pred.prediction_score,
-            'generated_at': pred.generated_at.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    rows = db.session.execute(
+        PREDICTION_FIELDS.select().where(Prediction.student_id == student_id).order_by(Prediction.semester)
+    )
+    pred_list = PREDICTION_FIELDS.dicts(rows)
     
     return jsonify({'predictions': pred_list}), 200
 
@@ -269,20 +304,12 @@ def get_profile():
         return error, code
     
     student_id = session['user_id']
-    student = Student.query.get(student_id)
+    row = read_session.execute(PROFILE_FIELDS.select().where(Student.student_id == student_id)).first()
     
-    if not student:
+    if not row:
         return jsonify({'error': 'Student not found'}), 404
     
-    return jsonify({
-        'student_id': student.student_id,
-        'name': student.name,
-        'roll_no': student.roll_no,
-        'department': student.department,
-        'year': student.year,
-        'email': student.email,
-        'created_at': student.created_at.strftime('%Y-%m-%d')
-    }), 200
+    return jsonify(PROFILE_FIELDS.dict(row)), 200
 
 @student_bp.route('/upload-certificate', methods=['POST'])
 def upload_certificate():
@@ -349,19 +376,8 @@ def get_certifications():
         return error, code
     
     student_id = session['user_id']
-    certs = Certification.query.filter_by(student_id=student_id).all()
-    
-    cert_list = []
-    for cert in certs:
-        # Convert file path to accessible URL
-        file_url = f"/uploads/{os.path.basename(cert.cert_file_path)}"
-        cert_list.append({
-            'cert_id': cert.cert_id,
-            'title': cert.cert_title,
-            'file_path': file_url,
-            'issue_date': cert.issue_date.strftime('%Y-%m-%d'),
-            'upload_date': cert.upload_date.strftime('%Y-%m-%d')
-        })
+    rows = read_session.execute(CERT_FIELDS.select().where(Certification.student_id == student_id))
+    cert_list = CERT_FIELDS.dicts(rows)
     
     return jsonify({'certifications': cert_list}), 200
 
@@ -435,19 +451,210 @@ def get_competitions():
         return error, code
     
     student_id = session['user_id']
-    comps = Competition.query.filter_by(student_id=student_id).all()
-    
-    comp_list = []
-    for comp in comps:
-        # Convert file path to accessible URL
-        file_url = f"/uploads/{os.path.basename(comp.comp_file_path)}"
-        comp_list.append({
-            'comp_id': comp.comp_id,
-            'title': comp.comp_title,
-            'achievement_type': comp.achievement_type,
-            'file_path': file_url,
-            'event_date': comp.event_date.strftime('%Y-%m-%d'),
-            'upload_date': comp.upload_date.strftime('%Y-%m-%d')
-        })
+    rows = read_session.execute(COMP_FIELDS.select().where(Competition.student_id == student_id))
+    comp_list = COMP_FIELDS.dicts(rows)
     
     return jsonify({'competitions': comp_list}), 200
+
+# ==================== CHUNKED UPLOADS ====================
+
+def upload_error_response(e):
+    body = {'error': str(e)}
+    if e.received is not None:
+        body['received'] = e.received
+    return jsonify(body), e.status
+
+def upload_status(meta):
+    return {
+        'upload_id': meta['upload_id'],
+        'kind': meta['kind'],
+        'filename': meta['filename'],
+        'total_size': meta['total_size'],
+        'received': meta['received'],
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+        'complete': meta['received'] == meta['total_size']
+    }
+
+@student_bp.route('/uploads', methods=['POST'])
+def start_upload():
+    """
+    Start a chunked upload
+    Expected JSON: {
+        "kind": "certificate",
+        "filename": "aws_certificate.pdf",
+        "total_size": 5242880
+    }
+    """
+    authenticated, error, code = check_student_session()
+    if not authenticated:
+        return error, code
+    
+    data = request.get_json()
+    
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    if not all(k in data for k in ['kind', 'filename', 'total_size']):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    if not allowed_file(data['filename']):
+        return jsonify({'error': 'File type not allowed'}), 400
+    
+    # A JSON integer or a string of digits; not null, booleans, floats or "1.5"
+    total_size = data['total_size']
+    if isinstance(total_size, str) and total_size.isascii() and total_size.isdigit():
+        total_size = int(total_size)
+    if not isinstance(total_size, int) or isinstance(total_size, bool) or total_size < 0:
+        return jsonify({'error': 'total_size must be a non-negative integer'}), 400
+    
+    try:
+        meta = chunked_upload.create_session(session['user_id'], data['kind'], data['filename'], total_size)
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    return jsonify(upload_status(meta)), 201
+
+@student_bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Get the number of bytes received so far, to resume an interrupted upload"""
+    authenticated, error, code = check_student_session()
+    if not authenticated:
+        return error, code
+    
+    meta = chunked_upload.load_session(upload_id, session['user_id'])
+    if not meta:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    return jsonify(upload_status(meta)), 200
+
+@student_bp.route('/uploads/<upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    """
+    Append one chunk (raw request body) to an upload
+    Headers: X-Upload-Offset (byte offset of the chunk), X-Chunk-Checksum (SHA-256 hex, optional)
+    """
+    authenticated, error, code = check_student_session()
+    if not authenticated:
+        return error, code
+    
+    meta = chunked_upload.load_session(upload_id, session['user_id'])
+    if not meta:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    offset = request.headers.get('X-Upload-Offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'Missing X-Upload-Offset header'}), 400
+    
+    # Read at most one chunk from the stream instead of letting Werkzeug buffer the body
+    data = request.stream.read(UPLOAD_CHUNK_SIZE + 1)
+    
+    try:
+        meta = chunked_upload.append_chunk(meta, offset, data, request.headers.get('X-Chunk-Checksum'))
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    return jsonify(upload_status(meta)), 200
+
+@student_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def cancel_upload(upload_id):
+    """Abandon an upload and delete its staging file"""
+    authenticated, error, code = check_student_session()
+    if not authenticated:
+        return error, code
+    
+    meta = chunked_upload.load_session(upload_id, session['user_id'])
+    if not meta:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    chunked_upload.discard(meta)
+    return jsonify({'message': 'Upload cancelled'}), 200
+
+@student_bp.route('/uploads/<upload_id>/commit', methods=['POST'])
+def commit_upload(upload_id):
+    """
+    Finish a chunked upload and create the certificate or competition record
+    Expected JSON for certificates: {"cert_title": "...", "issue_date": "2025-01-31"}
+    Expected JSON for competitions: {"comp_title": "...", "achievement_type": "Winner", "event_date": "2025-01-31"}
+    Optional: "checksum" - SHA-256 of the whole file
+    """
+    authenticated, error, code = check_student_session()
+    if not authenticated:
+        return error, code
+    
+    student_id = session['user_id']
+    meta = chunked_upload.load_session(upload_id, student_id)
+    if not meta:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    data = request.get_json() or {}
+    
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    if meta['kind'] == 'certificate':
+        if not data.get('cert_title') or not data.get('issue_date'):
+            return jsonify({'error': 'Missing certificate title or date'}), 400
+    else:
+        if not all([data.get('comp_title'), data.get('achievement_type'), data.get('event_date')]):
+            return jsonify({'error': 'Missing required fields'}), 400
+        if data['achievement_type'] not in ['Participant', 'Winner', 'Runner-up']:
+            return jsonify({'error': 'Invalid achievement type'}), 400
+    
+    if not os.path.exists(UPLOAD_FOLDER):
+        os.makedirs(UPLOAD_FOLDER)
+    
+    filename = secure_filename(f"{student_id}_{datetime.utcnow().timestamp()}_{meta['filename']}")
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    
+    try:
+        if meta['kind'] == 'certificate':
+            record = Certification(
+                student_id=student_id,
+                cert_title=data['cert_title'],
+                cert_file_path=file_path,
+                issue_date=datetime.strptime(data['issue_date'], '%Y-%m-%d').date()
+            )
+        else:
+            record = Competition(
+                student_id=student_id,
+                comp_title=data['comp_title'],
+                achievement_type=data['achievement_type'],
+                comp_file_path=file_path,
+                event_date=datetime.strptime(data['event_date'], '%Y-%m-%d').date()
+            )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Under the upload's lock: a retried or concurrent commit of it gets 404 instead of a second record
+    try:
+        with chunked_upload.committing(meta) as meta:
+            if meta['received'] != meta['total_size']:
+                return jsonify({'error': 'Upload incomplete', 'received': meta['received']}), 409
+            
+            if data.get('checksum') and chunked_upload.file_checksum(meta) != data['checksum'].lower():
+                return jsonify({'error': 'File checksum mismatch'}), 400
+            
+            chunked_upload.move_to(meta, file_path)
+            
+            try:
+                db.session.add(record)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                # Put the file back so the commit can be retried without re-uploading
+                chunked_upload.restore(meta, file_path)
+                return jsonify({'error': str(e)}), 500
+            
+            chunked_upload.discard(meta)
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    if meta['kind'] == 'certificate':
+        return jsonify({
+            'message': 'Certificate uploaded successfully',
+            'cert_id': record.cert_id
+        }), 201
+    return jsonify({
+        'message': 'Competition record uploaded successfully',
+        'comp_id': record.comp_id
+    }), 201
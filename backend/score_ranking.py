@@ -0,0 +1,105 @@
+"""
+Score Ranking - order statistics over one department's latest scores
+
+Scores (0-100) are bucketed to hundredths, the precision predictions are
+stored with, and a Fenwick tree over the 10,001 buckets keeps running
+counts. Adding or removing a student, rank / percentile of a score, and
+finding the k-th lowest bucket are all O(log buckets); the lowest K
+students cost O(K log buckets) instead of sorting the department. Each
+bucket also holds the set of its student ids (about 60 bytes per student).
+"""
+SCALE = 100  # Buckets per score point
+BUCKETS = 100 * SCALE + 1
+
+
+def bucket(score):
+    return min(max(int(round(score * SCALE)), 0), BUCKETS - 1)
+
+
+class ScoreRanking:
+    def __init__(self):
+        self.tree = [0] * (BUCKETS + 1)  # 1-based Fenwick tree of per-bucket counts
+        self.students = {}  # bucket -> set of student_ids
+        self.size = 0
+        self._top_bit = 1 << (BUCKETS.bit_length() - 1)
+
+    @classmethod
+    def from_scores(cls, student_ids, scores):
+        """Build in O(n + buckets) rather than n separate adds"""
+        ranking = cls()
+        counts = [0] * BUCKETS
+        for student_id, score in zip(student_ids, scores):
+            b = bucket(score)
+            counts[b] += 1
+            ranking.students.setdefault(b, set()).add(student_id)
+        tree = ranking.tree
+        for i in range(1, BUCKETS + 1):
+            tree[i] += counts[i - 1]
+            parent = i + (i & -i)
+            if parent <= BUCKETS:
+                tree[parent] += tree[i]
+        ranking.size = len(student_ids)
+        return ranking
+
+    def _update(self, b, delta):
+        i = b + 1
+        while i <= BUCKETS:
+            self.tree[i] += delta
+            i += i & -i
+
+    def add(self, student_id, score):
+        b = bucket(score)
+        self.students.setdefault(b, set()).add(student_id)
+        self._update(b, 1)
+        self.size += 1
+
+    def remove(self, student_id, score):
+        b = bucket(score)
+        members = self.students.get(b)
+        if not members or student_id not in members:
+            return
+        members.discard(student_id)
+        if not members:
+            del self.students[b]
+        self._update(b, -1)
+        self.size -= 1
+
+    def count_below(self, score):
+        """Students scoring strictly lower"""
+        i, total = bucket(score), 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def count_at(self, score):
+        return len(self.students.get(bucket(score), ()))
+
+    def _kth_bucket(self, k):
+        """Lowest bucket whose cumulative count reaches k (1-based)"""
+        position, step = 0, self._top_bit
+        while step:
+            nxt = position + step
+            if nxt <= BUCKETS and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return position  # 0-based bucket index
+
+    def lowest(self, k):
+        """Up to k student_ids with the lowest scores, lowest first (ties by student_id)"""
+        result = []
+        seen = 0
+        while len(result) < k and seen < self.size:
+            b = self._kth_bucket(seen + 1)
+            members = sorted(self.students[b])
+            result.extend(members[:k - len(result)])
+            seen += len(members)
+        return result
+
+    def rank(self, score):
+        """(rank from the top, students ranked, percentile rank) of a score in this department"""
+        below, equal = self.count_below(score), self.count_at(score)
+        if not self.size:
+            return None, 0, None
+        return self.size - below - equal + 1, self.size, round(100 * (below + 0.5 * equal) / self.size, 1)
@@ -0,0 +1,198 @@
+"""
+Serialization Layer - Column projections and JSON encoding for listings
+
+Listing routes used to load full ORM entities (including password_hash),
+call strftime on every row and build each dict field by field. A Projection
+instead names the output keys and the columns that feed them, selects only
+those columns, lets SQLite format dates, and turns each result tuple into a
+dict with a single zip().
+
+    CERT_FIELDS = Projection(
+        ('cert_id', Certification.cert_id),
+        ('issue_date', sql_date(Certification.issue_date)),
+        ('file_path', Certification.cert_file_path, upload_url),
+    )
+    rows = db.session.execute(CERT_FIELDS.select().filter_by(student_id=1))
+    cert_list = CERT_FIELDS.dicts(rows)
+
+Listings that grow with the cohort are fetched and encoded in batches
+instead (json_array_response), so memory stays bounded by the batch size.
+"""
+import os
+
+from flask import current_app, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import func, select
+
+from config import STREAM_LISTINGS, STREAM_BATCH_SIZE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def sql_date(column):
+    """Format a Date/DateTime column as YYYY-MM-DD inside the query"""
+    return func.strftime('%Y-%m-%d', column)
+
+
+def sql_datetime(column):
+    """Format a DateTime column as YYYY-MM-DD HH:MM:SS inside the query"""
+    return func.strftime('%Y-%m-%d %H:%M:%S', column)
+
+
+def upload_url(file_path):
+    """Convert a stored upload path to its /uploads URL"""
+    return f"/uploads/{os.path.basename(file_path)}"
+
+
+class Projection:
+    """
+    Ordered (key, column[, converter]) fields of a listing
+
+    Converters run in Python on the selected value; use them only for what
+    SQL cannot do cheaply (e.g. upload_url).
+    """
+    __slots__ = ('keys', 'columns', 'converters')
+
+    def __init__(self, *fields):
+        self.keys = tuple(f[0] for f in fields)
+        self.columns = tuple(f[1] for f in fields)
+        self.converters = tuple((i, f[2]) for i, f in enumerate(fields) if len(f) > 2)
+
+    def select(self, *extra_columns):
+        """SELECT of the projected columns (plus any extra, appended at the end)"""
+        return select(*self.columns, *extra_columns)
+
+    def dict(self, row):
+        """One result row -> dict (extra columns beyond the projection are ignored)"""
+        if self.converters:
+            row = list(row)
+            for i, convert in self.converters:
+                row[i] = convert(row[i])
+        return dict(zip(self.keys, row))
+
+    def dicts(self, rows):
+        """Result rows -> list of dicts"""
+        keys = self.keys
+        if not self.converters:
+            return [dict(zip(keys, row)) for row in rows]
+        return [self.dict(row) for row in rows]
+
+
+def batched(result, batch_size=STREAM_BATCH_SIZE):
+    """Result rows in lists of batch_size, fetched from the cursor as they are needed"""
+    return result.yield_per(batch_size).partitions()
+
+
+def json_array_response(key, batches, stream=None):
+    """
+    Respond with {key: [...]} from an iterable of lists of dicts
+
+    When streaming, each batch is encoded and sent before the next is
+    fetched, so only one batch is in memory; the body is what jsonify()
+    produces outside debug mode. The query's read transaction stays open
+    until the last batch is sent. stream defaults to config.STREAM_LISTINGS.
+    Request hooks see the body through on_body_sent().
+    """
+    if stream is None:
+        stream = STREAM_LISTINGS
+    if not stream:
+        return jsonify({key: [item for batch in batches for item in batch]})
+
+    dumps = current_app.json.dumps_compact
+
+    def generate():
+        yield '{' + dumps(key) + ':['
+        separator = ''
+        for batch in batches:
+            if batch:
+                # Encode the whole batch at once and drop the list brackets
+                yield separator + dumps(batch)[1:-1]
+                separator = ','
+        yield ']}\n'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
+class SentBody:
+    """Streamed response body that counts the bytes sent and calls on_sent(size) once, when exhausted or closed"""
+
+    def __init__(self, chunks, on_sent):
+        self.chunks = chunks
+        self.on_sent = on_sent
+        self.size = 0
+
+    def __iter__(self):
+        try:
+            for chunk in self.chunks:
+                self.size += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        on_sent, self.on_sent = self.on_sent, None
+        if on_sent is not None:
+            if hasattr(self.chunks, 'close'):
+                self.chunks.close()
+            on_sent(self.size)
+
+
+def on_body_sent(response, on_sent):
+    """
+    Call on_sent(bytes sent) once a streamed response's body has been sent
+
+    after_request hooks run before a streamed body is produced, so the work
+    (and SQL) of a streamed listing happens after them; hooks that measure a
+    request finish the measurement here instead.
+    """
+    body = response.response = SentBody(response.response, on_sent)
+    response.call_on_close(body.close)
+    return response
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() backed by orjson when it is installed
+
+    Output matches the default provider up to whitespace (sorted keys,
+    non-string dict keys converted, dates as HTTP dates through default());
+    the encoder is just several times faster on large lists. One difference:
+    NaN and Infinity become null, where the default provider writes the
+    invalid JSON tokens NaN and Infinity. Falls back to the standard
+    library when orjson is missing.
+    """
+    def __init__(self, app, enabled=True):
+        super().__init__(app)
+        self.use_orjson = enabled and orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return self._orjson_dumps(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def dumps_compact(self, obj):
+        """Encode without indentation, as jsonify() does outside debug mode"""
+        if self.use_orjson:
+            return self._orjson_dumps(obj, indent=False).decode('utf-8')
+        return super().dumps(obj, separators=(',', ':'))
+
+    def _orjson_dumps(self, obj, indent=None):
+        # OPT_SERIALIZE_NUMPY: predictor scores are numpy scalars, which the stdlib encoder accepts as floats;
+        # OPT_PASSTHROUGH_DATETIME: dates go to default(), which writes HTTP dates like the default provider
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent is None:
+            indent = self.compact is False or (self.compact is None and self._app.debug)
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_dumps(obj) + b'\n', mimetype=self.mimetype)
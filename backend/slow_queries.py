@@ -0,0 +1,188 @@
+"""
+Slow Query Log - SQL statements over a threshold, with their query plans
+
+Every statement slower than SLOW_QUERY_THRESHOLD_MS is recorded with its
+SQL text, the shape of its bound parameters, the route that issued it and
+SQLite's EXPLAIN QUERY PLAN (captured once per distinct statement). Identical
+statements are grouped by a fingerprint (whitespace and IN-lists normalised)
+and written to the JSON-lines log at most once per SLOW_QUERY_LOG_INTERVAL;
+each line carries the count and time accumulated since the previous line.
+
+Report, ranked by total time:
+    flask --app app slow-queries
+    python -m backend.slow_queries [logs/slow_queries.jsonl]
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def fingerprint(statement):
+    """Normalise a statement so executions that differ only in IN-list length group together"""
+    normalised = _IN_LIST.sub('(?, ...)', _WHITESPACE.sub(' ', statement).strip())
+    return hashlib.sha1(normalised.encode()).hexdigest()[:12], normalised
+
+
+def parameter_shape(parameters, executemany):
+    """Types of the bound parameters, without their values"""
+    if executemany:
+        rows = list(parameters)
+        return f"executemany x{len(rows)} of {parameter_shape(rows[0], False) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in parameters.items()) + '}'
+    return '(' + ', '.join(type(v).__name__ for v in parameters or ()) + ')'
+
+
+def explain(cursor, statement, parameters, executemany):
+    """EXPLAIN QUERY PLAN on a separate cursor of the same connection"""
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    if executemany:
+        parameters = next(iter(parameters), ())
+    try:
+        plan_cursor = cursor.connection.cursor()
+        try:
+            plan_cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters or ())
+            return [row[-1] for row in plan_cursor.fetchall()]
+        finally:
+            plan_cursor.close()
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+
+
+class SlowQueryLog:
+    def __init__(self, path, threshold_ms, interval):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}  # fingerprint -> aggregate since the last written line
+        self._plans = {}
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['slow_query_start'].pop()
+        if elapsed >= self.threshold:
+            self.record(cursor, statement, parameters, executemany, elapsed)
+
+    def handle_error(self, context):
+        starts = context.connection.info.get('slow_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    def record(self, cursor, statement, parameters, executemany, elapsed):
+        key, normalised = fingerprint(statement)
+        route = (request.endpoint or 'unmatched') if has_request_context() else 'cli'
+        now = time.time()
+
+        if key not in self._plans:
+            # Outside the lock: EXPLAIN runs SQL; a racing duplicate is harmless
+            self._plans[key] = explain(cursor, statement, parameters, executemany)
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'routes': set(), 'logged_at': 0.0}
+            entry['count'] += 1
+            entry['total'] += elapsed
+            entry['max'] = max(entry['max'], elapsed)
+            entry['routes'].add(route)
+            entry['statement'] = normalised
+            entry['parameters'] = parameter_shape(parameters, executemany)
+            if now - entry['logged_at'] < self.interval:
+                return
+
+            self._write([(key, entry)])
+            self._pending[key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'routes': set(), 'logged_at': now}
+
+    def _write(self, entries):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a') as f:
+            for key, entry in entries:
+                f.write(json.dumps({
+                    'time': datetime.utcnow().isoformat(timespec='seconds'),
+                    'fingerprint': key,
+                    'statement': entry['statement'],
+                    'parameters': entry['parameters'],
+                    'routes': sorted(entry['routes']),
+                    'count': entry['count'],
+                    'total_ms': round(entry['total'] * 1000, 3),
+                    'max_ms': round(entry['max'] * 1000, 3),
+                    'plan': self._plans[key]
+                }) + '\n')
+
+    def flush(self):
+        """Write occurrences that were held back by the rate limit"""
+        with self._lock:
+            held = [(key, entry) for key, entry in self._pending.items() if entry['count']]
+            if held:
+                self._write(held)
+            for key, entry in held:
+                entry.update(count=0, total=0.0, max=0.0, routes=set())
+
+
+def init_slow_query_log(app, db, path, threshold_ms, interval):
+    """Attach the slow query recorder to the app's engine"""
+    log = SlowQueryLog(path, threshold_ms, interval)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', log.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', log.after_cursor_execute)
+        event.listen(engine, 'handle_error', log.handle_error)
+    atexit.register(log.flush)
+    return log
+
+
+def report(path, limit=20, out=sys.stdout):
+    """Print statements from the log ranked by total time"""
+    stats = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                agg = stats.setdefault(entry['fingerprint'], {
+                    'statement': entry['statement'], 'parameters': entry['parameters'],
+                    'plan': entry['plan'], 'routes': set(), 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0
+                })
+                agg['count'] += entry['count']
+                agg['total_ms'] += entry['total_ms']
+                agg['max_ms'] = max(agg['max_ms'], entry['max_ms'])
+                agg['routes'].update(entry['routes'])
+    except FileNotFoundError:
+        print(f"No slow query log at {path}", file=out)
+        return
+
+    ranked = sorted(stats.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:limit]
+    for rank, (key, agg) in enumerate(ranked, 1):
+        full_scans = [step for step in agg['plan'] if step.startswith('SCAN')]
+        print(f"#{rank} [{key}] total {agg['total_ms']:.1f} ms, {agg['count']} calls, "
+              f"avg {agg['total_ms'] / agg['count']:.2f} ms, max {agg['max_ms']:.2f} ms", file=out)
+        print(f"   routes: {', '.join(sorted(agg['routes']))}", file=out)
+        print(f"   params: {agg['parameters']}", file=out)
+        print(f"   sql:    {agg['statement'][:300]}", file=out)
+        for step in agg['plan']:
+            print(f"   plan:   {step}", file=out)
+        if full_scans:
+            print(f"   !! full table scan: {'; '.join(full_scans)}", file=out)
+        print(file=out)
+
+
+if __name__ == '__main__':
+    from config import SLOW_QUERY_LOG
+    report(sys.argv[1] if len(sys.argv) > 1 else SLOW_QUERY_LOG)
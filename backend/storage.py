@@ -0,0 +1,110 @@
+"""
+SQLite Storage - Connection pragmas, pool sizing and a read-only session
+
+With the default rollback journal a writer locks the whole database file,
+so HOD analytics queue behind every student write (and GET routes such as
+get_prediction write too). This module configures:
+    - WAL journaling: readers see the last committed snapshot and never
+      block on, or block, the single writer
+    - busy timeout: writers wait for the lock instead of failing with
+      "database is locked"
+    - synchronous/cache_size/mmap_size/temp_store pragmas per connection
+    - a queue pool sized for threaded servers (each worker process gets its
+      own pool; see reset_after_fork)
+    - read_session: a scoped session on a second engine that opens the file
+      read-only (mode=ro, query_only), used by routes that never write
+
+    configure_storage(app)    # before db.init_app(app)
+    db.init_app(app)
+    init_storage(app, db)
+"""
+from flask.globals import app_ctx
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from config import (DB_PATH, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+                    SQLITE_BUSY_TIMEOUT, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE, SQLITE_POOL_SIZE,
+                    SQLITE_MAX_OVERFLOW, READ_ONLY_SESSION)
+
+READ_BIND = 'read'
+
+
+def _app_ctx_id():
+    """Scope read sessions to the app context, as Flask-SQLAlchemy does for db.session"""
+    return id(app_ctx._get_current_object())
+
+
+# Session for routes that only read; bound to the read-only engine by init_storage
+read_session = scoped_session(sessionmaker(), scopefunc=_app_ctx_id)
+
+
+def engine_options():
+    return {
+        'pool_size': SQLITE_POOL_SIZE,
+        'max_overflow': SQLITE_MAX_OVERFLOW,
+        'pool_timeout': SQLITE_BUSY_TIMEOUT,
+        # timeout is sqlite3's busy handler, in seconds; connections move between request threads
+        'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT, 'check_same_thread': False}
+    }
+
+
+def configure_storage(app):
+    """Set engine options and the read-only bind; call before db.init_app"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
+    if READ_ONLY_SESSION:
+        app.config['SQLALCHEMY_BINDS'] = {
+            READ_BIND: {'url': f'sqlite:///file:{DB_PATH}?mode=ro&uri=true', **engine_options()}
+        }
+
+
+def _writer_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # journal_mode is stored in the database file; setting it again is a no-op
+    cursor.execute(f'PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA synchronous = {SQLITE_SYNCHRONOUS}')
+    _common_pragmas(cursor)
+    cursor.close()
+
+
+def _reader_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA query_only = ON')
+    _common_pragmas(cursor)
+    cursor.close()
+
+
+def _common_pragmas(cursor):
+    cursor.execute(f'PRAGMA cache_size = {-SQLITE_CACHE_SIZE_KB}')  # negative = KiB, per connection
+    cursor.execute(f'PRAGMA mmap_size = {SQLITE_MMAP_SIZE}')
+    cursor.execute('PRAGMA temp_store = MEMORY')
+
+
+def init_storage(app, db):
+    """Attach pragma hooks and bind read_session; call right after db.init_app"""
+    with app.app_context():
+        engine = db.engine
+        read_engine = db.engines.get(READ_BIND, engine)
+
+    event.listen(engine, 'connect', _writer_pragmas)
+    if read_engine is not engine:
+        event.listen(read_engine, 'connect', _reader_pragmas)
+        # A read-only connection cannot create the file or switch it to WAL; let the writer do it first
+        with engine.connect():
+            pass
+
+    read_session.session_factory.configure(bind=read_engine)
+    app.teardown_appcontext(lambda exc: read_session.remove())
+
+
+def ensure_indexes(db):
+    """Create model indexes missing from tables that predate them (create_all skips existing tables)"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def reset_after_fork(app, db):
+    """Drop pooled connections inherited from the parent process (SQLite handles must not cross a fork)"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,367 @@
+"""
+Student Search - prefix and typo-tolerant lookup by roll number or name
+
+An in-memory index over every student's roll number and name, normalised to
+lower case with single spaces:
+    - prefix: sorted key lists searched with bisect, for roll numbers, whole
+      names and each later word of a name ("sharma" finds "Aarav Sharma")
+    - typos: trigram postings (keys padded with a leading space, so the
+      trigrams of a query are a subset of those of any key it starts). The
+      keys sharing the most trigrams with the query are checked with an
+      edit distance against their closest prefix, allowing one typo from
+      SEARCH_FUZZY_MIN_LENGTH characters and SEARCH_MAX_TYPOS in names from
+      eight
+Names repeat across a cohort, so name postings and distances are kept per
+distinct name rather than per student. Postings are array('i') buffers that
+grow in place and are read as NumPy views.
+
+Results rank an exact roll number first, then roll number prefixes, name
+prefixes and typo matches by number of typos; ties by roll number.
+Department filtering is a mask over each student's department_id.
+
+Like the cohort index, it follows the cohort_changes log: a signup, roster
+import or rename in any worker process is applied by the next search, after
+one primary key range query.
+
+With SEARCH_BACKEND = 'fts' searches go to an SQLite FTS5 table instead
+(student_fts, kept in sync by triggers, see backend/fts.py): persistent and
+with no per-process memory, but prefix matching only.
+"""
+import bisect
+import heapq
+import re
+import threading
+from array import array
+
+from sqlalchemy import func, select
+
+from config import (COHORT_CHANGE_LOG_LIMIT, COHORT_FULL_RELOAD_FRACTION, STREAM_BATCH_SIZE, SEARCH_BACKEND,
+                    SEARCH_MAX_TYPOS, SEARCH_FUZZY_MIN_LENGTH, SEARCH_FUZZY_CANDIDATES)
+from models import db, Student, CohortChange
+from backend.cohort_index import cohort_index, install_triggers
+from backend.departments import department_ids, department_key
+from backend.fts import fts_table, install_fts as install_fts_table, match_expression, matches
+
+EXACT, PREFIX, NAME_PREFIX, FUZZY = range(4)
+MATCHES = ('exact', 'prefix', 'prefix', 'fuzzy')
+
+_IN_CHUNK = 500
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(value):
+    return _SPACES.sub(' ', (value or '').strip().lower())
+
+
+def trigrams(key):
+    padded = ' ' + key
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def allowed_typos(query):
+    if len(query) < SEARCH_FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(query) < 8 else SEARCH_MAX_TYPOS
+
+
+def prefix_distance(query, key, limit):
+    """Edit distance from query to the closest prefix of key, or limit + 1 once it must exceed limit"""
+    over = limit + 1
+    key = key[:len(query) + limit]
+    row = list(range(len(key) + 1))
+    for i, char in enumerate(query, start=1):
+        # Only cells within `limit` of the diagonal can stay within limit
+        low, high = max(1, i - limit), min(len(key), i + limit)
+        new = [over] * (len(key) + 1)
+        new[0] = i if i <= limit else over
+        for j in range(low, high + 1):
+            cost = row[j - 1] + (char != key[j - 1])
+            if row[j] + 1 < cost:
+                cost = row[j] + 1
+            if new[j - 1] + 1 < cost:
+                cost = new[j - 1] + 1
+            new[j] = cost
+        row = new
+        if min(row) > limit:
+            return over
+    return min(row)
+
+
+def word_starts(name):
+    """The name and each suffix of it starting at a later word"""
+    return [name] + [name[i + 1:] for i, char in enumerate(name) if char == ' ']
+
+
+class StudentSearchIndex:
+    def __init__(self):
+        self.student_ids = None  # Position -> student_id; None until built
+        self._lock = threading.Lock()
+        self.last_change = 0
+
+    def _reset(self):
+        self.student_ids = array('i')
+        self.departments = array('i')  # Position -> department_id (0 if none)
+        self.alive = bytearray()  # Position -> 1 until the student changes or is deleted
+        self.roll_keys = []
+        self.name_ids = array('i')
+        self.position = {}  # student_id -> current position
+        self.names = []  # Distinct name keys
+        self._name_ids = {}
+        self.members = []  # Name id -> positions (array('i'))
+        self._rolls = []  # Sorted (roll key, position)
+        self._name_words = []  # Sorted (name or later-word suffix, name id)
+        self._roll_grams = {}  # Trigram -> positions
+        self._name_grams = {}  # Trigram -> name ids
+        self.dead = 0
+
+    def _add(self, student_id, roll_no, name, department_id, insort=False):
+        position = len(self.student_ids)
+        roll_key, name_key = normalize(roll_no), normalize(name)
+        self.student_ids.append(student_id)
+        self.departments.append(department_id or 0)
+        self.alive.append(1)
+        self.roll_keys.append(roll_key)
+        self.position[student_id] = position
+
+        name_id = self._name_ids.get(name_key)
+        if name_id is None:
+            name_id = self._name_ids[name_key] = len(self.names)
+            self.names.append(name_key)
+            self.members.append(array('i'))
+            for gram in trigrams(name_key):
+                self._name_grams.setdefault(gram, array('i')).append(name_id)
+            for words in word_starts(name_key):
+                entry = (words, name_id)
+                bisect.insort(self._name_words, entry) if insort else self._name_words.append(entry)
+        self.name_ids.append(name_id)
+        self.members[name_id].append(position)
+
+        for gram in trigrams(roll_key):
+            self._roll_grams.setdefault(gram, array('i')).append(position)
+        entry = (roll_key, position)
+        bisect.insort(self._rolls, entry) if insort else self._rolls.append(entry)
+
+    def _remove(self, student_id):
+        position = self.position.pop(student_id, None)
+        if position is not None:
+            self.alive[position] = 0
+            self.dead += 1
+
+    def _query(self, student_ids=None):
+        query = select(Student.student_id, Student.roll_no, Student.name, Student.department_id)
+        if student_ids is not None:
+            query = query.where(Student.student_id.in_(student_ids))
+        return query.order_by(Student.student_id)
+
+    def _last_change(self, session):
+        return session.execute(select(func.max(CohortChange.change_id))).scalar() or 0
+
+    def build(self, session=None):
+        """Load every student (call inside an app context)"""
+        from backend.storage import read_session
+
+        session = session or read_session
+        install_triggers(db.engine)
+        with self._lock:
+            last_change = self._last_change(session)
+            self._department_ids = department_ids(session)
+            self._reset()
+            for rows in session.execute(self._query()).yield_per(STREAM_BATCH_SIZE * 10).partitions():
+                for row in rows:
+                    self._add(*row)
+            self._rolls.sort()
+            self._name_words.sort()
+            self.last_change = last_change
+
+    def refresh(self, session=None):
+        """Apply students added, changed or deleted since the last build/refresh; builds on first use"""
+        from backend.storage import read_session
+
+        session = session or read_session
+        if self.student_ids is None:
+            return self.build(session)
+
+        latest = self._last_change(session)
+        if latest == self.last_change:
+            return
+        oldest = session.execute(select(func.min(CohortChange.change_id))).scalar() or 0
+        if latest < self.last_change or oldest > self.last_change + 1:
+            return self.build(session)
+
+        changed = session.execute(
+            select(CohortChange.student_id).distinct()
+            .where(CohortChange.change_id > self.last_change, CohortChange.change_id <= latest)
+        ).scalars().all()
+        if len(changed) > max(len(self.position), 1) * COHORT_FULL_RELOAD_FRACTION:
+            return self.build(session)
+
+        fresh = {}
+        for start in range(0, len(changed), _IN_CHUNK):
+            fresh.update((row[0], row) for row in session.execute(self._query(changed[start:start + _IN_CHUNK])))
+        if any(row[3] and row[3] not in self._department_ids.values() for row in fresh.values()):
+            self._department_ids = department_ids(session)
+        with self._lock:
+            if latest > self.last_change:
+                self._apply(changed, fresh)
+                self.last_change = latest
+
+        if self.dead > max(len(self.position), 1) * COHORT_FULL_RELOAD_FRACTION:
+            # Mostly replaced entries; compact
+            self.build(session)
+        elif latest - (oldest or latest) > COHORT_CHANGE_LOG_LIMIT:
+            cohort_index.prune(latest - COHORT_CHANGE_LOG_LIMIT)
+
+    def _apply(self, changed, fresh):
+        for student_id in changed:
+            row = fresh.get(student_id)
+            position = self.position.get(student_id)
+            if position is not None and row is not None and self.roll_keys[position] == normalize(row[1]) \
+                    and self.names[self.name_ids[position]] == normalize(row[2]) \
+                    and self.departments[position] == (row[3] or 0):
+                # Only predictions changed
+                continue
+            self._remove(student_id)
+            if row is not None:
+                self._add(*row, insort=True)
+
+    def department_id(self, department):
+        return self._department_ids.get(department_key(department))
+
+    def search(self, query, department=None, limit=20):
+        """[(student_id, match, typos)] best first; department limits results to one department (any spelling)"""
+        import numpy as np
+
+        self.refresh()
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            eligible = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+            if department:
+                department_id = self.department_id(department)
+                if department_id is None:
+                    return []
+                eligible &= np.frombuffer(self.departments, dtype=np.int32) == department_id
+            found = {}  # position -> (rank, typos, roll key)
+
+            def take(positions, rank, typos=0):
+                """Record the `limit` eligible positions with the lowest roll numbers, unless found at a better rank"""
+                positions = np.asarray(positions, dtype=np.int32)
+                better = (rank, typos)
+                fresh = (p for p in positions[eligible[positions]].tolist() if found.get(p, (FUZZY + 1,))[:2] > better)
+                for position in heapq.nsmallest(limit, fresh, key=self.roll_keys.__getitem__):
+                    found[position] = (rank, typos, self.roll_keys[position])
+
+            # Roll numbers in key order: the exact match, if any, comes first
+            positions = []
+            for roll_key, position in self._rolls[bisect.bisect_left(self._rolls, (query,)):]:
+                if not roll_key.startswith(query) or len(positions) >= limit:
+                    break
+                if eligible[position]:
+                    positions.append(position)
+                    found[position] = (EXACT if roll_key == query else PREFIX, 0, roll_key)
+
+            if len(found) < limit:
+                name_ids = set()
+                for words, name_id in self._name_words[bisect.bisect_left(self._name_words, (query,)):]:
+                    if not words.startswith(query):
+                        break
+                    name_ids.add(name_id)
+                if name_ids:
+                    take(np.concatenate([np.frombuffer(self.members[i], dtype=np.int32) for i in name_ids]), NAME_PREFIX)
+
+            # No typo suggestions alongside an exact roll number
+            typos = allowed_typos(query)
+            if len(found) < limit and typos and EXACT not in (rank for rank, _, _ in found.values()):
+                self._fuzzy(query, typos, take, eligible)
+
+            ranked = sorted(found.items(), key=lambda item: item[1])[:limit]
+            return [(self.student_ids[position], MATCHES[rank], distance)
+                    for position, (rank, distance, _) in ranked]
+
+    def _fuzzy(self, query, typos, take, eligible):
+        import numpy as np
+
+        grams = trigrams(query)
+
+        def candidates(postings, size, typos, mask=None):
+            # q-gram lemma: each edit changes at most three trigrams
+            needed = max(len(grams) - 3 * typos, 1)
+            lists = [np.frombuffer(postings[gram], dtype=np.int32) for gram in grams if gram in postings]
+            if not lists:
+                return []
+            counts = np.bincount(np.concatenate(lists), minlength=size)
+            if mask is not None:
+                counts[~mask] = 0
+            ids = np.flatnonzero(counts >= needed)
+            if len(ids) > SEARCH_FUZZY_CANDIDATES:
+                # Most shared trigrams first
+                ids = ids[np.argpartition(-counts[ids], SEARCH_FUZZY_CANDIDATES)[:SEARCH_FUZZY_CANDIDATES]]
+            return ids.tolist()
+
+        by_distance = {}
+        for name_id in candidates(self._name_grams, len(self.names), typos):
+            distance = min(prefix_distance(query, words, typos) for words in word_starts(self.names[name_id]))
+            if distance <= typos:
+                by_distance.setdefault(distance, []).append(np.frombuffer(self.members[name_id], dtype=np.int32))
+        # Roll numbers always contain a digit; a query without one is a name. They are also
+        # sequential, so beyond one typo they mostly match neighbouring students
+        roll_typos = min(typos, 1) if any(char.isdigit() for char in query) else 0
+        positions = candidates(self._roll_grams, len(self.roll_keys), roll_typos, eligible) if roll_typos else []
+        for position in positions:
+            distance = prefix_distance(query, self.roll_keys[position], roll_typos)
+            if distance <= roll_typos:
+                by_distance.setdefault(distance, []).append(np.array([position], dtype=np.int32))
+        for distance in sorted(by_distance):
+            take(np.concatenate(by_distance[distance]), FUZZY, distance)
+
+    def memory_bytes(self):
+        """Approximate size of the postings and per-student arrays (excluding key strings)"""
+        if self.student_ids is None:
+            return 0
+        arrays = [self.student_ids, self.departments, self.name_ids, *self.members, *self._roll_grams.values(),
+                  *self._name_grams.values()]
+        return sum(len(a) * a.itemsize for a in arrays) + len(self.alive)
+
+
+student_search = StudentSearchIndex()
+
+# ==================== SQLITE FTS5 BACKEND ====================
+
+FTS_TABLE = 'student_fts'
+
+
+def install_fts(engine):
+    install_fts_table(engine, FTS_TABLE, 'students', 'student_id', ('roll_no', 'name'))
+
+
+def fts_search(session, query, department=None, limit=20):
+    """Same result shape as StudentSearchIndex.search, from the FTS5 table (prefixes of each word, no typos)"""
+    from backend.departments import department_id_of
+
+    match = match_expression(normalize(query))
+    if not match:
+        return []
+    key = normalize(query)
+    fts = fts_table(FTS_TABLE)
+    exact = func.lower(Student.roll_no) == key
+    statement = (
+        select(Student.student_id, exact)
+        .select_from(fts)
+        .join(Student, Student.student_id == fts.c.rowid)
+        .where(matches(FTS_TABLE, match))
+        .order_by(exact.desc(), fts.c.rank, Student.roll_no)
+        .limit(limit)
+    )
+    if department:
+        statement = statement.where(Student.department_id == department_id_of(department))
+    return [(student_id, 'exact' if is_exact else 'prefix', 0) for student_id, is_exact in session.execute(statement)]
+
+
+def search_students(query, department=None, limit=20, session=None):
+    """Search with the configured backend; [(student_id, match, typos)] best first"""
+    from backend.storage import read_session
+
+    if SEARCH_BACKEND == 'fts':
+        return fts_search(session or read_session, query, department, limit)
+    return student_search.search(query, department, limit)
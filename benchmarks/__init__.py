@@ -0,0 +1,3 @@
+"""
+Benchmarks package - run modules with `python -m benchmarks.<name>`
+"""
@@ -0,0 +1,192 @@
+"""
+Coalescing benchmark - concurrent analytics bursts with single-flight and concurrency limits
+
+For each cohort size (seeded with backend.seed) it reports:
+    - a burst of concurrent identical requests (HOD and staff all-predictions,
+      department-stats) in one process, with and without single-flight:
+      wall time, slowest request and how many computations ran
+    - the same burst spread over forked worker processes, coalesced through
+      the SINGLE_FLIGHT_DIR lock and result files
+    - student request latency (median / p95) while HODs burst
+      all-certificates, without and with the endpoint concurrency limit,
+      and how many analytics requests were shed
+Checks (exit status 1 on failure):
+    - every coalesced body equals the body of a request made on its own
+    - a burst in one process computes all-predictions once
+    - a burst over N workers computes it at most N times
+    - the limit admits at most concurrency + queue requests of a burst that
+      arrives at once; the rest get 503 with Retry-After
+
+Usage:
+    python -m benchmarks.bench_coalescing
+    python -m benchmarks.bench_coalescing --sizes 100000 --burst 32 --workers 4
+"""
+import argparse
+import hashlib
+import multiprocessing
+import statistics
+import sys
+import threading
+import time
+
+from benchmarks.common import use_temp_database, staff_client, student_client
+
+BURSTS = [
+    ('all-predictions', 'hod', '/api/staff/all-predictions'),
+    ('all-predictions[staff]', 'staff', '/api/staff/all-predictions'),
+    ('department-stats', 'hod', '/api/staff/department-stats'),
+]
+
+
+def digest(response):
+    return hashlib.sha256(response.get_data()).hexdigest()
+
+
+def burst(clients, url):
+    """Send one request per client at the same moment; (status, body digest, seconds, Retry-After) per request"""
+    barrier = threading.Barrier(len(clients))
+    results = [None] * len(clients)
+
+    def send(i):
+        barrier.wait()
+        start = time.perf_counter()
+        response = clients[i].get(url)
+        body = digest(response)
+        results[i] = (response.status_code, body, time.perf_counter() - start, response.headers.get('Retry-After'))
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(len(clients))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def coalesced_count(metrics):
+    return sum(metrics.coalesced.series.values())
+
+
+def worker_burst(app, db, role, url, clients, start, queue):
+    from backend.storage import reset_after_fork
+    from backend.metrics import metrics
+
+    reset_after_fork(app, db)
+    before = coalesced_count(metrics)
+    clients = [staff_client(app, role) for _ in range(clients)]
+    start.wait()
+    results = burst(clients, url)
+    queue.put((results, coalesced_count(metrics) - before))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20000])
+    parser.add_argument('--burst', type=int, default=16, help='concurrent requests per burst')
+    parser.add_argument('--workers', type=int, default=4, help='processes for the cross-worker burst')
+    args = parser.parse_args()
+
+    use_temp_database()
+    from app import app
+    from models import db
+    from backend.seed import seed_database
+    from backend.metrics import metrics
+    import backend.coalesce as coalesce
+
+    failures = []
+    limits = dict(coalesce.limits)
+    for size in args.sizes:
+        with app.app_context():
+            seed_database(db, size, reset=True, log=None)
+        print(f"{size} students, bursts of {args.burst}")
+        print(f"  {'endpoint':24} {'mode':10} {'wall s':>7} {'slowest s':>10} {'computations':>13}")
+
+        for name, role, url in BURSTS:
+            expected = digest(staff_client(app, role).get(url))
+            for mode in ('separate', 'coalesced'):
+                coalesce.SINGLE_FLIGHT = mode == 'coalesced'
+                coalesce.limits.clear()
+                before = coalesced_count(metrics)
+                start = time.perf_counter()
+                results = burst([staff_client(app, role) for _ in range(args.burst)], url)
+                wall = time.perf_counter() - start
+                computations = args.burst - (coalesced_count(metrics) - before)
+                print(f"  {name:24} {mode:10} {wall:>7.2f} {max(r[2] for r in results):>10.2f} {computations:>13}")
+                if any(status != 200 or body != expected for status, body, _, _ in results):
+                    failures.append(f"{size} students, {name} {mode}: body differs from a request on its own")
+                if mode == 'coalesced' and name.startswith('all-predictions') and computations != 1:
+                    failures.append(f"{size} students, {name}: {computations} computations in one process")
+            coalesce.limits.update(limits)
+
+        if args.workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            name, role, url = BURSTS[0]
+            expected = digest(staff_client(app, role).get(url))
+            start_barrier, queue = context.Barrier(args.workers + 1), context.Queue()
+            per_worker = max(args.burst // args.workers, 1)
+            processes = [
+                context.Process(target=worker_burst, args=(app, db, role, url, per_worker, start_barrier, queue))
+                for _ in range(args.workers)
+            ]
+            for process in processes:
+                process.start()
+            start_barrier.wait()
+            start = time.perf_counter()
+            outcomes = [queue.get() for _ in processes]
+            wall = time.perf_counter() - start
+            for process in processes:
+                process.join()
+            results = [result for worker_results, _ in outcomes for result in worker_results]
+            computations = len(results) - sum(coalesced for _, coalesced in outcomes)
+            print(f"  {name:24} {f'{args.workers} workers':10} {wall:>7.2f} {max(r[2] for r in results):>10.2f} "
+                  f"{computations:>13}")
+            if any(status != 200 or body != expected for status, body, _, _ in results):
+                failures.append(f"{size} students, {name} over workers: body differs from a request on its own")
+            if computations > args.workers:
+                failures.append(f"{size} students, {name}: {computations} computations over {args.workers} workers")
+
+        print(f"\n  students during an all-certificates burst  {'median ms':>10} {'p95 ms':>7} {'200':>4} {'503':>4}")
+        student = student_client(app)
+        for mode in ('unlimited', 'limited'):
+            coalesce.limits.clear()
+            if mode == 'limited':
+                coalesce.limits.update(limits)
+            latencies, stop = [], threading.Event()
+
+            def student_traffic():
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    student.get('/api/student/get-all-predictions').get_data()
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            thread = threading.Thread(target=student_traffic)
+            thread.start()
+            results = burst([staff_client(app, 'hod') for _ in range(args.burst)], '/api/staff/all-certificates')
+            stop.set()
+            thread.join()
+            latencies.sort()
+            ok = sum(status == 200 for status, _, _, _ in results)
+            shed = [retry for status, _, _, retry in results if status == 503]
+            print(f"  {mode:42} {statistics.median(latencies):>10.2f} "
+                  f"{latencies[max(int(len(latencies) * 0.95) - 1, 0)]:>7.2f} {ok:>4} {len(shed):>4}")
+            limit = limits.get('staff.all_certificates')
+            if mode == 'limited' and limit is not None:
+                if ok + len(shed) != len(results) or ok > limit.concurrency + limit.queue:
+                    failures.append(f"{size} students: {ok} of {len(results)} all-certificates admitted, "
+                                    f"limit {limit.concurrency} + {limit.queue} queued")
+                if not all(shed):
+                    failures.append(f"{size} students: 503 without Retry-After")
+        coalesce.limits.update(limits)
+        coalesce.SINGLE_FLIGHT = True
+        print()
+
+    if failures:
+        print('FAILED')
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
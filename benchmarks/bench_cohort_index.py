@@ -0,0 +1,106 @@
+"""
+Cohort index benchmark - filter-students from SQL vs the in-memory index
+
+For each cohort size (seeded with backend.seed) it reports:
+    - index build time and memory per student
+    - filter-students latency (full body read) through the SQL path
+      (latest-prediction window query) and through the cohort index
+    - refresh cost after writes made on another connection, as another
+      worker process would
+Both paths must return identical bodies, before and after the writes; the
+check fails (exit status 1) otherwise.
+
+Usage:
+    python -m benchmarks.bench_cohort_index
+    python -m benchmarks.bench_cohort_index --sizes 10000 100000 --repeat 10
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.common import use_temp_database, staff_client
+
+FILTERS = ['year=1', 'department=CSE', 'year=2&department=IT', '']
+
+
+def timed_get(client, url, repeat):
+    samples, body = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        body = response.get_data()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--writes', type=int, default=200, help='predictions written before the refresh check')
+    args = parser.parse_args()
+
+    use_temp_database()
+    import config
+    config.STREAM_LISTINGS = False  # Compare whole bodies
+
+    from app import app
+    from models import db
+    from backend.seed import seed_database
+    from backend.cohort_index import cohort_index
+    import backend.routes.hod as hod
+
+    client = staff_client(app, 'hod')
+    failures = []
+    print(f"{'students':>9} {'build ms':>9} {'B/student':>10} {'filter':24} {'sql ms':>8} {'index ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        with app.app_context():
+            seed_database(db, size, reset=True, log=None)
+            start = time.perf_counter()
+            cohort_index.build()
+            build_ms = (time.perf_counter() - start) * 1000
+            per_student = cohort_index.memory_bytes() / size
+
+        for query in FILTERS:
+            url = f'/api/staff/filter-students?{query}'
+            hod.COHORT_INDEX = False
+            sql_ms, sql_body = timed_get(client, url, args.repeat)
+            hod.COHORT_INDEX = True
+            index_ms, index_body = timed_get(client, url, args.repeat)
+            if sql_body != index_body:
+                failures.append(f"{size} students, ?{query}: index and SQL bodies differ")
+            print(f"{size:>9} {build_ms:>9.0f} {per_student:>10.1f} {'?' + query:24} {sql_ms:>8.1f} {index_ms:>9.1f} "
+                  f"{sql_ms / index_ms if index_ms else 0:>7.1f}x")
+
+        # Writes from another connection, as from another worker process
+        with app.app_context():
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(
+                    "INSERT INTO predictions (student_id, semester, prediction_result, prediction_score, generated_at) "
+                    "SELECT student_id, 1, 'At-Risk Performance', 12.5, datetime('now') FROM students "
+                    "ORDER BY student_id DESC LIMIT ?", (args.writes,)
+                )
+                conn.exec_driver_sql("UPDATE students SET year = 1 WHERE student_id % 997 = 0")
+            start = time.perf_counter()
+            cohort_index.refresh()
+            refresh_ms = (time.perf_counter() - start) * 1000
+        hod.COHORT_INDEX = False
+        _, sql_body = timed_get(client, '/api/staff/filter-students?year=1', 1)
+        hod.COHORT_INDEX = True
+        _, index_body = timed_get(client, '/api/staff/filter-students?year=1', 1)
+        if sql_body != index_body:
+            failures.append(f"{size} students: index out of date after writes")
+        print(f"{size:>9} refresh after {args.writes} predictions + year changes: {refresh_ms:.1f} ms\n")
+
+    if failures:
+        print('FAILED')
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Compression benchmark - bytes saved and CPU cost per endpoint
+
+Usage: python -m benchmarks.bench_compression [--sizes 500 2000 5000] [--repeat 20]
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import use_temp_database, seed_cohort, staff_client
+
+ENDPOINTS = [
+    '/api/staff/all-predictions',
+    '/api/staff/all-certificates',
+    '/api/staff/student-details/1',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000, 5000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    from app import app
+    from backend.compression import compress_bytes
+    from config import COMPRESS_LEVEL
+
+    print(f"gzip level {COMPRESS_LEVEL}")
+    print(f"{'endpoint':32} {'students':>8} {'raw bytes':>12} {'gzip bytes':>11} {'saved':>7} {'cpu ms':>8} {'MB/s':>7}")
+
+    with app.app_context():
+        for size in args.sizes:
+            seed_cohort(size)
+            client = staff_client(app)
+
+            for endpoint in ENDPOINTS:
+                raw = client.get(endpoint).get_data()
+                gz = client.get(endpoint, headers={'Accept-Encoding': 'gzip'}).get_data()
+
+                start = time.process_time()
+                for _ in range(args.repeat):
+                    compress_bytes(raw)
+                cpu = (time.process_time() - start) / args.repeat
+
+                saved = 1 - len(gz) / len(raw) if raw else 0
+                rate = len(raw) / cpu / 1e6 if cpu else float('inf')
+                print(f"{endpoint:32} {size:>8} {len(raw):>12,} {len(gz):>11,} {saved:>6.1%} {cpu * 1000:>8.2f} {rate:>7.1f}")
+
+    os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
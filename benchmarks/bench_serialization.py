@@ -0,0 +1,118 @@
+"""
+Serialization benchmark - ORM entities + strftime vs column projections
+
+Builds the all-certificates and marks listings both ways and reports CPU
+time and peak traced memory per row, plus JSON encoding cost with the
+standard library and with orjson (when installed).
+
+Usage: python -m benchmarks.bench_serialization [--students 5000] [--repeat 5]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from benchmarks.common import use_temp_database, seed_cohort
+
+
+def measure(fn, repeat):
+    """Return (cpu seconds per call, peak traced bytes, result)"""
+    result = fn()
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    cpu = (time.process_time() - start) / repeat
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    from app import app
+    from models import db, Student, Marks, Certification
+    from backend.routes.hod import CERT_WITH_STUDENT_FIELDS
+    from backend.routes.student import SEMESTER_MARK_FIELDS
+    from backend.serializers import FastJSONProvider, orjson
+
+    def legacy_certificates():
+        db.session.expunge_all()
+        students = Student.query.all()
+        certs = Certification.query.filter(Certification.student_id.in_([s.student_id for s in students])).all()
+        results = []
+        for cert in certs:
+            student = db.session.get(Student, cert.student_id)
+            results.append({
+                'cert_id': cert.cert_id,
+                'student_id': student.student_id,
+                'student_name': student.name,
+                'student_roll_no': student.roll_no,
+                'student_department': student.department,
+                'student_year': student.year,
+                'title': cert.cert_title,
+                'file_path': f"/uploads/{os.path.basename(cert.cert_file_path)}",
+                'issue_date': cert.issue_date.strftime('%Y-%m-%d'),
+                'upload_date': cert.upload_date.strftime('%Y-%m-%d %H:%M:%S')
+            })
+        return results
+
+    def projected_certificates():
+        query = CERT_WITH_STUDENT_FIELDS.select().join(Student, Student.student_id == Certification.student_id)
+        return CERT_WITH_STUDENT_FIELDS.dicts(db.session.execute(query.order_by(Certification.cert_id)))
+
+    def legacy_marks():
+        db.session.expunge_all()
+        return [
+            {
+                'mark_id': m.mark_id,
+                'subject_name': m.subject_name,
+                'marks_obtained': m.marks_obtained,
+                'attendance_percentage': m.attendance_percentage,
+                'internal_marks': m.internal_marks,
+                'assignment_score': m.assignment_score,
+                'entry_date': m.entry_date.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            for m in Marks.query.all()
+        ]
+
+    def projected_marks():
+        return SEMESTER_MARK_FIELDS.dicts(db.session.execute(SEMESTER_MARK_FIELDS.select()))
+
+    with app.app_context():
+        seed_cohort(args.students)
+
+        print(f"{'listing':28} {'rows':>8} {'cpu us/row':>11} {'peak B/row':>11}")
+        for name, fn in [('certificates (ORM)', legacy_certificates),
+                         ('certificates (projection)', projected_certificates),
+                         ('marks (ORM)', legacy_marks),
+                         ('marks (projection)', projected_marks)]:
+            cpu, peak, rows = measure(fn, args.repeat)
+            print(f"{name:28} {len(rows):>8,} {cpu / len(rows) * 1e6:>11.2f} {peak / len(rows):>11.0f}")
+
+        payload = {'certificates': projected_certificates()}
+        rows = len(payload['certificates'])
+        print()
+        print(f"{'encoder':28} {'rows':>8} {'cpu us/row':>11}")
+        stdlib = FastJSONProvider(app, enabled=False)
+        cpu, _, _ = measure(lambda: stdlib.response(payload), args.repeat)
+        print(f"{'json (stdlib)':28} {rows:>8,} {cpu / rows * 1e6:>11.2f}")
+        if orjson is not None:
+            fast = FastJSONProvider(app)
+            cpu, _, _ = measure(lambda: fast.response(payload), args.repeat)
+            print(f"{'orjson':28} {rows:>8,} {cpu / rows * 1e6:>11.2f}")
+        else:
+            print("orjson not installed - skipped")
+
+    os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
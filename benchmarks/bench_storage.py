@@ -0,0 +1,150 @@
+"""
+Storage concurrency benchmark - HOD analytics latency while students write
+
+Runs the same mixed workload twice, each in a fresh process on a freshly
+seeded database:
+    default: rollback journal, synchronous=FULL, sqlite3 defaults for busy
+             timeout/cache/mmap, every route on db.session
+    tuned:   the settings in config.py (WAL, pragmas, read-only session)
+Writer threads act as students (add-marks, then a prediction, which also
+inserts); reader threads act as HODs (department-stats, filter-students).
+Reports reader latency percentiles, writer throughput and lock errors.
+
+Usage:
+    python -m benchmarks.bench_storage --students 20000 --writers 4 --readers 4 --duration 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_SETTINGS = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT': 5,
+    'SQLITE_CACHE_SIZE_KB': 2000,
+    'SQLITE_MMAP_SIZE': 0,
+    'READ_ONLY_SESSION': False,
+}
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+
+def run_mode(mode, students, writers, readers, duration):
+    """Body of the child process: seed, run the workload, print JSON"""
+    from benchmarks.common import use_temp_database, staff_client, student_client
+    db_path = use_temp_database()
+
+    import config
+    if mode == 'default':
+        for name, value in DEFAULT_SETTINGS.items():
+            setattr(config, name, value)
+
+    from app import app
+    from models import db
+    from backend.seed import seed_database
+
+    with app.app_context():
+        seed_database(db, students, log=None)
+        db.session.remove()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    reads, writes, errors = [], [], []
+
+    def writer(n):
+        client = student_client(app, n + 1)
+        i = 0
+        while not stop.is_set():
+            i += 1
+            start = time.perf_counter()
+            first = client.post('/api/student/add-marks', json={
+                'semester': 1, 'subject_name': f'Bench {i}', 'marks_obtained': 70,
+                'attendance_percentage': 85, 'internal_marks': 35, 'assignment_score': 15
+            })
+            second = client.get('/api/student/predict/1')
+            elapsed = time.perf_counter() - start
+            with lock:
+                writes.append(elapsed)
+                errors.extend(r.status_code for r in (first, second) if r.status_code >= 500)
+
+    def reader(n):
+        client = staff_client(app, 'hod')
+        urls = ['/api/staff/department-stats', '/api/staff/filter-students?year=2']
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.get(urls[i % len(urls)])
+            response.get_data()
+            elapsed = time.perf_counter() - start
+            i += 1
+            with lock:
+                reads.append(elapsed)
+                if response.status_code >= 500:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    import os
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    print(json.dumps({
+        'mode': mode,
+        'reads': len(reads),
+        'read_p50_ms': percentile(reads, 50) * 1000,
+        'read_p95_ms': percentile(reads, 95) * 1000,
+        'read_p99_ms': percentile(reads, 99) * 1000,
+        'read_mean_ms': statistics.fmean(reads) * 1000 if reads else 0.0,
+        'writes_per_second': len(writes) / duration,
+        'write_p95_ms': percentile(writes, 95) * 1000,
+        'errors': len(errors)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--mode', choices=['default', 'tuned'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.students, args.writers, args.readers, args.duration)
+        return 0
+
+    results = []
+    for mode in ('default', 'tuned'):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_storage', '--mode', mode, '--students', str(args.students),
+             '--writers', str(args.writers), '--readers', str(args.readers), '--duration', str(args.duration)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.students} students, {args.writers} writer and {args.readers} reader threads, {args.duration:g}s\n")
+    print(f"{'mode':8} {'reads':>7} {'read p50':>9} {'read p95':>9} {'read p99':>9} {'writes/s':>9} {'write p95':>10} {'5xx':>5}")
+    for r in results:
+        print(f"{r['mode']:8} {r['reads']:>7} {r['read_p50_ms']:>9.1f} {r['read_p95_ms']:>9.1f} {r['read_p99_ms']:>9.1f} "
+              f"{r['writes_per_second']:>9.1f} {r['write_p95_ms']:>10.1f} {r['errors']:>5}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
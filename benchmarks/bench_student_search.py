@@ -0,0 +1,161 @@
+"""
+Student search benchmark - /api/staff/search on the in-memory index and on FTS5
+
+For each cohort size (seeded with backend.seed) it reports:
+    - index build time and postings memory
+    - search latency (median / p95 over the query set, full request) for
+      exact roll numbers, roll and name prefixes, and names and roll numbers
+      with one or two typos, through the memory index and the FTS5 table
+Checks (exit status 1 on failure):
+    - exact and prefix results equal a brute-force ranking over every
+      student of the department
+    - every typo match is within the reported number of edits
+    - a name with one typo finds that name in at least 95% of queries
+    - the FTS5 backend returns the exact roll number first
+
+Usage:
+    python -m benchmarks.bench_student_search
+    python -m benchmarks.bench_student_search --sizes 100000 --queries 200
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import use_temp_database, staff_client
+
+
+def typo(word, rng):
+    """One substitution, deletion or transposition after the first character"""
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(('substitute', 'delete', 'transpose'))
+    if kind == 'substitute':
+        return word[:i] + rng.choice([c for c in 'aeiourstn' if c != word[i]]) + word[i + 1:]
+    if kind == 'delete':
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def brute_force(students, query, department_id, limit, search):
+    """Exact and prefix results by scanning every student"""
+    query = search.normalize(query)
+    ranked = []
+    for student_id, roll_no, name, student_department in students:
+        if department_id is not None and student_department != department_id:
+            continue
+        roll_key, name_key = search.normalize(roll_no), search.normalize(name)
+        if roll_key.startswith(query):
+            ranked.append(((0 if roll_key == query else 1), roll_key, student_id))
+        elif any(words.startswith(query) for words in search.word_starts(name_key)):
+            ranked.append((2, roll_key, student_id))
+    return [student_id for _, _, student_id in sorted(ranked)[:limit]]
+
+
+def timed(client, urls):
+    samples = []
+    for url in urls:
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=100, help='queries per kind')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from urllib.parse import quote
+
+    from app import app
+    from models import db, Student
+    from backend.seed import seed_database
+    from backend.departments import department_ids, department_key
+    import backend.student_search as search
+
+    failures = []
+    rng = random.Random(7)
+    staff = staff_client(app, 'staff', 'CSE')
+    print(f"{'students':>9} {'backend':8} {'kind':14} {'median ms':>10} {'p95 ms':>8}")
+    for size in args.sizes:
+        with app.app_context():
+            seed_database(db, size, reset=True, log=None)
+            start = time.perf_counter()
+            search.student_search.build()
+            build_ms = (time.perf_counter() - start) * 1000
+            search.install_fts(db.engine)
+            students = db.session.execute(
+                db.select(Student.student_id, Student.roll_no, Student.name, Student.department_id)
+            ).all()
+            cse = department_ids(db.session)[department_key('CSE')]
+        print(f"{size:>9} build {build_ms:.0f} ms, postings {search.student_search.memory_bytes() / 2**20:.1f} MiB")
+
+        own = [s for s in students if s[3] == cse]
+        sample = [rng.choice(own) for _ in range(args.queries)]
+        kinds = {
+            'exact roll': [roll_no for _, roll_no, _, _ in sample],
+            'roll prefix': [roll_no[:rng.randrange(3, len(roll_no))] for _, roll_no, _, _ in sample],
+            'name prefix': [name[:rng.randrange(2, len(name))] for _, _, name, _ in sample],
+            'name typo': [typo(name, rng) for _, _, name, _ in sample],
+            'roll typo': [typo(roll_no, rng) for _, roll_no, _, _ in sample],
+        }
+
+        for kind, queries in kinds.items():
+            for backend in ('memory', 'fts'):
+                if backend == 'fts' and 'typo' in kind:
+                    continue
+                search.SEARCH_BACKEND = backend
+                median, p95 = timed(staff, [f'/api/staff/search?q={quote(q)}&limit={args.limit}' for q in queries])
+                print(f"{size:>9} {backend:8} {kind:14} {median:>10.2f} {p95:>8.2f}")
+            search.SEARCH_BACKEND = 'memory'
+
+        with app.app_context():
+            for kind in ('exact roll', 'roll prefix', 'name prefix'):
+                for query in kinds[kind]:
+                    got = [student_id for student_id, match, _ in search.student_search.search(query, 'CSE', args.limit)
+                           if match != 'fuzzy']
+                    if got != brute_force(students, query, cse, args.limit, search):
+                        failures.append(f"{size} students, {kind} '{query}': differs from brute force")
+            for query in kinds['exact roll']:
+                got = search.fts_search(db.session, query, 'CSE', args.limit)
+                if not got or got[0][1] != 'exact' or \
+                        search.normalize(next(r for s, r, _, _ in students if s == got[0][0])) != search.normalize(query):
+                    failures.append(f"{size} students, FTS '{query}': exact roll number not first")
+
+            names = {student_id: name for student_id, _, name, _ in students}
+            rolls = {student_id: roll_no for student_id, roll_no, _, _ in students}
+            found = 0
+            for (_, _, name, _), query in zip(sample, kinds['name typo']):
+                results = search.student_search.search(query, 'CSE', args.limit)
+                found += any(names[student_id] == name for student_id, _, _ in results)
+                for student_id, match, typos in results:
+                    if match != 'fuzzy':
+                        continue
+                    key = search.normalize(query)
+                    distance = min([search.prefix_distance(key, words, typos) for words in
+                                    search.word_starts(search.normalize(names[student_id]))]
+                                   + [search.prefix_distance(key, search.normalize(rolls[student_id]), typos)])
+                    if distance != typos:
+                        failures.append(f"{size} students, '{query}' -> {names[student_id]}: reported {typos} typos")
+            recall = found / len(sample)
+            print(f"{size:>9} name typo recall {recall:.0%}\n")
+            if recall < 0.95:
+                failures.append(f"{size} students: name typo recall {recall:.0%}")
+
+    if failures:
+        print('FAILED')
+        for failure in failures[:50]:
+            print(f"  {failure}")
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Title search benchmark - certificate and competition search through FTS5
+
+For each cohort size (seeded with backend.seed) it reports the latency
+(median / p95, full request) of /api/staff/search-certificates and
+/api/staff/search-competitions for a set of word, prefix, department, year
+and date range combinations, on the first page and a deep page.
+Each result page must equal the same page of a brute-force scan in Python
+over every row (title word prefixes, filters, newest upload first); the
+check fails (exit status 1) otherwise.
+
+Usage:
+    python -m benchmarks.bench_title_search
+    python -m benchmarks.bench_title_search --sizes 300000 --repeat 20
+"""
+import argparse
+import re
+import statistics
+import sys
+import time
+from datetime import date
+
+from benchmarks.common import use_temp_database, staff_client
+
+CASES = [
+    ('certificates', {'q': 'aws'}),
+    ('certificates', {'q': 'data'}),
+    ('certificates', {'q': 'az'}),
+    ('certificates', {'q': 'cloud prac', 'department': 'IT', 'year': 2}),
+    ('certificates', {'q': 'nptel', 'from': '2025-01-01', 'to': '2025-03-31'}),
+    ('certificates', {'q': 'python', 'page': 40}),
+    ('certificates', {'department': 'ECE', 'from': '2024-06-01'}),
+    ('competitions', {'q': 'hack'}),
+    ('competitions', {'q': 'robotics', 'year': 3, 'department': 'Mech'}),
+    ('competitions', {'q': 'expo', 'from': '2025-06-01', 'to': '2025-06-30', 'department': 'CSE'}),
+]
+
+
+def brute_force(rows, params, per_page):
+    """Page of ids from (id, title, department, year, date) rows, newest first"""
+    words = re.findall(r'\w+', params.get('q', '').lower())
+    date_from = date.fromisoformat(params['from']) if 'from' in params else None
+    date_to = date.fromisoformat(params['to']) if 'to' in params else None
+    matched = []
+    for row_id, title, department, year, day in rows:
+        title_words = re.findall(r'\w+', title.lower())
+        if not all(any(t.startswith(w) for t in title_words) for w in words):
+            continue
+        if 'department' in params and department.lower() != params['department'].lower():
+            continue
+        if 'year' in params and year != params['year']:
+            continue
+        if (date_from and day < date_from) or (date_to and day > date_to):
+            continue
+        matched.append(row_id)
+    matched.sort(reverse=True)
+    start = (params.get('page', 1) - 1) * per_page
+    return matched[start:start + per_page]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20000, 100000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from urllib.parse import urlencode
+
+    from app import app
+    from models import db, Student, Certification, Competition
+    from backend.seed import seed_database
+    from config import TITLE_SEARCH_PER_PAGE
+
+    client = staff_client(app, 'hod')
+    failures = []
+    print(f"{'students':>9} {'uploads':>8} {'endpoint':13} {'query':58} {'median ms':>10} {'p95 ms':>7}")
+    for size in args.sizes:
+        with app.app_context():
+            seed_database(db, size, reset=True, log=None)
+            rows = {
+                'certificates': db.session.execute(db.select(
+                    Certification.cert_id, Certification.cert_title, Student.department, Student.year,
+                    Certification.issue_date
+                ).join(Student, Student.student_id == Certification.student_id)).all(),
+                'competitions': db.session.execute(db.select(
+                    Competition.comp_id, Competition.comp_title, Student.department, Student.year,
+                    Competition.event_date
+                ).join(Student, Student.student_id == Competition.student_id)).all(),
+            }
+        uploads = sum(len(r) for r in rows.values())
+
+        for kind, params in CASES:
+            url = f'/api/staff/search-{kind}?{urlencode(params)}'
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = client.get(url)
+                body = response.get_json()
+                samples.append((time.perf_counter() - start) * 1000)
+            samples.sort()
+            print(f"{size:>9} {uploads:>8} {kind:13} {urlencode(params):58} {statistics.median(samples):>10.2f} "
+                  f"{samples[max(int(len(samples) * 0.95) - 1, 0)]:>7.2f}")
+
+            id_key = 'cert_id' if kind == 'certificates' else 'comp_id'
+            got = [item[id_key] for item in body[kind]]
+            if got != brute_force(rows[kind], params, TITLE_SEARCH_PER_PAGE):
+                failures.append(f"{size} students, {url}: differs from brute force")
+        print()
+
+    if failures:
+        print('FAILED')
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
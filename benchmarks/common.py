@@ -0,0 +1,95 @@
+"""
+Shared helpers for benchmarks: a throwaway database and a seeded cohort
+"""
+import os
+import random
+import tempfile
+from datetime import date, datetime, timedelta
+
+
+def use_temp_database():
+    """Point config.DB_PATH at a fresh temporary file; call before importing app"""
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='bench_')
+    os.close(fd)
+    os.environ['DB_PATH'] = path
+    return path
+
+
+def seed_cohort(n_students, seed=42, subjects_per_semester=5, semesters=6, certs_per_student=2):
+    """Bulk insert n_students with marks, predictions and certificates"""
+    from sqlalchemy import insert
+    from config import DEPARTMENTS, YEARS
+    from models import db, Student, Marks, Prediction, Certification
+    from backend.departments import ensure_departments
+    from backend.fts import install_title_indexes
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    db.drop_all()
+    db.create_all()
+    ensure_departments(db)
+    install_title_indexes(db.engine)
+
+    db.session.execute(insert(Student), [
+        {
+            'student_id': i,
+            'name': f'Student {i}',
+            'roll_no': f'R{i:06d}',
+            'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+            'year': YEARS[i % len(YEARS)],
+            'password_hash': 'x' * 64,
+            'email': f'student{i}@example.edu',
+            'created_at': now
+        }
+        for i in range(1, n_students + 1)
+    ])
+
+    marks, predictions, certs = [], [], []
+    for i in range(1, n_students + 1):
+        for sem in range(1, semesters + 1):
+            for subj in range(subjects_per_semester):
+                marks.append({
+                    'student_id': i, 'semester': sem, 'subject_name': f'Subject {subj + 1}',
+                    'marks_obtained': rng.uniform(30, 100), 'attendance_percentage': rng.uniform(50, 100),
+                    'internal_marks': rng.uniform(10, 50), 'assignment_score': rng.uniform(5, 20),
+                    'entry_date': now
+                })
+            score = rng.uniform(20, 100)
+            category = 'Good Performance' if score >= 75 else 'Average Performance' if score >= 50 else 'At-Risk Performance'
+            predictions.append({
+                'student_id': i, 'semester': sem, 'prediction_result': category,
+                'prediction_score': round(score, 2), 'generated_at': now - timedelta(days=180 * (semesters - sem))
+            })
+        for c in range(certs_per_student):
+            certs.append({
+                'student_id': i, 'cert_title': f'Certificate {c + 1} for student {i}',
+                'cert_file_path': f'uploads/{i}_{c}_certificate.pdf',
+                'issue_date': date(2025, 1 + c % 12, 1), 'upload_date': now
+            })
+
+    db.session.execute(insert(Marks), marks)
+    db.session.execute(insert(Prediction), predictions)
+    db.session.execute(insert(Certification), certs)
+    db.session.commit()
+
+
+def staff_client(app, role='hod', department='CSE'):
+    """Test client with a logged-in staff/HOD session"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['user_type'] = role
+        sess['name'] = 'Benchmark'
+        sess['department'] = department
+    return client
+
+
+def student_client(app, student_id=1):
+    """Test client with a logged-in student session"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = student_id
+        sess['user_type'] = 'student'
+        sess['name'] = f'Student {student_id}'
+    return client
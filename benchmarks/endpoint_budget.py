@@ -0,0 +1,264 @@
+"""
+Endpoint budget check - SQL statement bounds and latency regressions
+
+Seeds a temporary SQLite database at several cohort sizes and calls every
+endpoint of the auth, student and staff blueprints through the Flask test
+client. It fails (exit status 1) when:
+    - an endpoint answers with another status than the one expected
+    - an endpoint issues more SQL statements than its budget
+    - an endpoint's statement count changes with the cohort size (N+1)
+    - median latency at the largest size regresses beyond --tolerance
+      against the JSON baseline
+
+Usage:
+    python -m benchmarks.endpoint_budget                    # check
+    python -m benchmarks.endpoint_budget --update-baseline  # record timings
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.common import use_temp_database, seed_cohort, staff_client, student_client
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'endpoint_timings.json')
+
+_unique = itertools.count(1)
+
+
+def _student_signup():
+    n = next(_unique)
+    return {'json': {'name': 'New', 'roll_no': f'NEW{n}', 'department': 'CSE', 'year': 1, 'password': 'secret1'}}
+
+
+def _staff_signup():
+    n = next(_unique)
+    return {'json': {'name': 'New', 'username': f'staff{n}', 'email': 's@example.edu',
+                     'department': 'CSE', 'password': 'secret1'}}
+
+
+def _add_marks():
+    return {'json': {'semester': 1, 'subject_name': 'Extra', 'marks_obtained': 80,
+                     'attendance_percentage': 90, 'internal_marks': 40, 'assignment_score': 18}}
+
+
+UPLOAD_BODY = b'%PDF-1.4 budget' * 64
+
+
+def _upload(received=0):
+    """A fresh chunked upload of student 1 with its first `received` bytes staged (no SQL)"""
+    from backend import chunked_upload
+    meta = chunked_upload.create_session(1, 'certificate', 'budget.pdf', len(UPLOAD_BODY))
+    if received:
+        meta = chunked_upload.append_chunk(meta, 0, UPLOAD_BODY[:received], None)
+    return meta['upload_id']
+
+
+def _upload_chunk():
+    return {'path': f'/api/student/uploads/{_upload()}', 'data': UPLOAD_BODY,
+            'headers': {'X-Upload-Offset': '0'}}
+
+
+def _upload_commit():
+    return {'path': f'/api/student/uploads/{_upload(len(UPLOAD_BODY))}/commit',
+            'json': {'cert_title': 'Budget certificate', 'issue_date': '2025-01-31'}}
+
+
+def _import_marks():
+    return {'json': [{'roll_no': f'R{i:06d}', 'semester': 1, 'subject_name': 'Imported', 'marks_obtained': 70,
+                      'attendance_percentage': 85, 'internal_marks': 35, 'assignment_score': 15}
+                     for i in range(1, 11)]}
+
+
+def _import_roster():
+    n = next(_unique)
+    rows = ''.join(f'ROSTER{n}-{i},Roster Student,1\n' for i in range(5))
+    return {'data': 'roll_no,name,year\n' + rows, 'content_type': 'text/csv',
+            'headers': {'X-Default-Password': 'secret1'}}
+
+
+# (name, client role, method, url, request kwargs factory, expected status, max SQL statements)
+# A factory may return 'path' to replace url, e.g. with a fresh upload id
+ENDPOINTS = [
+    ('auth.student_signup', None, 'POST', '/api/auth/student/signup', _student_signup, 201, 3),
+    ('auth.student_login', None, 'POST', '/api/auth/student/login',
+     lambda: {'json': {'roll_no': 'R000001', 'password': 'wrong-password'}}, 401, 1),
+    ('auth.staff_signup', None, 'POST', '/api/auth/staff/signup', _staff_signup, 201, 3),
+    ('auth.hod_signup', None, 'POST', '/api/auth/hod/signup', _staff_signup, 201, 3),
+    ('auth.staff_login', None, 'POST', '/api/auth/staff/login',
+     lambda: {'json': {'username': 'nobody', 'password': 'secret1'}}, 401, 1),
+    ('auth.check_session', 'student', 'GET', '/api/auth/check-session', dict, 200, 0),
+
+    ('student.add_marks', 'student', 'POST', '/api/student/add-marks', _add_marks, 201, 2),
+    ('student.get_semester_marks', 'student', 'GET', '/api/student/get-semester-marks/1', dict, 200, 1),
+    ('student.get_all_marks', 'student', 'GET', '/api/student/get-all-marks', dict, 200, 1),
+    ('student.get_prediction', 'student', 'GET', '/api/student/predict/1', dict, 200, 4),
+    ('student.get_all_predictions', 'student', 'GET', '/api/student/get-all-predictions', dict, 200, 8),
+    ('student.get_profile', 'student', 'GET', '/api/student/get-profile', dict, 200, 1),
+    ('student.get_certifications', 'student', 'GET', '/api/student/get-certifications', dict, 200, 1),
+    ('student.get_competitions', 'student', 'GET', '/api/student/get-competitions', dict, 200, 1),
+    ('student.start_upload', 'student', 'POST', '/api/student/uploads',
+     lambda: {'json': {'kind': 'certificate', 'filename': 'budget.pdf', 'total_size': len(UPLOAD_BODY)}}, 201, 0),
+    ('student.get_upload', 'student', 'GET', None, lambda: {'path': f'/api/student/uploads/{_upload()}'}, 200, 0),
+    ('student.put_upload_chunk', 'student', 'PUT', None, _upload_chunk, 200, 0),
+    ('student.cancel_upload', 'student', 'DELETE', None, lambda: {'path': f'/api/student/uploads/{_upload()}'}, 200, 0),
+    ('student.commit_upload', 'student', 'POST', None, _upload_commit, 201, 2),
+
+    ('staff.all_predictions', 'hod', 'GET', '/api/staff/all-predictions', dict, 200, 2),
+    ('staff.all_predictions[staff]', 'staff', 'GET', '/api/staff/all-predictions', dict, 200, 2),
+    ('staff.student_details', 'hod', 'GET', '/api/staff/student-details/1', dict, 200, 5),
+    ('staff.search_student', 'hod', 'GET', '/api/staff/search-student?roll_no=r000001', dict, 200, 1),
+    # Search index change-log check, then the matched students
+    ('staff.search', 'staff', 'GET', '/api/staff/search?q=r00001', dict, 200, 2),
+    ('staff.search[typo]', 'hod', 'GET', '/api/staff/search?q=studnet%2012', dict, 200, 2),
+    ('staff.department_stats', 'hod', 'GET', '/api/staff/department-stats', dict, 200, 3),
+    # Cohort index change-log check, then names for each batch of matches
+    ('staff.filter_students', 'hod', 'GET', '/api/staff/filter-students?year=1&department=CSE', dict, 200, 2),
+    ('staff.all_certificates', 'hod', 'GET', '/api/staff/all-certificates', dict, 200, 1),
+    ('staff.all_certificates[staff]', 'staff', 'GET', '/api/staff/all-certificates', dict, 200, 1),
+    ('staff.student_certificates', 'hod', 'GET', '/api/staff/student-certificates/1', dict, 200, 2),
+    ('staff.search_certificates', 'hod', 'GET', '/api/staff/search-certificates?q=certificate%201&year=1', dict, 200, 1),
+    ('staff.search_certificates[staff]', 'staff', 'GET', '/api/staff/search-certificates?q=cert&from=2025-01-01', dict, 200, 1),
+    ('staff.search_competitions', 'hod', 'GET', '/api/staff/search-competitions?department=CSE', dict, 200, 1),
+    ('staff.at_risk', 'hod', 'GET', '/api/staff/at-risk?department=CSE&limit=20', dict, 200, 2),
+    ('staff.at_risk[staff]', 'staff', 'GET', '/api/staff/at-risk', dict, 200, 2),
+    ('staff.student_rank', 'hod', 'GET', '/api/staff/student-rank/1', dict, 200, 1),
+    ('staff.student_rank[staff]', 'staff', 'GET', '/api/staff/student-rank/7', dict, 200, 1),  # A CSE student
+    ('staff.import_marks', 'hod', 'POST', '/api/staff/import-marks', _import_marks, 200, 6),
+    ('staff.import_roster', 'staff', 'POST', '/api/staff/import-roster', _import_roster, 201, 3),
+    ('staff.enqueue_job', 'hod', 'POST', '/api/staff/jobs', lambda: {'json': {'kind': 'rebuild_department_aggregates'}}, 202, 2),
+    ('staff.job_status', 'hod', 'GET', '/api/staff/jobs/1', dict, 200, 1),
+]
+
+
+class StatementCounter:
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def request_args(url, make_kwargs):
+    kwargs = make_kwargs()
+    return kwargs.pop('path', url), kwargs
+
+
+def run_endpoint(app, counter, clients, spec, repeat):
+    """Return (statement count of a warm call, median seconds, status codes of the measured calls)"""
+    name, role, method, url, make_kwargs, _, _ = spec
+    client = clients[role]
+    # Warm-up call: first calls may create rows (e.g. missing predictions)
+    path, kwargs = request_args(url, make_kwargs)
+    client.open(path, method=method, **kwargs)
+
+    # Read the body: streamed listings run their queries while it is produced
+    path, kwargs = request_args(url, make_kwargs)
+    counter.count = 0
+    response = client.open(path, method=method, **kwargs)
+    response.get_data()
+    statements = counter.count
+
+    timings, statuses = [], {response.status_code}
+    for _ in range(repeat):
+        path, kwargs = request_args(url, make_kwargs)
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        response.get_data()
+        timings.append(time.perf_counter() - start)
+        statuses.add(response.status_code)
+    return statements, statistics.median(timings), statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 200, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown vs baseline (0.5 = +50%%)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    from app import app
+    from models import db
+    from backend import chunked_upload
+    from backend.routes import student as student_routes
+
+    # Staged and committed upload files go to a throwaway directory, not the repository
+    upload_dir = tempfile.mkdtemp(prefix='bench_uploads_')
+    chunked_upload.UPLOAD_STAGING_FOLDER = os.path.join(upload_dir, 'staging')
+    student_routes.UPLOAD_FOLDER = os.path.join(upload_dir, 'uploads')
+
+    failures = []
+    counts = {}
+    timings = {}
+
+    with app.app_context():
+        counter = StatementCounter(db.engines.values())
+        for size in args.sizes:
+            seed_cohort(size)
+            clients = {
+                None: app.test_client(),
+                'student': student_client(app, 1),
+                'staff': staff_client(app, 'staff', 'cse'),
+                'hod': staff_client(app, 'hod')
+            }
+            for spec in ENDPOINTS:
+                statements, median, statuses = run_endpoint(app, counter, clients, spec, args.repeat)
+                # A 403 or 404 from a wrong fixture would pass its budgets trivially
+                if statuses != {spec[5]}:
+                    failures.append(f"{spec[0]}: HTTP {', '.join(map(str, sorted(statuses)))} at {size} students, "
+                                    f"expected {spec[5]}")
+                counts.setdefault(spec[0], []).append(statements)
+                timings[spec[0]] = median
+
+    print(f"{'endpoint':34} {'budget':>6} " + ' '.join(f'{f"sql@{s}":>9}' for s in args.sizes) + f" {'median ms':>10}")
+    for name, _, _, _, _, _, budget in ENDPOINTS:
+        series = counts[name]
+        print(f"{name:34} {budget:>6} " + ' '.join(f'{c:>9}' for c in series) + f" {timings[name] * 1000:>10.2f}")
+        if max(series) > budget:
+            failures.append(f"{name}: {max(series)} SQL statements, budget {budget}")
+        if len(set(series)) > 1:
+            failures.append(f"{name}: SQL statement count grows with cohort size {series}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'students': args.sizes[-1], 'median_seconds': timings}, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('students') != args.sizes[-1]:
+            print(f"\nBaseline was recorded at {baseline.get('students')} students; timings not compared")
+        else:
+            for name, seconds in timings.items():
+                previous = baseline['median_seconds'].get(name)
+                if previous and seconds > previous * (1 + args.tolerance):
+                    failures.append(f"{name}: {seconds * 1000:.2f} ms vs baseline {previous * 1000:.2f} ms")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+
+    os.remove(db_path)
+    shutil.rmtree(upload_dir, ignore_errors=True)
+
+    if failures:
+        print('\nFAILED')
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print('\nOK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+"""
+HTTP load test - concurrent simulated students, staff and HODs
+
+Drives a running server over real HTTP (keep-alive connections, session
+cookies) with sessions arriving as Poisson processes at the configured rates:
+    student: log in, open the dashboard, enter marks, run a prediction,
+             view prediction history and profile
+    staff:   log in, open the dashboard, filter, search, list predictions
+    hod:     log in, department stats, filter, search, certificates
+Sessions run on a thread pool; when every worker is busy new sessions wait,
+and that wait is reported as arrival lag. Throughput, p50/p95/p99 latency
+and error rate (4xx/5xx and connection failures) per route are printed and
+written as JSON. Sessions whose scenario raised are counted as errors too;
+the exit status is 1 above --max-error-rate or if any session raised.
+
+Accounts are created through the signup API before the run. To use a cohort
+from `flask --app app seed-data` instead, pass --seeded-db with its path.
+
+Usage:
+    python -m benchmarks.load_test --serve --duration 60 --student-rate 20 --staff-rate 2
+    python -m benchmarks.load_test --url http://10.0.0.5:8000 --workers 64 --output report.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from config import DEPARTMENTS, YEARS
+
+PASSWORD = 'password123'
+
+
+class Client:
+    """One simulated user: a keep-alive connection and its session cookie"""
+
+    def __init__(self, base_url, recorder):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.recorder = recorder
+        self.cookie = None
+        self.conn = None
+
+    def request(self, method, path, route=None, body=None):
+        """Send one request and return its status (None if it failed). Failures are recorded, not raised."""
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            self.recorder.record(f'{method} {route or path}', time.perf_counter() - start, None, type(e).__name__)
+            return None
+        self.recorder.record(f'{method} {route or path}', time.perf_counter() - start, status)
+
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return status
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class Recorder:
+    """Latencies and statuses per route, safe to share between worker threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+        self.arrival_lag = []
+        self.session_errors = {}
+
+    def record(self, route, seconds, status, error=None):
+        failed = error is not None or status >= 400
+        with self._lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            key = error or status
+            self.statuses.setdefault(route, {})
+            self.statuses[route][key] = self.statuses[route].get(key, 0) + 1
+            if failed:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def record_session_error(self, error):
+        """A scenario raised (bad response shape, missing account field): the session's remaining requests never ran"""
+        key = f"{type(error).__name__}: {error}"
+        with self._lock:
+            self.session_errors[key] = self.session_errors.get(key, 0) + 1
+
+    def report(self, elapsed):
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            routes[route] = {
+                'requests': len(samples),
+                'errors': self.errors.get(route, 0),
+                'error_rate': round(self.errors.get(route, 0) / len(samples), 4),
+                'throughput_rps': round(len(samples) / elapsed, 2),
+                'mean_ms': round(statistics.fmean(samples) * 1000, 2),
+                'p50_ms': round(_percentile(samples, 50) * 1000, 2),
+                'p95_ms': round(_percentile(samples, 95) * 1000, 2),
+                'p99_ms': round(_percentile(samples, 99) * 1000, 2),
+                'max_ms': round(samples[-1] * 1000, 2),
+                'statuses': {str(k): v for k, v in sorted(self.statuses[route].items(), key=str)}
+            }
+        total = sum(r['requests'] for r in routes.values())
+        failed_sessions = sum(self.session_errors.values())
+        errors = sum(r['errors'] for r in routes.values()) + failed_sessions
+        all_samples = sorted(itertools.chain.from_iterable(self.latencies.values()))
+        lag = sorted(self.arrival_lag)
+        return {
+            'duration_seconds': round(elapsed, 2),
+            'requests': total,
+            'errors': errors,
+            'error_rate': round(errors / total, 4) if total else 0.0,
+            'throughput_rps': round(total / elapsed, 2),
+            'p50_ms': round(_percentile(all_samples, 50) * 1000, 2) if all_samples else None,
+            'p95_ms': round(_percentile(all_samples, 95) * 1000, 2) if all_samples else None,
+            'p99_ms': round(_percentile(all_samples, 99) * 1000, 2) if all_samples else None,
+            'sessions': len(lag),
+            'failed_sessions': failed_sessions,
+            'session_errors': dict(sorted(self.session_errors.items(), key=lambda item: -item[1])),
+            'arrival_lag_p95_ms': round(_percentile(lag, 95) * 1000, 2) if lag else None,
+            'routes': routes
+        }
+
+
+def _percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, -(-pct * len(sorted_samples) // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+# Scenarios
+
+def student_session(client, account, rng):
+    client.request('POST', '/api/auth/student/login', body={'roll_no': account['roll_no'], 'password': PASSWORD})
+    client.request('GET', '/student/dashboard')
+    client.request('GET', '/api/student/get-all-marks')
+    semester = rng.randint(1, account['year'] * 2)
+    for subject in range(rng.randint(1, 3)):
+        marks = rng.uniform(35, 100)
+        client.request('POST', '/api/student/add-marks', body={
+            'semester': semester, 'subject_name': f'Load Test {subject + 1}',
+            'marks_obtained': round(marks, 1), 'attendance_percentage': round(rng.uniform(60, 100), 1),
+            'internal_marks': round(marks / 2, 1), 'assignment_score': round(marks / 5, 1)
+        })
+    client.request('GET', f'/api/student/predict/{semester}', route='/api/student/predict/<semester>')
+    client.request('GET', '/api/student/get-all-predictions')
+    client.request('GET', '/api/student/get-profile')
+    client.request('POST', '/api/auth/student/logout')
+
+
+def staff_session(client, account, rng):
+    client.request('POST', '/api/auth/staff/login', body={'username': account['username'], 'password': PASSWORD})
+    client.request('GET', '/staff/dashboard')
+    client.request('GET', f"/api/staff/filter-students?department={account['department']}&year={rng.choice(YEARS)}",
+                   route='/api/staff/filter-students')
+    client.request('GET', f"/api/staff/search-student?roll_no={account['search']}", route='/api/staff/search-student')
+    client.request('GET', '/api/staff/all-predictions')
+    client.request('POST', '/api/auth/staff/logout')
+
+
+def hod_session(client, account, rng):
+    client.request('POST', '/api/auth/staff/login', body={'username': account['username'], 'password': PASSWORD})
+    client.request('GET', '/hod/dashboard')
+    client.request('GET', '/api/staff/department-stats')
+    client.request('GET', f"/api/staff/filter-students?department={rng.choice(DEPARTMENTS)}&year={rng.choice(YEARS)}",
+                   route='/api/staff/filter-students')
+    client.request('GET', f"/api/staff/search-student?roll_no={account['search']}", route='/api/staff/search-student')
+    client.request('GET', '/api/staff/all-certificates')
+    client.request('POST', '/api/auth/staff/logout')
+
+
+# Setup
+
+def create_accounts(base_url, students, seeded_db, run_id):
+    """Sign up (or sample from a seeded database) the accounts sessions log in as"""
+    setup = Recorder()
+    client = Client(base_url, setup)
+    if seeded_db:
+        with sqlite3.connect(seeded_db) as conn:
+            rows = conn.execute('SELECT roll_no, year FROM students ORDER BY RANDOM() LIMIT ?', (students,)).fetchall()
+        student_accounts = [{'roll_no': roll_no, 'year': year} for roll_no, year in rows]
+    else:
+        student_accounts = []
+        for i in range(students):
+            account = {'roll_no': f'LT{run_id}{i:05d}', 'year': YEARS[i % len(YEARS)]}
+            client.request('POST', '/api/auth/student/signup', body={
+                'name': f'Load Test {i}', 'roll_no': account['roll_no'], 'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+                'year': account['year'], 'password': PASSWORD
+            })
+            student_accounts.append(account)
+
+    staff_accounts, hod_accounts = [], []
+    for department in DEPARTMENTS:
+        for role, accounts in (('staff', staff_accounts), ('hod', hod_accounts)):
+            username = f'lt{run_id}_{role}_{department.lower()}'
+            client.request('POST', f'/api/auth/{role}/signup', body={
+                'name': f'Load Test {role}', 'username': username, 'email': f'{username}@example.edu',
+                'department': department, 'password': PASSWORD
+            })
+            accounts.append({'username': username, 'department': department})
+
+    failed = sum(setup.errors.values())
+    if failed:
+        raise SystemExit(f"Account setup failed for {failed} requests: {setup.statuses}")
+    client.close()
+
+    searchable = [a['roll_no'] for a in student_accounts] or ['missing']
+    for account in staff_accounts + hod_accounts:
+        account['search'] = searchable
+    return student_accounts, staff_accounts, hod_accounts
+
+
+def wait_for_server(base_url, timeout=60):
+    parts = urlsplit(base_url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=2)
+            conn.request('GET', '/api/auth/check-session')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Server at {base_url} did not respond within {timeout}s")
+
+
+def serve(port):
+    """Initialise and start the app on the threaded development server in a subprocess"""
+    return subprocess.Popen(
+        [sys.executable, '-c', f'from app import app, init_app; init_app(); app.run(port={port}, threaded=True)'],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def run(base_url, rates, duration, workers, accounts, seed):
+    """Fire Poisson session arrivals for `duration` seconds and wait for them to finish"""
+    recorder = Recorder()
+    scenarios = {'student': student_session, 'staff': staff_session, 'hod': hod_session}
+    rng = random.Random(seed)
+
+    # Merge the per-role Poisson processes into one ordered schedule
+    schedule = []
+    for role, rate in rates.items():
+        t = 0.0
+        while rate > 0:
+            t += rng.expovariate(rate)
+            if t >= duration:
+                break
+            schedule.append((t, role))
+    schedule.sort()
+
+    def session(role, due, session_seed):
+        recorder.arrival_lag.append(max(0.0, time.perf_counter() - due))
+        session_rng = random.Random(session_seed)
+        account = dict(session_rng.choice(accounts[role]))
+        if 'search' in account:
+            account['search'] = session_rng.choice(account['search'])
+        client = Client(base_url, recorder)
+        try:
+            scenarios[role](client, account, session_rng)
+        finally:
+            client.close()
+
+    started = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for offset, role in schedule:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(session, role, started + offset, rng.random()))
+    for future in futures:
+        if future.exception() is not None:
+            recorder.record_session_error(future.exception())
+    return recorder.report(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--serve', action='store_true', help='start the app on the --url port for the run')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of session arrivals')
+    parser.add_argument('--student-rate', type=float, default=10, help='student sessions started per second')
+    parser.add_argument('--staff-rate', type=float, default=1, help='staff sessions started per second')
+    parser.add_argument('--hod-rate', type=float, default=0.5, help='HOD sessions started per second')
+    parser.add_argument('--workers', type=int, default=32, help='concurrent sessions')
+    parser.add_argument('--students', type=int, default=50, help='student accounts to sign up or sample')
+    parser.add_argument('--seeded-db', help='sample student accounts from a seed-data database instead')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='exit 1 above this overall error rate')
+    parser.add_argument('--output', default='load_test_report.json')
+    args = parser.parse_args()
+
+    server = serve(urlsplit(args.url).port or 80) if args.serve else None
+    try:
+        wait_for_server(args.url)
+        run_id = f'{int(time.time()) % 100000:05d}'
+        students, staff, hods = create_accounts(args.url, args.students, args.seeded_db, run_id)
+        rates = {'student': args.student_rate, 'staff': args.staff_rate, 'hod': args.hod_rate}
+        report = run(args.url, rates, args.duration, args.workers,
+                     {'student': students, 'staff': staff, 'hod': hods}, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report['config'] = {k: v for k, v in vars(args).items() if k not in ('output', 'serve')}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'route':48} {'reqs':>6} {'err%':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in report['routes'].items():
+        print(f"{route:48} {r['requests']:>6} {r['error_rate'] * 100:>6.2f} {r['throughput_rps']:>7.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    print(f"\n{report['requests']} requests in {report['duration_seconds']}s = {report['throughput_rps']} req/s, "
+          f"p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms, errors {report['error_rate'] * 100:.2f}%, "
+          f"session arrival lag p95 {report['arrival_lag_p95_ms']} ms")
+    for error, count in report['session_errors'].items():
+        print(f"{count} sessions failed with {error}")
+    print(f"Report written to {args.output}")
+    # A scenario that raised is a bug in the run, whatever the error rate
+    return 1 if report['error_rate'] > args.max_error_rate or report['failed_sessions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Memory budget check - peak Python allocation per endpoint (tracemalloc)
+
+Seeds temporary databases of growing size with backend.seed and calls each
+endpoint through the Flask test client, reading the body chunk by chunk the
+way a WSGI server does. For every call it records the peak traced allocation
+from the start of the request until the body has been sent, plus the largest
+allocation sites at the highest point observed. It fails (exit status 1)
+when an endpoint's peak exceeds its budget at any size.
+
+--no-stream builds staff listings in memory instead of streaming them
+(config.STREAM_LISTINGS = False), to see what batching saves.
+
+Usage:
+    python -m benchmarks.memory_budget
+    python -m benchmarks.memory_budget --sizes 1000 10000 50000 --top 8
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+from benchmarks.common import use_temp_database, staff_client, student_client
+
+MB = 1024 * 1024
+
+# (name, client role, url, peak budget in MB)
+ENDPOINTS = [
+    ('student.get_all_marks', 'student', '/api/student/get-all-marks', 1),
+    ('student.get_all_predictions', 'student', '/api/student/get-all-predictions', 1),
+    ('student.get_certifications', 'student', '/api/student/get-certifications', 1),
+
+    ('staff.all_predictions', 'hod', '/api/staff/all-predictions', 8),
+    ('staff.all_predictions[staff]', 'staff', '/api/staff/all-predictions', 8),
+    ('staff.student_details', 'hod', '/api/staff/student-details/1', 1),
+    ('staff.department_stats', 'hod', '/api/staff/department-stats', 1),
+    ('staff.filter_students', 'hod', '/api/staff/filter-students?year=1', 6),
+    ('staff.all_certificates', 'hod', '/api/staff/all-certificates', 6),
+    ('staff.all_certificates[staff]', 'staff', '/api/staff/all-certificates', 6),
+]
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+class PeakSnapshot:
+    """Keeps a snapshot from the highest traced-memory point seen at the checkpoints"""
+
+    def __init__(self):
+        self.current = 0
+        self.snapshot = None
+
+    def reset(self):
+        self.current = 0
+        self.snapshot = None
+
+    def checkpoint(self, *args):
+        if not tracemalloc.is_tracing():
+            return args[0] if args else None
+        current = tracemalloc.get_traced_memory()[0]
+        # Snapshots are slow; only retake when memory grew noticeably
+        if current > self.current * 1.1:
+            self.current = current
+            self.snapshot = tracemalloc.take_snapshot()
+        return args[0] if args else None
+
+
+def measure(client, url, peak):
+    """Return (peak bytes, snapshot) for one request with its body fully consumed"""
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    peak.reset()
+
+    response = client.get(url, buffered=False)
+    for _ in response.response:
+        peak.checkpoint()
+    response.close()
+
+    peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+    return peak_bytes, peak.snapshot
+
+
+def top_sites(snapshot, baseline, limit):
+    """Largest allocation sites that were live at the snapshot, relative to the idle baseline"""
+    if snapshot is None:
+        return []
+    stats = snapshot.filter_traces(_IGNORED).compare_to(baseline, 'lineno')
+    sites = []
+    for stat in stats[:limit]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        sites.append({
+            'site': f'{os.path.relpath(frame.filename)}:{frame.lineno}',
+            'kib': round(stat.size_diff / 1024, 1),
+            'blocks': stat.count_diff
+        })
+    return sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--top', type=int, default=5, help='allocation sites shown per endpoint')
+    parser.add_argument('--no-stream', action='store_true', help='build staff listings in memory')
+    parser.add_argument('--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    from app import app
+    from models import db
+    from backend.seed import seed_database
+    import backend.serializers
+
+    if args.no_stream:
+        backend.serializers.STREAM_LISTINGS = False
+
+    peak = PeakSnapshot()
+    app.after_request(peak.checkpoint)
+
+    failures = []
+    results = {}
+    with app.app_context():
+        for size in args.sizes:
+            seed_database(db, size, reset=True, log=None)
+            db.session.remove()
+            clients = {
+                'student': student_client(app, 1),
+                'staff': staff_client(app, 'staff', 'cse'),
+                'hod': staff_client(app, 'hod')
+            }
+            print(f"\n{size} students")
+            print(f"{'endpoint':34} {'budget MB':>10} {'peak MB':>9}")
+
+            for name, role, url, budget in ENDPOINTS:
+                # Warm-up outside tracing: first calls import modules and fill caches
+                clients[role].get(url).get_data()
+
+                tracemalloc.start(1)
+                baseline = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+                peak_bytes, snapshot = measure(clients[role], url, peak)
+                sites = top_sites(snapshot, baseline, args.top)
+                tracemalloc.stop()
+
+                status = 'ok' if peak_bytes <= budget * MB else 'OVER'
+                print(f"{name:34} {budget:>10} {peak_bytes / MB:>9.2f}  {status}")
+                for site in sites:
+                    print(f"    {site['kib']:>10.1f} KiB {site['blocks']:>8} blocks  {site['site']}")
+                results.setdefault(name, {'budget_mb': budget, 'peaks_mb': {}, 'top_sites': {}})
+                results[name]['peaks_mb'][size] = round(peak_bytes / MB, 3)
+                results[name]['top_sites'][size] = sites
+                if status == 'OVER':
+                    failures.append(f"{name}: peak {peak_bytes / MB:.2f} MB at {size} students, budget {budget} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    os.remove(db_path)
+
+    if failures:
+        print('\nFAILED')
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print('\nOK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Startup budget check - import time, deferred modules, time to first response
+
+Each measurement runs in a fresh interpreter against a throwaway database:
+    - `python -X importtime -c "import app"`: cumulative import time of the
+      app, and the slowest modules it pulls in
+    - which heavy modules were imported (pandas, scikit-learn, joblib, ...
+      must wait for the first prediction or predictor.warm_up())
+    - time from interpreter start until a first request is answered
+    - cost of the first prediction, which now pays for the deferred imports
+It fails (exit status 1) when a median exceeds its budget or a deferred
+module is imported eagerly.
+
+Usage:
+    python -m benchmarks.startup_budget
+    python -m benchmarks.startup_budget --repeat 7 --import-budget 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import use_temp_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported until a prediction is made
+DEFERRED_MODULES = ('pandas', 'sklearn', 'scipy', 'joblib', 'numpy')
+
+FIRST_RESPONSE_SCRIPT = '''
+import json, sys, time
+from app import app
+from models import db
+response = app.test_client().get('/api/auth/check-session')
+ready = time.perf_counter()
+with app.app_context():
+    db.create_all()
+    from backend.prediction_model import predictor
+    start = time.perf_counter()
+    predictor.predict(70, 85, 35, 15, 1, 0)
+    first_prediction = time.perf_counter() - start
+print(json.dumps({"status": response.status_code, "ready": ready, "first_prediction": first_prediction}))
+'''
+
+EAGER_CHECK_SCRIPT = '''
+import json, sys
+import app
+print(json.dumps([m for m in sys.argv[1:] if m in sys.modules]))
+'''
+
+
+def run_python(args, env):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def import_time(env):
+    """Cumulative microseconds for `import app` and the slowest top-level imports"""
+    stderr = run_python(['-X', 'importtime', '-c', 'import app'], env).stderr
+    modules = []
+    total = None
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if name.strip() == 'app':
+            total = int(cumulative)
+        elif depth == 1:
+            modules.append((int(cumulative), name.strip()))
+    return total, sorted(modules, reverse=True)
+
+
+def first_response(env):
+    """Wall seconds from spawning the interpreter to the first answered request, plus first prediction cost"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', FIRST_RESPONSE_SCRIPT],
+                            cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    stdout, stderr = proc.communicate()
+    if proc.returncode:
+        raise SystemExit(stderr)
+    result = json.loads(stdout.strip().splitlines()[-1])
+    # ready is perf_counter in the child; same monotonic clock on Linux/macOS
+    result['first_response'] = result['ready'] - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--import-budget', type=float, default=1000, help='ms for `import app`')
+    parser.add_argument('--first-response-budget', type=float, default=1500, help='ms from process start')
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    failures = []
+
+    eager = json.loads(run_python(['-c', EAGER_CHECK_SCRIPT, *DEFERRED_MODULES], env).stdout)
+    if eager:
+        failures.append(f"imported by `import app`: {', '.join(eager)}")
+
+    imports, responses, predictions = [], [], []
+    slowest = []
+    for _ in range(args.repeat):
+        total, slowest = import_time(env)
+        imports.append(total / 1000)
+        result = first_response(env)
+        if result['status'] != 200:
+            failures.append(f"first request returned HTTP {result['status']}")
+        responses.append(result['first_response'] * 1000)
+        predictions.append(result['first_prediction'] * 1000)
+
+    import_ms = statistics.median(imports)
+    response_ms = statistics.median(responses)
+    print(f"import app:           {import_ms:8.1f} ms (budget {args.import_budget:g})")
+    print(f"first response:       {response_ms:8.1f} ms (budget {args.first_response_budget:g})")
+    print(f"first prediction:     {statistics.median(predictions):8.1f} ms (deferred imports + model load)")
+    print(f"deferred until use:   {', '.join(DEFERRED_MODULES)}" + (f" (EAGER: {', '.join(eager)})" if eager else ''))
+    print(f"\nslowest imports under app (last run):")
+    for cumulative, name in slowest[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if import_ms > args.import_budget:
+        failures.append(f"import app took {import_ms:.1f} ms, budget {args.import_budget:g} ms")
+    if response_ms > args.first_response_budget:
+        failures.append(f"first response after {response_ms:.1f} ms, budget {args.first_response_budget:g} ms")
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    if failures:
+        print('\nFAILED')
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print('\nOK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
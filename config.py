@@ -5,10 +5,20 @@ import os
 
 # Database Configuration
 import os
-DB_PATH = os.path.join(os.path.dirname(__file__), 'database.db')
+DB_PATH = os.environ.get('DB_PATH', os.path.join(os.path.dirname(__file__), 'database.db'))
 SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_PATH}'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# SQLite Storage (see backend/storage.py)
+SQLITE_JOURNAL_MODE = 'WAL'  # Readers don't block the writer and vice versa
+SQLITE_SYNCHRONOUS = 'NORMAL'  # With WAL: durable except for the last commits on power loss, never corrupt
+SQLITE_BUSY_TIMEOUT = 10  # Seconds a writer waits for the lock before "database is locked"
+SQLITE_CACHE_SIZE_KB = 64 * 1024  # Page cache per connection
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # Bytes of the file read through mmap
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '10'))  # Per process; about the server's thread count
+SQLITE_MAX_OVERFLOW = 20
+READ_ONLY_SESSION = True  # Read-only routes use a separate read-only connection pool
+
 # Flask Secret Key
 SECRET_KEY = 'your_secret_key_change_in_production'
 
@@ -44,3 +54,89 @@ PREDICTION_CATEGORIES = {
     'Average': (50, 74),
     'At-Risk': (0, 49)
 }
+
+# Chunked Upload Configuration
+UPLOAD_STAGING_FOLDER = os.path.join(os.path.dirname(__file__), 'upload_staging')
+UPLOAD_CHUNK_SIZE = 1 * 1024 * 1024  # 1MB per chunk
+UPLOAD_MAX_TOTAL_SIZE = 64 * 1024 * 1024  # 64MB max assembled file
+UPLOAD_SESSION_TTL = 24 * 3600  # Abandoned staging files expire after a day
+
+# Response Compression
+COMPRESS_MIN_SIZE = 1024  # Bytes; smaller bodies are sent as-is
+COMPRESS_LEVEL = 6
+COMPRESS_MIMETYPES = {'application/json', 'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript'}
+
+# JSON Encoding
+JSON_FAST_ENCODER = True  # Use orjson for responses when it is installed
+
+# Metrics (/metrics, Prometheus text format)
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # If set, /metrics requires "Authorization: Bearer <token>"
+
+# On-demand Request Profiling
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')  # Send as X-Profile header or ?_profile= to profile one request
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))  # Fraction of requests profiled automatically
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), 'profiles')
+
+# Slow Query Log
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_LOG = os.path.join(os.path.dirname(__file__), 'logs', 'slow_queries.jsonl')
+SLOW_QUERY_LOG_INTERVAL = 60  # Seconds; an identical statement is logged at most once per interval
+
+# Listing Responses
+STREAM_LISTINGS = True  # Stream large staff listings batch by batch instead of building them in memory
+STREAM_BATCH_SIZE = 1000  # Rows fetched and encoded per batch
+
+# Production Server (serve.py)
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '8000'))
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', str(os.cpu_count() or 1)))  # Processes; one per core
+SERVER_BACKLOG = 2048
+SERVER_GRACEFUL_TIMEOUT = 30  # Seconds a stopping worker may spend finishing in-flight requests
+
+# Roster Import (bulk student onboarding)
+ROSTER_HASH_WORKERS = int(os.environ.get('ROSTER_HASH_WORKERS', str(os.cpu_count() or 1)))  # Processes hashing passwords (CLI import only)
+ROSTER_HASH_PARALLEL_MIN = 50000  # Smaller rosters hash inline; pool startup costs more than SHA-256 on fewer rows
+ROSTER_CHUNK_SIZE = 5000  # Rows per hashing task / insert batch (also the progress interval)
+
+# Background Jobs (backend/jobs.py, run with `flask --app app jobs worker`)
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', '2'))
+JOB_POLL_INTERVAL = 1.0  # Seconds an idle worker waits before polling the queue again
+JOB_LEASE_SECONDS = 60  # A job whose worker stops reporting progress for this long is handed to another worker
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 5  # Seconds before the first retry, doubled for each further attempt
+DEPARTMENT_STATS_MAX_AGE = 0  # Seconds; >0 serves department-stats from the department_aggregates snapshot while it is this fresh
+
+# Cohort Re-scoring (backend/rescore.py)
+RESCORE_WORKERS = int(os.environ.get('RESCORE_WORKERS', str(os.cpu_count() or 1)))  # Processes; departments are scored in parallel
+
+# Cohort Index (backend/cohort_index.py)
+COHORT_INDEX = True  # Serve filter-students from the in-memory index instead of SQL
+COHORT_CHANGE_LOG_LIMIT = 1000000  # cohort_changes rows kept; a process further behind than this reloads in full
+COHORT_FULL_RELOAD_FRACTION = 0.25  # Reload in full instead of patching when this share of the cohort changed
+RANKING_MAX_LIMIT = 500  # Most students /api/staff/at-risk returns
+
+# Student Search (backend/student_search.py)
+SEARCH_BACKEND = 'memory'  # 'memory': in-memory prefix and typo-tolerant index; 'fts': SQLite FTS5 table (prefix only)
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_FUZZY_MIN_LENGTH = 4  # Shorter queries match prefixes only; one typo allowed from here, SEARCH_MAX_TYPOS from 8 characters
+SEARCH_MAX_TYPOS = 2
+SEARCH_FUZZY_CANDIDATES = 200  # Distinct names and roll numbers checked with edit distance per search
+
+# Certificate / Competition Title Search (FTS5, backend/fts.py)
+TITLE_SEARCH_PER_PAGE = 50
+TITLE_SEARCH_MAX_PER_PAGE = 200
+
+# Request Coalescing and Concurrency Limits (backend/coalesce.py)
+SINGLE_FLIGHT = True  # Concurrent identical department-stats / all-predictions requests share one computation
+SINGLE_FLIGHT_DIR = os.path.join(os.path.dirname(__file__), 'single_flight')  # Lock and result files shared by workers
+SINGLE_FLIGHT_JOIN_BUFFER = 256 * 1024  # Gzipped bytes a leader keeps for late joiners before streaming through alone
+SINGLE_FLIGHT_FILE_TTL = 3600  # Seconds before leftover lock and result files are swept
+ENDPOINT_CONCURRENCY = {  # endpoint -> (requests computing at once per worker, requests allowed to queue); the rest get 503
+    'staff.department_stats': (2, 8),
+    'staff.all_predictions': (2, 8),
+    'staff.all_certificates': (2, 8),
+    'staff.filter_students': (4, 16),
+}
+ENDPOINT_QUEUE_TIMEOUT = 10  # Seconds a queued request waits for a slot before 503
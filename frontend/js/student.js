@@ -280,3 +280,98 @@ function loadPredictionHistory() {
     })
     .catch(error => console.error('Error loading predictions:', error));
 }
+
+// Upload a file in checksummed chunks; an interrupted upload resumes from the last stored chunk
+async function uploadFileChunked(file, kind, fields, onProgress) {
+    const resumeKey = `upload:${kind}:${file.name}:${file.size}:${file.lastModified}`;
+    let status = null;
+
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+        const response = await fetch(`/api/student/uploads/${savedId}`, { credentials: 'same-origin' });
+        if (response.ok) {
+            status = await response.json();
+        }
+    }
+
+    if (!status) {
+        const response = await fetch('/api/student/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            credentials: 'same-origin',
+            body: JSON.stringify({ kind: kind, filename: file.name, total_size: file.size })
+        });
+        status = await response.json();
+        if (status.error) {
+            return status;
+        }
+        localStorage.setItem(resumeKey, status.upload_id);
+    }
+
+    let offset = status.received;
+    let retries = 0;
+    while (offset < file.size) {
+        const chunk = await file.slice(offset, offset + status.chunk_size).arrayBuffer();
+        const headers = { 'X-Upload-Offset': String(offset) };
+        // crypto.subtle only exists on HTTPS and localhost; over plain HTTP the chunk goes without a checksum
+        if (window.crypto && crypto.subtle) {
+            const digest = await crypto.subtle.digest('SHA-256', chunk);
+            headers['X-Chunk-Checksum'] = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+        }
+
+        let data;
+        try {
+            const response = await fetch(`/api/student/uploads/${status.upload_id}`, {
+                method: 'PUT',
+                headers: headers,
+                credentials: 'same-origin',
+                body: chunk
+            });
+            data = await response.json();
+        } catch (error) {
+            // Connection dropped: wait, then ask the server how much it has
+            if (++retries > 5) {
+                return { error: String(error) };
+            }
+            await new Promise(resolve => setTimeout(resolve, 500 * 2 ** retries));
+            try {
+                const response = await fetch(`/api/student/uploads/${status.upload_id}`, { credentials: 'same-origin' });
+                data = await response.json();
+            } catch (statusError) {
+                continue;
+            }
+            if (data.error) {
+                return data;
+            }
+            offset = data.received;
+            continue;
+        }
+
+        if (data.error) {
+            if (data.received === undefined || ++retries > 5) {
+                return data;
+            }
+            // Server tells us where it is; continue from there
+            offset = data.received;
+            continue;
+        }
+
+        retries = 0;
+        offset = data.received;
+        if (onProgress) {
+            onProgress(offset / file.size);
+        }
+    }
+
+    const response = await fetch(`/api/student/uploads/${status.upload_id}/commit`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        credentials: 'same-origin',
+        body: JSON.stringify(fields)
+    });
+    const result = await response.json();
+    if (!result.error) {
+        localStorage.removeItem(resumeKey);
+    }
+    return result;
+}
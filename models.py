@@ -7,6 +7,18 @@ import hashlib
 
 db = SQLAlchemy()
 
+def hash_password(password):
+    """Password hash stored in password_hash (shared by Student, Staff and bulk imports)"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+class Department(db.Model):
+    """Canonical departments (backend/departments.py); students and staff reference one by department_id"""
+    __tablename__ = 'departments'
+    
+    department_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # config.DEPARTMENTS spelling, else the first one seen
+    name_key = db.Column(db.String(100), unique=True, nullable=False)  # Trimmed, lower case; what lookups match
+
 class Student(db.Model):
     __tablename__ = 'students'
     
@@ -14,6 +26,7 @@ class Student(db.Model):
     name = db.Column(db.String(100), nullable=False)
     roll_no = db.Column(db.String(50), unique=True, nullable=False)
     department = db.Column(db.String(100), nullable=False)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'), index=True)  # Set by trigger
     year = db.Column(db.Integer, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(100))
@@ -26,10 +39,10 @@ class Student(db.Model):
     competitions = db.relationship('Competition', backref='student', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = hashlib.sha256(password.encode()).hexdigest()
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return self.password_hash == hashlib.sha256(password.encode()).hexdigest()
+        return self.password_hash == hash_password(password)
 
 class Marks(db.Model):
     __tablename__ = 'marks'
@@ -43,6 +56,8 @@ class Marks(db.Model):
     internal_marks = db.Column(db.Float, nullable=False)
     assignment_score = db.Column(db.Float, nullable=False)
     entry_date = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_marks_student_semester', 'student_id', 'semester'),)
 
 class Prediction(db.Model):
     __tablename__ = 'predictions'
@@ -53,6 +68,8 @@ class Prediction(db.Model):
     prediction_result = db.Column(db.String(50), nullable=False)
     prediction_score = db.Column(db.Float, nullable=False)
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_predictions_student_semester', 'student_id', 'semester'),)
 
 class Certification(db.Model):
     __tablename__ = 'certifications'
@@ -84,11 +101,55 @@ class Staff(db.Model):
     email = db.Column(db.String(100))
     password_hash = db.Column(db.String(255), nullable=False)
     department = db.Column(db.String(100), nullable=False)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'), index=True)  # Set by trigger
     role = db.Column(db.String(20), nullable=False)  # 'staff' or 'hod'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = hashlib.sha256(password.encode()).hexdigest()
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return self.password_hash == hashlib.sha256(password.encode()).hexdigest()
+        return self.password_hash == hash_password(password)
+
+class Job(db.Model):
+    """Background job queue (backend/jobs.py); a row is leased by one worker at a time"""
+    __tablename__ = 'jobs'
+    
+    job_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = db.Column(db.String(100))
+    lease_expires = db.Column(db.DateTime)
+    checkpoint = db.Column(db.Text)  # JSON; lets a retried job resume where the last attempt stopped
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (db.Index('ix_jobs_status_run_after', 'status', 'run_after'),)
+
+class DepartmentAggregate(db.Model):
+    """Per-department statistics snapshot, rebuilt by the rebuild_department_aggregates job"""
+    __tablename__ = 'department_aggregates'
+    
+    department = db.Column(db.String(100), primary_key=True)
+    student_count = db.Column(db.Integer, nullable=False)
+    average_latest_score = db.Column(db.Float)  # Over each student's latest prediction
+    prediction_count = db.Column(db.Integer, nullable=False)
+    prediction_score_sum = db.Column(db.Float, nullable=False)
+    good_count = db.Column(db.Integer, nullable=False)
+    average_count = db.Column(db.Integer, nullable=False)
+    at_risk_count = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class CohortChange(db.Model):
+    """Students whose row or predictions changed, appended by triggers (backend/cohort_index.py)"""
+    __tablename__ = 'cohort_changes'
+    
+    change_id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, nullable=False)
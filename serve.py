@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+PRODUCTION SERVER - pre-forked multi-process WSGI server
+
+The master process imports the app, creates the tables, builds assets,
+renders the static pages and loads (or trains, if missing) the predictor
+once. It then opens the listening socket and forks SERVER_WORKERS workers.
+Workers inherit everything already in memory, shared copy-on-write, and
+only open their own database connections; each serves requests on threads.
+
+    python serve.py                      # SERVER_WORKERS workers on SERVER_PORT
+    python serve.py --workers 8 --port 8000 --retrain
+
+Signals to the master:
+    HUP       graceful restart: reload the model artifacts, asset manifest and
+              pages, start new workers, then let the old ones finish their
+              in-flight requests and exit
+    TERM/INT  graceful shutdown
+A worker that dies is replaced. /metrics reports the worker that answers.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_BACKLOG, SERVER_GRACEFUL_TIMEOUT
+
+
+def listen(host, port, backlog):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, db, sock, host, port):
+    """Serve on the inherited socket until SIGTERM, then drain and return"""
+    from backend.storage import reset_after_fork
+
+    for sig in (signal.SIGHUP, signal.SIGINT):
+        signal.signal(sig, signal.SIG_IGN)
+    reset_after_fork(app, db)
+
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    # Track request threads so server_close() waits for in-flight requests
+    server.daemon_threads = False
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so it can't run on the serving thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    server.serve_forever()
+    server.server_close()
+
+
+class Master:
+    def __init__(self, app, db, sock, host, port, workers, graceful_timeout):
+        self.app = app
+        self.db = db
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.size = workers
+        self.graceful_timeout = graceful_timeout
+        self.workers = {}  # pid -> generation
+        self.retiring = {}  # pid -> deadline for workers told to stop
+        self.generation = 0
+        self.signals = []
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.app, self.db, self.sock, self.host, self.port)
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        self.workers[pid] = self.generation
+
+    def retire(self, pids):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.workers.pop(pid, None)
+            self.retiring[pid] = deadline
+            self._kill(pid, signal.SIGTERM)
+
+    def reload(self):
+        """Refresh what the workers share, then replace them generation by generation"""
+        from app import warm_pages
+        from backend.assets import reload_manifest
+        from backend.prediction_model import predictor
+
+        with self.app.app_context():
+            predictor.load_model()
+            reload_manifest()
+            warm_pages()
+        gc.freeze()
+
+        old = list(self.workers)
+        self.generation += 1
+        for _ in range(self.size):
+            self.spawn()
+        self.retire(old)
+        print(f"[master] reloaded: generation {self.generation}, {self.size} workers", flush=True)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.retiring.pop(pid, None) is None and self.workers.pop(pid, None) is not None:
+                print(f"[master] worker {pid} exited unexpectedly (status {status}); replacing", flush=True)
+                self.spawn()
+
+    def _kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def run(self):
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: self.signals.append(signum))
+
+        # Keep the preloaded heap out of the cyclic GC so workers don't dirty (and copy) its pages
+        gc.freeze()
+        for _ in range(self.size):
+            self.spawn()
+        print(f"[master] pid {os.getpid()} serving on http://{self.host}:{self.port} "
+              f"with {self.size} workers", flush=True)
+
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                else:
+                    return self.shutdown()
+            self.reap()
+            now = time.monotonic()
+            for pid, deadline in list(self.retiring.items()):
+                if now > deadline:
+                    self._kill(pid, signal.SIGKILL)
+            time.sleep(0.2)
+
+    def shutdown(self):
+        print("[master] shutting down", flush=True)
+        self.retire(list(self.workers))
+        while self.retiring and time.monotonic() < max(self.retiring.values()):
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.retiring:
+            self._kill(pid, signal.SIGKILL)
+        self.sock.close()
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS)
+    parser.add_argument('--graceful-timeout', type=float, default=SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument('--retrain', action='store_true',
+                        help='retrain the model instead of loading the saved one (and queue a re-score job)')
+    args = parser.parse_args()
+
+    # Everything here runs once, in the master, before any worker exists
+    from app import app, init_app
+    from models import db
+    init_app(retrain=args.retrain)
+    if args.retrain:
+        # Stored predictions came from the old model; the job workers re-score them
+        from backend.jobs import enqueue
+        with app.app_context():
+            enqueue('rescore_students', unique=True)
+
+    sock = listen(args.host, args.port, SERVER_BACKLOG)
+    return Master(app, db, sock, args.host, args.port, args.workers, args.graceful_timeout).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())